@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Chatbot Query Replay Benchmark for CureHelp+
+Replays a JSONL file of labeled queries through the chatbot and reports
+latency percentiles per input type, throughput, peak memory and top-1/top-k
+accuracy. Results are written as JSON so runs can be compared.
+
+Each line of the queries file is a JSON object:
+    {"query": "fever, headache, vomiting", "type": "symptoms", "expected": "malaria"}
+
+`type` is one of question/symptoms/disease and `expected` is the disease name
+(or FAQ question) that a correct answer should return; both are optional.
+
+Usage:
+    python Tests/chatbot_replay.py Tests/data/chatbot_queries.jsonl --output replay.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_index import normalize_term
+
+
+def load_queries(path):
+    """Load labeled queries from a JSONL file, skipping blank lines"""
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not record.get('query'):
+                raise ValueError(f"{path}:{line_number}: missing 'query'")
+            queries.append(record)
+    return queries
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize_latencies(latencies_ms):
+    """Return count, mean and p50/p95/p99 for a list of latencies in milliseconds"""
+    if not latencies_ms:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None}
+    values = np.asarray(latencies_ms, dtype=float)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99)
+    }
+
+
+def ranked_answers(response):
+    """Return the answers a response proposes, best first (disease, candidates, FAQ question)"""
+    answers = []
+    if response.get('disease'):
+        answers.append(response['disease'])
+    answers.extend(name for name, _ in response.get('candidates') or [])
+    if response.get('faq_question'):
+        answers.append(response['faq_question'])
+
+    ranked = []
+    for answer in answers:
+        normalized = normalize_term(answer)
+        if normalized and normalized not in ranked:
+            ranked.append(normalized)
+    return ranked
+
+
+def score_response(response, expected, top_k):
+    """Return (top-1 hit, top-k hit) for a response against its expected label"""
+    expected = normalize_term(expected)
+    ranked = ranked_answers(response)
+    return bool(ranked) and ranked[0] == expected, expected in ranked[:top_k]
+
+
+def replay(queries, kb, top_k=5, repeat=1, warmup=True, scoring='cosine'):
+    """Replay queries through the chatbot against a knowledge base and return the benchmark report"""
+    from chatbot_engine import answer_query, response_cache
+
+    # One untimed pass warms up lazily initialised state
+    if warmup:
+        for record in queries:
+            answer_query(record['query'], kb, scoring=scoring)
+        response_cache.clear()
+
+    latencies = {}
+    accuracy = {}
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        for record in queries:
+            query_start = time.perf_counter()
+            response = answer_query(record['query'], kb, scoring=scoring)
+            elapsed_ms = (time.perf_counter() - query_start) * 1000
+
+            input_type = record.get('type') or response.get('type') or 'unknown'
+            latencies.setdefault(input_type, []).append(elapsed_ms)
+
+            if record.get('expected'):
+                top1, topk = score_response(response, record['expected'], top_k)
+                counts = accuracy.setdefault(input_type, {'labeled': 0, 'top1': 0, 'topk': 0})
+                counts['labeled'] += 1
+                counts['top1'] += int(top1)
+                counts['topk'] += int(topk)
+
+    total_seconds = time.perf_counter() - started
+    total_queries = len(queries) * repeat
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    latency_report = {input_type: summarize_latencies(values) for input_type, values in sorted(latencies.items())}
+    latency_report['all'] = summarize_latencies(all_latencies)
+
+    overall = {'labeled': 0, 'top1': 0, 'topk': 0}
+    accuracy_report = {}
+    for input_type, counts in sorted(accuracy.items()):
+        for key in overall:
+            overall[key] += counts[key]
+        accuracy_report[input_type] = _accuracy_rates(counts)
+    accuracy_report['all'] = _accuracy_rates(overall)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'kb_version': kb.version,
+        'scoring': scoring,
+        'queries': len(queries),
+        'repeat': repeat,
+        'top_k': top_k,
+        'total_seconds': total_seconds,
+        'throughput_qps': total_queries / total_seconds if total_seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'latency_ms': latency_report,
+        'accuracy': accuracy_report,
+        'cache': response_cache.stats()
+    }
+
+
+def _accuracy_rates(counts):
+    """Convert raw hit counts into top-1/top-k rates"""
+    labeled = counts['labeled']
+    return {
+        'labeled': labeled,
+        'top1': counts['top1'] / labeled if labeled else None,
+        'topk': counts['topk'] / labeled if labeled else None
+    }
+
+
+def print_report(report):
+    """Print a human-readable summary of a benchmark report"""
+    print("\n" + "="*70)
+    print(f"CHATBOT REPLAY BENCHMARK ({report['scoring']} scoring)")
+    print("="*70)
+    peak_rss = f"{report['peak_rss_mb']:.1f} MB" if report['peak_rss_mb'] is not None else 'n/a'
+    print(f"Queries: {report['queries']} x {report['repeat']}   "
+          f"Throughput: {report['throughput_qps']:.1f} q/s   Peak RSS: {peak_rss}")
+    print(f"\n{'type':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'top-1':>8}{'top-k':>8}")
+    for input_type, stats in report['latency_ms'].items():
+        acc = report['accuracy'].get(input_type, {})
+        top1 = f"{acc['top1']:.2f}" if acc.get('top1') is not None else '-'
+        topk = f"{acc['topk']:.2f}" if acc.get('topk') is not None else '-'
+        print(f"{input_type:<12}{stats['count']:>8}{stats['p50']:>10.2f}{stats['p95']:>10.2f}"
+              f"{stats['p99']:>10.2f}{top1:>8}{topk:>8}")
+    print("="*70)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay labeled queries through the CureHelp+ chatbot")
+    parser.add_argument('queries', help="JSONL file of labeled queries")
+    parser.add_argument('--output', '-o', help="Write the JSON report to this file")
+    parser.add_argument('--zip', default='chatdata.zip', help="Chatbot dataset archive (default: chatdata.zip)")
+    parser.add_argument('--top-k', type=int, default=5, help="k for top-k accuracy (default: 5)")
+    parser.add_argument('--repeat', type=int, default=1, help="Replay the query file this many times")
+    parser.add_argument('--scoring', choices=['cosine', 'bayes', 'both'], default='cosine',
+                        help="Disease scoring for symptom queries; 'both' benchmarks them side by side")
+    parser.add_argument('--use-cache', action='store_true',
+                        help="Serve repeats from the shared response cache instead of measuring cold lookups")
+    args = parser.parse_args(argv)
+
+    from chatbot_engine import read_datasets, get_kb_version
+    from knowledge_base import KnowledgeBase
+
+    datasets = read_datasets(args.zip)
+    if datasets[0] is None:
+        print(f"Could not load datasets from {args.zip}")
+        return 1
+
+    kb_version = get_kb_version(args.zip) if args.use_cache else None
+    kb = KnowledgeBase(*datasets, version=kb_version)
+    queries = load_queries(args.queries)
+    methods = ['cosine', 'bayes'] if args.scoring == 'both' else [args.scoring]
+    reports = {}
+    for method in methods:
+        reports[method] = replay(queries, kb, top_k=args.top_k, repeat=args.repeat, scoring=method)
+        print_report(reports[method])
+    report = reports if args.scoring == 'both' else reports[args.scoring]
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+Shared helpers for the CureHelp+ unit tests
+"""
+
+import os
+import unittest
+
+# Wall-clock comparisons depend on the machine and its load, so they only run on request
+benchmark = unittest.skipUnless(os.environ.get('CUREHELP_BENCHMARKS') == '1',
+                                "timing benchmark; set CUREHELP_BENCHMARKS=1 to run it")
+
+
+def make_profile(number, **fields):
+    """Build a minimal patient profile with the user_NNN id for `number`"""
+    profile = {'id': f"user_{number:03d}", 'name': f"Patient {number}", 'age': 30 + number, 'predictions': {}}
+    profile.update(fields)
+    return profile
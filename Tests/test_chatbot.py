@@ -15,7 +15,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from chatbot import (
     classify_input_type,
     clean_dataframe,
-    preprocess_datasets
+    preprocess_datasets,
+    predict_disease_from_symptoms,
+    process_user_input,
+    response_cache
 )
 
 
@@ -308,6 +311,64 @@ class TestChatbotSymptomMatching(unittest.TestCase):
         self.assertEqual(symptoms_list[0], 'fever')
 
 
+class TestChatbotSymptomPrediction(unittest.TestCase):
+    """Test disease prediction from free-typed symptoms"""
+    
+    def setUp(self):
+        self.augmented_df = pd.DataFrame({
+            'diseases': ['malaria', 'migraine', 'common cold'],
+            'fever': [1, 0, 1],
+            'headache': [1, 1, 0],
+            'vomiting': [1, 1, 0],
+            'runny_nose': [0, 0, 1],
+            'cough': [0, 0, 1]
+        })
+    
+    def test_prediction_with_misspelt_symptoms(self):
+        """Test that typos still produce a prediction"""
+        prediction = predict_disease_from_symptoms(['feaver', 'headahce', 'vomitting'], self.augmented_df)
+        
+        self.assertIsNotNone(prediction)
+        self.assertEqual(prediction[0], 'malaria')
+        self.assertAlmostEqual(prediction[1], 1.0)
+    
+    def test_prediction_with_no_recognised_symptoms(self):
+        """Test that an all-unknown query does not return an arbitrary disease"""
+        prediction = predict_disease_from_symptoms(['xylophone'], self.augmented_df)
+        self.assertIsNone(prediction)
+    
+    def test_response_reports_unresolved_symptoms(self):
+        """Test that unresolved symptoms are reported in the response"""
+        response = process_user_input('runny nose, cough, xylophone', None, None, None, self.augmented_df)
+        
+        self.assertEqual(response['type'], 'symptoms')
+        self.assertEqual(response['disease'], 'common cold')
+        self.assertEqual(response['unresolved_symptoms'], ['xylophone'])
+
+    
+    def test_misspelt_disease_name_resolves(self):
+        """Test that a misspelt disease name is resolved before lookups"""
+        response = process_user_input('malarria', None, None, None, self.augmented_df)
+        
+        self.assertEqual(response['type'], 'disease')
+        self.assertEqual(response['disease'], 'malaria')
+        self.assertEqual(response['candidates'][0][0], 'malaria')
+    
+    def test_versioned_queries_are_cached(self):
+        """Test that repeated queries are served from the shared cache per knowledge-base version"""
+        response_cache.clear()
+        
+        first = process_user_input('Fever,  headache', None, None, None, self.augmented_df, kb_version='v1')
+        second = process_user_input('fever, headache', None, None, None, self.augmented_df, kb_version='v1')
+        process_user_input('fever, headache', None, None, None, self.augmented_df, kb_version='v2')
+        
+        self.assertEqual(first, second)
+        stats = response_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        response_cache.clear()
+
+
 class TestChatbotEdgeCases(unittest.TestCase):
     """Test edge cases in chatbot functionality"""
     
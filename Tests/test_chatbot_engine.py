@@ -0,0 +1,277 @@
+"""
+Unit tests for chatbot_engine.py
+Tests the Streamlit-independent chatbot service: structured results and errors,
+thread-safe answering and batch answering
+"""
+
+import unittest
+import sys
+import os
+import subprocess
+import tempfile
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from zipfile import ZipFile
+
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot_engine import (ChatbotEngine, DATASET_FILES, answer_query, frame_knowledge_bases, get_disease_description,
+                            predict_disease_from_symptoms, process_user_input, read_datasets, response_cache)
+from knowledge_base import KnowledgeBase, LayeredKnowledgeBase
+from response_cache import ResponseCache
+
+
+def write_archive(zip_path, skip=()):
+    """Write a small chatbot dataset archive, leaving out the named datasets"""
+    frames = {
+        'precautions': pd.DataFrame({
+            'Disease': ['Malaria', 'Migraine'],
+            'Precaution_1': ['Use mosquito nets', 'Rest in a dark room']
+        }),
+        'symptoms': pd.DataFrame({
+            'Disease': ['Malaria', 'Migraine'],
+            'Symptom_1': ['chills', 'headache']
+        }),
+        'faq': pd.DataFrame({
+            'question': ['What is Malaria?', 'What is Migraine?'],
+            'answer': ['A mosquito-borne disease.', 'A recurring headache.']
+        }),
+        'augmented': pd.DataFrame({
+            'diseases': ['malaria', 'migraine', 'common cold'],
+            'fever': [1, 0, 1],
+            'headache': [1, 1, 0],
+            'vomiting': [1, 1, 0],
+            'cough': [0, 0, 1]
+        })
+    }
+    with ZipFile(zip_path, 'w') as z:
+        for name, file_name in DATASET_FILES.items():
+            if name not in skip:
+                z.writestr(file_name, frames[name].to_csv(index=False))
+
+
+class TestChatbotEngine(unittest.TestCase):
+    """Test cases for answering through the engine"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.zip_path = os.path.join(self.test_dir, 'chatdata.zip')
+        write_archive(self.zip_path)
+        self.engine = ChatbotEngine(self.zip_path, index_path=None, cache=ResponseCache())
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def test_engine_does_not_import_streamlit(self):
+        """Test that the engine can be used without Streamlit"""
+        code = "import sys, chatbot_engine; print('streamlit' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(result.stdout.strip(), 'False', result.stderr)
+    
+    def test_answer_returns_structured_result(self):
+        """Test that a symptom query is answered with a prediction and no error"""
+        response = self.engine.answer('fever, headache, vomiting')
+        self.assertEqual(response['type'], 'symptoms')
+        self.assertEqual(response['disease'], 'malaria')
+        self.assertEqual(response['precautions'], ['Use mosquito nets'])
+        self.assertIsNone(response['error'])
+    
+    def test_free_text_symptoms_are_predicted(self):
+        """Test that a free-text description is routed to symptom prediction"""
+        response = self.engine.answer('I have had a headache and high fever since Monday, also vomiting')
+        self.assertEqual(response['type'], 'symptoms')
+        self.assertEqual(response['disease'], 'malaria')
+        self.assertEqual(response['unresolved_symptoms'], [])
+        
+        # Questions still go to the FAQ
+        self.assertEqual(self.engine.answer('What is Migraine?')['type'], 'question')
+    
+    def test_bayes_scoring(self):
+        """Test that the naive-Bayes mode returns posterior probabilities as confidence"""
+        engine = ChatbotEngine(self.zip_path, index_path=None, cache=self.engine.cache, scoring='bayes')
+        response = engine.answer('fever, headache, vomiting')
+        self.assertEqual(response['disease'], 'malaria')
+        self.assertAlmostEqual(sum(score for _, score in response['candidates']), 1.0)
+        
+        # Both modes share a cache without serving each other's answers
+        self.assertNotEqual(self.engine.answer('fever, headache, vomiting')['confidence'], response['confidence'])
+        with self.assertRaises(ValueError):
+            ChatbotEngine(self.zip_path, scoring='euclidean')
+    
+    def test_symptom_query_suggests_next_symptoms(self):
+        """Test that a weak symptom query proposes symptoms that separate the candidates"""
+        response = self.engine.answer('fever, vomiting')
+        self.assertGreater(len(response['candidates']), 1)
+        self.assertTrue(response['suggested_symptoms'])
+        self.assertNotIn('fever', response['suggested_symptoms'])
+    
+    def test_missing_archive_is_a_structured_error(self):
+        """Test that an unreadable archive yields error records instead of exceptions"""
+        engine = ChatbotEngine(os.path.join(self.test_dir, 'missing.zip'), index_path=None, cache=ResponseCache())
+        response = engine.answer('what is malaria?')
+        self.assertEqual(response['error']['code'], 'knowledge_base_unavailable')
+        self.assertEqual(engine.load_errors[0]['code'], 'archive_unreadable')
+        self.assertIsNone(engine.answer('')['error'])
+    
+    def test_missing_dataset_is_reported(self):
+        """Test that a dataset missing from the archive is reported but the rest still load"""
+        errors = []
+        write_archive(self.zip_path, skip=('faq',))
+        precautions_df, _, faq_df, _ = read_datasets(self.zip_path, errors)
+        self.assertIsNotNone(precautions_df)
+        self.assertIsNone(faq_df)
+        self.assertEqual([error['code'] for error in errors], ['dataset_unreadable'])
+    
+    def test_answer_batch(self):
+        """Test that a batch is answered in order with duplicates computed once"""
+        queries = ['fever, headache, vomiting', 'What is Migraine?', 'Fever,  headache, vomiting', '']
+        responses = self.engine.answer_batch(queries)
+        
+        self.assertEqual(len(responses), len(queries))
+        self.assertEqual(responses[0]['disease'], 'malaria')
+        self.assertEqual(responses[1]['faq_answer'], 'A recurring headache.')
+        self.assertEqual(responses[2], responses[0])
+        self.assertIsNot(responses[2], responses[0])
+        self.assertIsNone(responses[3]['type'])
+        self.assertEqual(self.engine.cache.stats()['misses'], 2)
+    
+    def test_concurrent_answers(self):
+        """Test that concurrent callers share one knowledge base and get consistent answers"""
+        queries = ['fever, headache, vomiting', 'What is Malaria?', 'migraine', 'cough, fever'] * 25
+        expected = [ChatbotEngine(self.zip_path, index_path=None, cache=ResponseCache()).answer(q) for q in queries]
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            knowledge_bases = set(pool.map(lambda _: id(self.engine.knowledge_base()), range(16)))
+            responses = list(pool.map(self.engine.answer, queries))
+        
+        self.assertEqual(len(knowledge_bases), 1)
+        self.assertEqual(responses, expected)
+    
+    def test_rebuilds_when_archive_changes(self):
+        """Test that a changed archive is picked up on the next answer"""
+        first = self.engine.knowledge_base()
+        time.sleep(0.01)
+        write_archive(self.zip_path, skip=('faq',))
+        os.utime(self.zip_path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        
+        second = self.engine.knowledge_base()
+        self.assertIsNot(first, second)
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(second.faq_questions, ())
+
+
+class TestChatbotEngineDeltas(unittest.TestCase):
+    """Test cases for incremental knowledge-base updates"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.zip_path = os.path.join(self.test_dir, 'chatdata.zip')
+        write_archive(self.zip_path)
+        self.engine = ChatbotEngine(self.zip_path, index_path=None, cache=ResponseCache(), max_deltas=3)
+    
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+    
+    def write_delta(self, name, question, answer):
+        """Write a delta archive holding a single FAQ row"""
+        delta_path = os.path.join(self.test_dir, name)
+        with ZipFile(delta_path, 'w') as z:
+            z.writestr(DATASET_FILES['faq'], pd.DataFrame({'question': [question], 'answer': [answer]}).to_csv(index=False))
+        return delta_path
+    
+    def test_delta_is_answered_and_invalidates_cache(self):
+        """Test that a new FAQ row is served immediately and cached answers are not reused"""
+        before = self.engine.answer('Tell me about dengue fever')
+        self.assertIsNone(before['faq_answer'])
+        base_version = self.engine.knowledge_base().version
+        
+        result = self.engine.apply_delta(self.write_delta('delta1.zip', 'Tell me about dengue fever', 'A viral infection.'))
+        
+        self.assertEqual(result['errors'], [])
+        self.assertNotEqual(result['version'], base_version)
+        self.assertIsInstance(self.engine.knowledge_base(), LayeredKnowledgeBase)
+        self.assertEqual(self.engine.answer('Tell me about dengue fever')['faq_answer'], 'A viral infection.')
+    
+    def test_unreadable_delta_is_reported(self):
+        """Test that a broken delta leaves the knowledge base untouched"""
+        kb = self.engine.knowledge_base()
+        result = self.engine.apply_delta(os.path.join(self.test_dir, 'missing.zip'))
+        self.assertIsNone(result['version'])
+        self.assertEqual(result['errors'][0]['code'], 'delta_unreadable')
+        self.assertIs(self.engine.knowledge_base(), kb)
+    
+    def test_background_compaction(self):
+        """Test that deltas are compacted in the background without changing answers or version"""
+        self.engine.apply_delta(self.write_delta('delta1.zip', 'What is Dengue?', 'A viral infection.'))
+        self.engine.apply_delta(self.write_delta('delta2.zip', 'What is Typhoid?', 'A bacterial infection.'))
+        layered = self.engine.knowledge_base()
+        
+        # The third delta reaches max_deltas and starts compaction
+        self.engine.apply_delta(self.write_delta('delta3.zip', 'What is Cholera?', 'A water-borne infection.'))
+        version = self.engine.knowledge_base().version
+        thread = self.engine.compact()
+        if thread is not None:
+            thread.join(timeout=10)
+        
+        compacted = self.engine.knowledge_base()
+        self.assertIsInstance(compacted, KnowledgeBase)
+        self.assertEqual(compacted.version, version)
+        self.assertEqual(len(compacted.faq_questions), len(layered.faq_questions) + 1)
+        self.assertEqual(self.engine.answer('What is Typhoid?')['faq_answer'], 'A bacterial infection.')
+        self.assertEqual(self.engine.answer('fever, headache, vomiting')['disease'], 'malaria')
+
+
+class TestDataFrameHelpers(unittest.TestCase):
+    """Test cases for the legacy DataFrame-level helpers"""
+
+    def setUp(self):
+        frame_knowledge_bases.clear()
+        self.addCleanup(frame_knowledge_bases.clear)
+        response_cache.clear()
+        self.addCleanup(response_cache.clear)
+        self.faq_df = pd.DataFrame({'question': ['What is Malaria?'], 'answer': ['A mosquito-borne disease.']})
+        self.augmented_df = pd.DataFrame({'diseases': ['malaria', 'migraine'], 'fever': [1, 0], 'headache': [1, 1]})
+
+    def test_knowledge_base_is_built_once_per_dataframe(self):
+        """Test that repeated helper calls reuse one knowledge base until other DataFrames are passed"""
+        with mock.patch('chatbot_engine.KnowledgeBase', wraps=KnowledgeBase) as build:
+            for _ in range(3):
+                self.assertEqual(get_disease_description('malaria', self.faq_df), 'A mosquito-borne disease.')
+                self.assertEqual(predict_disease_from_symptoms(['fever'], self.augmented_df)[0], 'malaria')
+            self.assertEqual(build.call_count, 2)
+            get_disease_description('malaria', self.faq_df.copy())
+            self.assertEqual(build.call_count, 3)
+
+    def test_unversioned_queries_use_the_response_cache(self):
+        """Test that ad hoc datasets get a version of their own, so repeated queries hit the cache"""
+        first = process_user_input('fever, headache', None, None, None, self.augmented_df)
+        second = process_user_input('Fever,  headache', None, None, None, self.augmented_df)
+        self.assertEqual(first, second)
+        self.assertEqual(response_cache.stats()['hits'], 1)
+        other = self.augmented_df.copy()
+        process_user_input('fever, headache', None, None, None, other)
+        self.assertEqual(response_cache.stats()['misses'], 2)
+
+    def test_caller_built_knowledge_base_without_version_bypasses_the_cache(self):
+        """Test that answer_query does not cache answers from a knowledge base with no version"""
+        kb = KnowledgeBase(augmented_df=self.augmented_df)
+        answer_query('fever, headache', kb)
+        answer_query('fever, headache', kb)
+        self.assertEqual(response_cache.stats()['size'], 0)
+
+    def test_cache_is_bounded(self):
+        """Test that only the most recently used knowledge bases are kept"""
+        frames = [self.faq_df.copy() for _ in range(frame_knowledge_bases.maxsize + 2)]
+        for faq_df in frames:
+            get_disease_description('malaria', faq_df)
+        self.assertEqual(len(frame_knowledge_bases._entries), frame_knowledge_bases.maxsize)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit tests for chatbot_replay.py
+Tests latency summaries, accuracy scoring and the replay report structure
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from knowledge_base import KnowledgeBase
+from chatbot_replay import (
+    load_queries,
+    summarize_latencies,
+    score_response,
+    replay
+)
+
+
+class TestReplayMetrics(unittest.TestCase):
+    """Test cases for latency and accuracy metrics"""
+    
+    def test_summarize_latencies(self):
+        """Test percentile summary of latencies"""
+        summary = summarize_latencies(list(range(1, 101)))
+        
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['p50'], 50.5)
+        self.assertAlmostEqual(summary['mean'], 50.5)
+        self.assertGreater(summary['p99'], summary['p95'])
+    
+    def test_summarize_empty_latencies(self):
+        """Test summary of an empty latency list"""
+        self.assertEqual(summarize_latencies([])['count'], 0)
+    
+    def test_score_response_top1_and_topk(self):
+        """Test top-1 and top-k hits against ranked candidates"""
+        response = {
+            'disease': 'Malaria',
+            'candidates': [('Malaria', 0.9), ('Dengue', 0.8), ('Typhoid', 0.7)],
+            'faq_question': None
+        }
+        
+        self.assertEqual(score_response(response, 'malaria', 2), (True, True))
+        self.assertEqual(score_response(response, 'dengue', 2), (False, True))
+        self.assertEqual(score_response(response, 'typhoid', 2), (False, False))
+    
+    def test_score_empty_response(self):
+        """Test that an empty response is a miss"""
+        self.assertEqual(score_response({'disease': None}, 'malaria', 5), (False, False))
+
+
+class TestReplayRun(unittest.TestCase):
+    """Test cases for replaying a query file"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.queries_file = os.path.join(self.test_dir, 'queries.jsonl')
+        with open(self.queries_file, 'w') as f:
+            f.write(json.dumps({'query': 'fever, headache', 'type': 'symptoms', 'expected': 'malaria'}) + '\n')
+            f.write('\n')
+            f.write(json.dumps({'query': 'runny nose, cough', 'type': 'symptoms', 'expected': 'common cold'}) + '\n')
+            f.write(json.dumps({'query': 'malarria', 'type': 'disease', 'expected': 'malaria'}) + '\n')
+        
+        self.augmented_df = pd.DataFrame({
+            'diseases': ['malaria', 'migraine', 'common cold'],
+            'fever': [1, 0, 1],
+            'headache': [1, 1, 0],
+            'runny_nose': [0, 0, 1],
+            'cough': [0, 0, 1]
+        })
+    
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_load_queries_skips_blank_lines(self):
+        """Test that blank lines are ignored"""
+        self.assertEqual(len(load_queries(self.queries_file)), 3)
+    
+    def test_replay_report(self):
+        """Test that a replay reports latency, throughput and accuracy per type"""
+        queries = load_queries(self.queries_file)
+        report = replay(queries, KnowledgeBase(augmented_df=self.augmented_df), repeat=2)
+        
+        self.assertEqual(report['latency_ms']['symptoms']['count'], 4)
+        self.assertEqual(report['latency_ms']['disease']['count'], 2)
+        self.assertEqual(report['latency_ms']['all']['count'], 6)
+        self.assertGreater(report['throughput_qps'], 0)
+        self.assertEqual(report['accuracy']['symptoms']['top1'], 1.0)
+        self.assertEqual(report['accuracy']['all']['labeled'], 6)
+        
+        # The report must be JSON serializable so runs can be compared
+        json.dumps(report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,299 @@
+"""
+Unit tests for kb_bundle.py and build_kb.py
+Tests writing the knowledge base to a single versioned bundle and loading it
+back with one read or a memory map
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import shutil
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import chatbot_engine
+import knowledge_base
+from build_kb import build_bundle
+from chatbot_engine import ChatbotEngine
+from kb_bundle import StringTable, load_bundle, read_manifest, write_bundle
+from knowledge_base import KnowledgeBase, LayeredKnowledgeBase
+from semantic_index import SemanticFAQIndex
+from test_chatbot_engine import write_archive
+from test_knowledge_base import make_datasets
+
+
+def plain_ranking(ranked):
+    """Turn (disease, score, vector) triples into comparable tuples"""
+    return [(disease, score, np.asarray(vector).tolist()) for disease, score, vector in ranked]
+
+
+class TestKnowledgeBaseBundle(unittest.TestCase):
+    """Test cases for bundle round trips"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'kb.bundle')
+        datasets = make_datasets()
+        index = SemanticFAQIndex.build(datasets[2]['question'].tolist(), n_components=2)
+        self.kb = KnowledgeBase(*datasets, version='v1', semantic_index=index)
+        self.manifest = write_bundle(self.kb, self.path, source={'path': 'chatdata.zip', 'version': 'v1'})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def assert_same_answers(self, kb):
+        """Check that a loaded knowledge base answers exactly like the original"""
+        for symptoms in (['fever', 'headache'], ['vomiting'], ['cough', 'runny nose'], ['unknown']):
+            self.assertEqual(plain_ranking(kb.rank_diseases(symptoms)), plain_ranking(self.kb.rank_diseases(symptoms)))
+            self.assertEqual(plain_ranking(kb.rank_diseases_bayes(symptoms)),
+                             plain_ranking(self.kb.rank_diseases_bayes(symptoms)))
+        self.assertEqual(kb.suggest_symptoms(['fever'], [('malaria', 0.8), ('common cold', 0.6)]),
+                         self.kb.suggest_symptoms(['fever'], [('malaria', 0.8), ('common cold', 0.6)]))
+        for disease in ('malaria', 'Migraine', 'typhoid', 'common cold'):
+            self.assertEqual(kb.symptoms_for(disease), self.kb.symptoms_for(disease))
+            self.assertEqual(kb.precautions_for(disease), self.kb.precautions_for(disease))
+            self.assertEqual(kb.description_for(disease), self.kb.description_for(disease))
+        for question in ('What is typhoid?', 'malaria symptoms', 'how to treat malaria'):
+            self.assertEqual(kb.find_faq(question), self.kb.find_faq(question))
+        self.assertEqual(kb.match_disease('migrane'), self.kb.match_disease('migrane'))
+        self.assertEqual(kb.extract_symptoms('fever and headache but no cough'),
+                         self.kb.extract_symptoms('fever and headache but no cough'))
+
+    def test_round_trip_answers_like_original(self):
+        """Test that a bundle loaded with one read answers like the knowledge base it was built from"""
+        kb = load_bundle(self.path)
+        self.assert_same_answers(kb)
+        self.assertIsNotNone(kb.semantic_index)
+        self.assertEqual(kb.faq_questions, self.kb.faq_questions)
+        self.assertEqual(kb.symptom_columns, self.kb.symptom_columns)
+        self.assertEqual(kb.disease_names, self.kb.disease_names)
+        self.assertEqual(dict(kb.faq_alternates), dict(self.kb.faq_alternates))
+
+    def test_memory_mapped_load(self):
+        """Test that a memory-mapped bundle answers the same and exposes read-only arrays"""
+        kb = load_bundle(self.path, use_mmap=True)
+        self.assert_same_answers(kb)
+        np.testing.assert_array_equal(kb.symptom_matrix.toarray(), self.kb.symptom_matrix.toarray())
+        np.testing.assert_array_equal(kb.semantic_index.embeddings, self.kb.semantic_index.embeddings)
+        with self.assertRaises(ValueError):
+            kb.symptom_matrix.data[0] = 5
+        with self.assertRaises(ValueError):
+            kb._log_likelihoods[0, 0] = 0
+        with self.assertRaises(AttributeError):
+            kb.version = 'v2'
+
+    def test_manifest_versions_and_checksum(self):
+        """Test that the manifest records a content-derived version, the source and every array"""
+        manifest = read_manifest(self.path)
+        self.assertEqual(manifest, json.loads(json.dumps(self.manifest)))
+        self.assertEqual(manifest['kb_version'], 'bundle-' + manifest['checksum']['value'][:16])
+        self.assertEqual(manifest['source'], {'path': 'chatdata.zip', 'version': 'v1'})
+        self.assertEqual(manifest['faq']['entries'], len(self.kb.faq_questions))
+        self.assertIn('kb/symptom_matrix.data', manifest['arrays'])
+        self.assertIn('semantic_index/embeddings', manifest['arrays'])
+        self.assertEqual(load_bundle(self.path).version, manifest['kb_version'])
+        self.assertEqual(load_bundle(self.path, version='custom').version, 'custom')
+
+    def test_arrays_are_aligned(self):
+        """Test that every array starts on a 64-byte boundary"""
+        kb = load_bundle(self.path, use_mmap=True)
+        for entry in read_manifest(self.path)['arrays'].values():
+            self.assertEqual(entry['offset'] % 64, 0)
+        self.assertEqual(kb.semantic_index.components.ctypes.data % 64, 0)
+
+    def test_mapped_state_is_not_copied(self):
+        """Test that mapped arrays and FAQ answers are views of the file rather than per-process copies"""
+        kb = load_bundle(self.path, use_mmap=True)
+        self.assertIsInstance(kb.faq_answers, StringTable)
+        self.assertEqual(list(kb.faq_answers), list(self.kb.faq_answers))
+        for array in (kb.symptom_matrix.data, kb.symptom_matrix.indices, kb._log_likelihoods,
+                      kb.semantic_index.embeddings, kb.semantic_index.components):
+            self.assertFalse(array.flags.owndata)
+            self.assertFalse(array.flags.writeable)
+
+    def test_same_content_gives_same_version(self):
+        """Test that rebuilding identical content yields the same bundle version"""
+        other = os.path.join(self.test_dir, 'other.bundle')
+        manifest = write_bundle(self.kb, other, source={'path': 'chatdata.zip', 'version': 'v1'})
+        self.assertEqual(manifest['kb_version'], self.manifest['kb_version'])
+
+    def test_corruption_is_detected(self):
+        """Test that a flipped payload byte fails the checksum"""
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        with self.assertRaises(ValueError):
+            load_bundle(self.path)
+        with self.assertRaises(ValueError):
+            load_bundle(self.path, use_mmap=True)
+
+    def test_truncated_and_foreign_files_are_rejected(self):
+        """Test that truncated bundles and other files raise ValueError"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        with self.assertRaises(ValueError):
+            load_bundle(self.path)
+
+        with open(self.path, 'wb') as f:
+            f.write(b'not a bundle at all')
+        with self.assertRaises(ValueError):
+            load_bundle(self.path)
+
+    def test_faq_alternates_round_trip(self):
+        """Test that collapsed FAQ questions stay linked to their canonical entry"""
+        _, _, faq_df, _ = make_datasets()
+        faq_df = pd.concat([faq_df, pd.DataFrame({'question': ['what is typhoid'], 'answer': ['A  bacterial infection.']})])
+        kb = KnowledgeBase(faq_df=faq_df)
+        write_bundle(kb, self.path)
+        self.assertEqual(dict(load_bundle(self.path).faq_alternates), {0: ('what is typhoid',)})
+        self.assertEqual(read_manifest(self.path)['faq']['collapsed'], 1)
+
+    def test_layered_knowledge_base_is_compacted(self):
+        """Test that writing a layered knowledge base bundles its merged form"""
+        precautions_df, symptoms_df, faq_df, augmented_df = make_datasets()
+        base = KnowledgeBase(precautions_df, symptoms_df, faq_df, augmented_df.iloc[:3])
+        layered = LayeredKnowledgeBase(base, (KnowledgeBase(augmented_df=augmented_df.iloc[3:]),))
+        write_bundle(layered, self.path)
+        kb = load_bundle(self.path)
+        self.assertEqual(plain_ranking(kb.rank_diseases(['fever', 'vomiting'])),
+                         plain_ranking(layered.rank_diseases(['fever', 'vomiting'])))
+        self.assertEqual(kb.symptoms_for('malaria'), layered.symptoms_for('malaria'))
+
+    def test_empty_knowledge_base(self):
+        """Test that an empty knowledge base round-trips"""
+        write_bundle(KnowledgeBase(), self.path)
+        kb = load_bundle(self.path, use_mmap=True)
+        self.assertEqual(kb.rank_diseases(['fever']), [])
+        self.assertIsNone(kb.find_faq('anything'))
+
+
+class TestStringTable(unittest.TestCase):
+    """Test cases for the bundle's string table"""
+
+    def test_indexing(self):
+        """Test element access, negative indexes, slices and bounds"""
+        table = StringTable.encode(['fever', '', 'naïve answer', 'last'])
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table[0], 'fever')
+        self.assertEqual(table[1], '')
+        self.assertEqual(table[2], 'naïve answer')
+        self.assertEqual(table[-1], 'last')
+        self.assertEqual(table[1:3], ['', 'naïve answer'])
+        with self.assertRaises(IndexError):
+            table[4]
+
+    def test_empty_table(self):
+        """Test that an empty table has no entries"""
+        self.assertEqual(list(StringTable.encode([])), [])
+
+
+class TestBundleStartup(unittest.TestCase):
+    """Test cases for building bundles and loading them in the engine"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.zip_path = os.path.join(self.test_dir, 'chatdata.zip')
+        self.bundle_path = os.path.join(self.test_dir, 'kb.bundle')
+        write_archive(self.zip_path)
+        self.manifest = build_bundle(self.zip_path, self.bundle_path, index_path=None, semantic=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_build_records_source_archive(self):
+        """Test that the build command records the archive it was built from"""
+        self.assertEqual(self.manifest['source']['path'], 'chatdata.zip')
+        self.assertEqual(self.manifest['source']['version'], chatbot_engine.get_kb_version(self.zip_path))
+
+    def test_build_collapses_the_faq_once(self):
+        """Test that the semantic index covers the knowledge base's FAQ without a second collapsing pass"""
+        with mock.patch('knowledge_base.collapse_near_duplicates',
+                        wraps=knowledge_base.collapse_near_duplicates) as collapse:
+            build_bundle(self.zip_path, self.bundle_path, index_path=None, components=2)
+        collapse.assert_called_once()
+        kb = load_bundle(self.bundle_path)
+        self.assertTrue(kb.semantic_index.matches(list(kb.faq_questions)))
+
+    def test_engine_starts_from_bundle_without_parsing_csvs(self):
+        """Test that the engine loads the bundle and never reads the archive"""
+        engine = ChatbotEngine(self.zip_path, index_path=None, bundle_path=self.bundle_path)
+        with mock.patch.object(chatbot_engine, 'read_datasets', side_effect=AssertionError("CSV parsed")):
+            response = engine.answer('fever, headache, vomiting')
+        self.assertEqual(response['disease'].lower(), 'malaria')
+        self.assertEqual(engine.load_errors, [])
+
+    def test_engine_falls_back_when_archive_is_newer(self):
+        """Test that an archive changed after the build is parsed instead of the stale bundle"""
+        later = time.time() + 10
+        os.utime(self.zip_path, (later, later))
+        engine = ChatbotEngine(self.zip_path, index_path=None, bundle_path=self.bundle_path)
+        with mock.patch.object(chatbot_engine, 'read_datasets', wraps=chatbot_engine.read_datasets) as read:
+            engine.knowledge_base()
+        read.assert_called_once()
+
+    def test_engine_reports_unreadable_bundle(self):
+        """Test that a corrupt bundle is reported and the archive is used instead"""
+        with open(self.bundle_path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        engine = ChatbotEngine(self.zip_path, index_path=None, bundle_path=self.bundle_path, publish_bundle=True)
+        response = engine.answer('fever, headache, vomiting')
+        self.assertEqual(response['disease'].lower(), 'malaria')
+        self.assertEqual([error['code'] for error in engine.load_errors], ['bundle_unreadable'])
+        # The rebuilt knowledge base replaces the corrupt bundle
+        load_bundle(self.bundle_path)
+
+    def test_engine_does_not_publish_by_default(self):
+        """Test that the running app leaves writing the bundle to build_kb.py unless publishing is enabled"""
+        os.remove(self.bundle_path)
+        engine = ChatbotEngine(self.zip_path, index_path=None, bundle_path=self.bundle_path)
+        self.assertEqual(engine.answer('fever, headache, vomiting')['disease'].lower(), 'malaria')
+        self.assertFalse(os.path.exists(self.bundle_path))
+
+    def test_first_engine_publishes_bundle_for_other_processes(self):
+        """Test that an engine allowed to publish writes a bundle that later replicas attach to"""
+        os.remove(self.bundle_path)
+        first = ChatbotEngine(self.zip_path, index_path=None, bundle_path=self.bundle_path, publish_bundle=True)
+        kb = first.knowledge_base()
+        self.assertTrue(os.path.exists(self.bundle_path))
+        self.assertFalse(kb.symptom_matrix.data.flags.owndata)
+        # Publishing does not trigger a second load on the next call
+        self.assertIs(first.knowledge_base(), kb)
+
+        second = ChatbotEngine(self.zip_path, index_path=None, bundle_path=self.bundle_path)
+        with mock.patch.object(chatbot_engine, 'read_datasets', side_effect=AssertionError("CSV parsed")):
+            response = second.answer('fever, headache, vomiting')
+        self.assertEqual(response['disease'].lower(), 'malaria')
+        self.assertEqual(second.knowledge_base().version, kb.version)
+
+    def test_unwritable_bundle_path_is_logged(self):
+        """Test that failing to publish keeps the in-memory knowledge base and logs why, without a user-facing error"""
+        blocker = os.path.join(self.test_dir, 'not_a_directory')
+        with open(blocker, 'w') as f:
+            f.write('file')
+        engine = ChatbotEngine(self.zip_path, index_path=None, bundle_path=os.path.join(blocker, 'kb.bundle'),
+                               publish_bundle=True)
+        with self.assertLogs('chatbot_engine', level='WARNING') as logs:
+            response = engine.answer('fever, headache, vomiting')
+        self.assertEqual(response['disease'].lower(), 'malaria')
+        self.assertEqual(engine.load_errors, [])
+        self.assertIn('Could not publish', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,348 @@
+"""
+Unit tests for knowledge_base.py
+Tests the once-built, read-only chatbot knowledge base
+"""
+
+import unittest
+import sys
+import os
+import pandas as pd
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_base import KnowledgeBase, LayeredKnowledgeBase, faq_collapse_report
+from semantic_index import SemanticFAQIndex
+
+
+def make_datasets():
+    """Build small versions of the four chatbot datasets"""
+    precautions_df = pd.DataFrame({
+        'Disease': ['Malaria', 'Migraine ', 'Malaria'],
+        'Precaution_1': ['Use mosquito nets', 'Rest in a dark room', 'duplicate row'],
+        'Precaution_2': ['Consult a doctor', None, None]
+    })
+    symptoms_df = pd.DataFrame({
+        'Disease': ['Malaria', 'Typhoid'],
+        'Symptom_1': ['chills', 'high fever'],
+        'Symptom_2': ['vomiting', None]
+    })
+    faq_df = pd.DataFrame({
+        'question': ['What is Typhoid?', 'What are the symptoms of Malaria?', 'What is malaria treatment?'],
+        'answer': ['A bacterial infection.', 'Fever and chills.', 'Antimalarial drugs.']
+    })
+    augmented_df = pd.DataFrame({
+        'diseases': ['migraine', 'malaria', 'common cold', 'malaria', 'migraine'],
+        'fever': [0, 1, 1, 1, 0],
+        'headache': [1, 1, 0, 0, 1],
+        'vomiting': [1, 0, 0, 1, 0],
+        'runny_nose': [0, 0, 1, 0, 0],
+        'cough': [0, 0, 1, 0, 0]
+    })
+    return precautions_df, symptoms_df, faq_df, augmented_df
+
+
+class TestKnowledgeBaseBuild(unittest.TestCase):
+    """Test cases for building the knowledge base"""
+    
+    def setUp(self):
+        self.datasets = make_datasets()
+        self.kb = KnowledgeBase(*self.datasets, version='v1')
+    
+    def test_knowledge_base_is_read_only(self):
+        """Test that attributes and arrays cannot be modified after construction"""
+        with self.assertRaises(AttributeError):
+            self.kb.version = 'v2'
+        with self.assertRaises(TypeError):
+            self.kb.precautions['malaria'] = ()
+        with self.assertRaises(ValueError):
+            self.kb.symptom_matrix.data[0] = 5
+    
+    def test_source_dataframes_are_not_modified(self):
+        """Test that building does not add clean columns to the input frames"""
+        precautions_df, _, faq_df, augmented_df = self.datasets
+        self.assertNotIn('Disease_clean', precautions_df.columns)
+        self.assertNotIn('question_clean', faq_df.columns)
+        self.assertNotIn('diseases_clean', augmented_df.columns)
+    
+    def test_disease_names_span_all_datasets(self):
+        """Test that the disease index covers every dataset"""
+        self.assertEqual(self.kb.match_disease('typhoid')[0][0], 'Typhoid')
+        self.assertEqual(self.kb.match_disease('common cold')[0][0], 'common cold')
+        self.assertEqual(self.kb.match_disease('migrane')[0][0].lower(), 'migraine')
+    
+    def test_empty_knowledge_base(self):
+        """Test that an empty knowledge base answers nothing without errors"""
+        kb = KnowledgeBase()
+        self.assertEqual(kb.rank_diseases(['fever']), [])
+        self.assertEqual(kb.symptoms_for('malaria'), [])
+        self.assertEqual(kb.precautions_for('malaria'), [])
+        self.assertIsNone(kb.description_for('malaria'))
+        self.assertIsNone(kb.find_faq('what is malaria'))
+
+
+class TestKnowledgeBaseQueries(unittest.TestCase):
+    """Test cases for knowledge base lookups"""
+    
+    def setUp(self):
+        self.datasets = make_datasets()
+        self.kb = KnowledgeBase(*self.datasets)
+    
+    def test_rank_matches_dense_cosine_argmax(self):
+        """Test that the sparse ranking agrees with a dense cosine argmax over all rows"""
+        augmented_df = self.datasets[3]
+        columns = [col for col in augmented_df.columns if col != 'diseases']
+        matrix = augmented_df[columns].values.astype(float)
+        
+        for symptoms in (['fever'], ['headache'], ['fever', 'vomiting'], ['cough', 'fever']):
+            query = np.array([[1.0 if col in symptoms else 0.0 for col in columns]])
+            scores = cosine_similarity(query, matrix)[0]
+            best_row = int(np.argmax(scores))
+            
+            disease, score, vector = self.kb.rank_diseases(symptoms, top_k=1)[0]
+            self.assertEqual(disease, augmented_df['diseases'].iloc[best_row], symptoms)
+            self.assertAlmostEqual(score, scores[best_row])
+            np.testing.assert_array_equal(vector, matrix[best_row])
+    
+    def test_rank_returns_distinct_diseases(self):
+        """Test that each disease appears once in the ranking"""
+        ranked = self.kb.rank_diseases(['fever', 'headache'], top_k=5)
+        diseases = [disease for disease, _, _ in ranked]
+        
+        self.assertEqual(len(diseases), len(set(diseases)))
+        self.assertEqual(diseases[0], 'malaria')
+    
+    def test_symptoms_for_prefers_augmented_first_row(self):
+        """Test symptom lookup from the augmented dataset and fallback"""
+        self.assertEqual(self.kb.symptoms_for('Migraine'), ['headache', 'vomiting'])
+        self.assertEqual(self.kb.symptoms_for('common cold'), ['fever', 'runny nose', 'cough'])
+        self.assertEqual(self.kb.symptoms_for('typhoid'), ['high fever'])
+        self.assertEqual(self.kb.symptoms_for('unknown'), [])
+    
+    def test_precautions_for(self):
+        """Test precaution lookup from the first row of a disease"""
+        self.assertEqual(self.kb.precautions_for('malaria'), ['Use mosquito nets', 'Consult a doctor'])
+        self.assertEqual(self.kb.precautions_for('MIGRAINE'), ['Rest in a dark room'])
+    
+    def test_description_for(self):
+        """Test that the first FAQ question mentioning a disease is used"""
+        self.assertEqual(self.kb.description_for('Malaria'), 'Fever and chills.')
+        self.assertIsNone(self.kb.description_for('migraine'))
+    
+    def test_find_faq(self):
+        """Test FAQ matching by word overlap"""
+        match = self.kb.find_faq('what is typhoid?')
+        self.assertEqual(match['answer'], 'A bacterial infection.')
+        self.assertIsNone(self.kb.find_faq('zzz'))
+    
+    def test_rank_diseases_bayes(self):
+        """Test naive-Bayes ranking with smoothed likelihoods and priors"""
+        ranked = self.kb.rank_diseases_bayes(['fever', 'runny nose'], top_k=3)
+        self.assertEqual(ranked[0][0], 'common cold')
+        self.assertAlmostEqual(sum(probability for _, probability, _ in ranked), 1.0)
+        
+        # Unseen symptoms are smoothed rather than ruling a disease out
+        self.assertGreater(ranked[-1][1], 0)
+        columns = self.kb.symptom_resolver.column_index
+        np.testing.assert_allclose(ranked[0][2][columns['fever']], 1.0)
+        self.assertEqual(self.kb.rank_diseases_bayes(['xylophone']), [])
+    
+    def test_symptom_statistics(self):
+        """Test per-disease symptom counts and the co-occurrence matrix"""
+        columns = self.kb.symptom_resolver.column_index
+        counts = self.kb.group_symptom_counts.toarray()
+        malaria = self.kb.group_diseases.index('malaria')
+        self.assertEqual(counts[malaria, columns['fever']], 2)
+        self.assertEqual(counts[malaria, columns['headache']], 1)
+        
+        cooccurrence = self.kb.symptom_cooccurrence.toarray()
+        self.assertEqual(cooccurrence[columns['fever'], columns['fever']], 3)
+        self.assertEqual(cooccurrence[columns['headache'], columns['vomiting']], 1)
+        self.assertEqual(cooccurrence[columns['cough'], columns['headache']], 0)
+    
+    def test_suggest_symptoms_separates_candidates(self):
+        """Test that suggestions split the top candidates and skip reported symptoms"""
+        candidates = [(disease, score) for disease, score, _ in self.kb.rank_diseases(['fever'])]
+        suggestions = self.kb.suggest_symptoms(['fever'], candidates)
+        
+        self.assertTrue(suggestions)
+        self.assertNotIn('fever', suggestions)
+        # Symptoms only the common cold has split it from malaria best
+        self.assertIn(suggestions[0], ['runny nose', 'cough'])
+        self.assertEqual(self.kb.suggest_symptoms(['fever'], candidates[:1]), [])
+
+
+class TestKnowledgeBaseSemanticFAQ(unittest.TestCase):
+    """Test cases for semantic FAQ retrieval through the knowledge base"""
+    
+    def setUp(self):
+        self.faq_df = pd.DataFrame({
+            'question': ['What is diabetes?', 'How does diabetes raise blood sugar?',
+                         'What is asthma?', 'How is asthma treated with an inhaler?'],
+            'answer': ['A metabolic disease.', 'Insulin problems.', 'A lung disease.', 'With an inhaler.']
+        })
+        self.index = SemanticFAQIndex.build(self.faq_df['question'].tolist(), n_components=3)
+    
+    def test_semantic_index_finds_paraphrase(self):
+        """Test that a paraphrase with weak word overlap reaches the right answer"""
+        kb = KnowledgeBase(faq_df=self.faq_df, semantic_index=self.index)
+        match = kb.find_faq('my blood sugar keeps going up')
+        self.assertIsNotNone(match)
+        self.assertIn('diabetes', match['question'].lower())
+    
+    def test_lexical_match_without_index(self):
+        """Test that the lexical matcher is unchanged when no index is attached"""
+        kb = KnowledgeBase(faq_df=self.faq_df)
+        self.assertIsNone(kb.semantic_index)
+        self.assertEqual(kb.find_faq('what is asthma?')['answer'], 'A lung disease.')
+    
+    def test_stale_index_is_ignored(self):
+        """Test that an index built from other questions is not attached"""
+        kb = KnowledgeBase(faq_df=self.faq_df.iloc[:2], semantic_index=self.index)
+        self.assertIsNone(kb.semantic_index)
+
+
+class TestKnowledgeBaseFAQCollapse(unittest.TestCase):
+    """Test cases for collapsing near-duplicate FAQ questions at build time"""
+    
+    def setUp(self):
+        self.faq_df = pd.DataFrame({
+            'question': ['What are the symptoms of Glaucoma?', 'What is Glaucoma?',
+                         'what are the symptoms of glaucoma ?', 'What are the symptoms of Asthma?',
+                         'What is Glaucoma ?'],
+            'answer': ['Vision loss.', 'An eye disease.', 'vision  loss.',
+                       'Wheezing.', 'An eye disease.']
+        })
+        self.kb = KnowledgeBase(faq_df=self.faq_df)
+    
+    def test_keeps_first_of_each_group(self):
+        """Test that one canonical entry per group stays in the index, in dataset order"""
+        self.assertEqual(self.kb.faq_questions, ('What are the symptoms of Glaucoma?', 'What is Glaucoma?',
+                                                 'What are the symptoms of Asthma?'))
+        self.assertEqual(self.kb.faq_answers, ('Vision loss.', 'An eye disease.', 'Wheezing.'))
+    
+    def test_canonical_entries_link_to_alternates(self):
+        """Test that each canonical entry records the questions collapsed into it"""
+        self.assertEqual(dict(self.kb.faq_alternates), {0: ('what are the symptoms of glaucoma ?',),
+                                                        1: ('What is Glaucoma ?',)})
+    
+    def test_reports_index_reduction(self):
+        """Test that the collapse report counts questions, entries and the reduction"""
+        self.assertEqual(faq_collapse_report(self.kb),
+                         {'questions': 5, 'entries': 3, 'collapsed': 2, 'reduction': 0.4})
+    
+    def test_lookups_answer_from_canonical_entry(self):
+        """Test that a reworded question still finds the canonical answer"""
+        self.assertEqual(self.kb.find_faq('what are the symptoms of glaucoma')['answer'], 'Vision loss.')
+        self.assertEqual(self.kb.description_for('glaucoma'), 'Vision loss.')
+    
+    def test_numbered_variants_and_different_answers_stay_separate(self):
+        """Test that questions differing only by a number, or answered differently, keep their own answers"""
+        kb = KnowledgeBase(faq_df=pd.DataFrame({
+            'question': ['What are the symptoms of spinocerebellar ataxia type 1 ?',
+                         'What are the symptoms of spinocerebellar ataxia type 2 ?',
+                         'What is Bardet-Biedl syndrome 1 ?', 'What is Bardet-Biedl syndrome 2 ?',
+                         'What is hepatitis A ?', 'What is hepatitis B ?',
+                         'What are the symptoms of Glaucoma?', 'what are the symptoms of glaucoma ?'],
+            'answer': ['SCA1 answer.', 'SCA2 answer.', 'BBS1 answer.', 'BBS2 answer.',
+                       'HAV answer.', 'HBV answer.', 'Vision loss.', 'Blurred vision (other source).']
+        }))
+        self.assertEqual(len(kb.faq_questions), 8)
+        self.assertEqual(dict(kb.faq_alternates), {})
+        self.assertIn('SCA2 answer.', kb.faq_answers)
+        self.assertEqual(kb.description_for('spinocerebellar ataxia type 2'), 'SCA2 answer.')
+        self.assertEqual(kb.description_for('Bardet-Biedl syndrome 2'), 'BBS2 answer.')
+        self.assertEqual(kb.description_for('hepatitis B'), 'HBV answer.')
+    
+    def test_layered_and_merged_alternates_are_offset(self):
+        """Test that delta segments' alternates are keyed by position in the combined FAQ"""
+        delta = KnowledgeBase(faq_df=pd.DataFrame({'question': ['What is Dengue?', 'what is dengue'],
+                                                   'answer': ['A viral infection.', 'A viral infection.']}))
+        layered = LayeredKnowledgeBase(self.kb, (delta,))
+        expected = {0: ('what are the symptoms of glaucoma ?',), 1: ('What is Glaucoma ?',), 3: ('what is dengue',)}
+        self.assertEqual(dict(layered.faq_alternates), expected)
+        self.assertEqual(dict(layered.compact().faq_alternates), expected)
+        self.assertEqual(faq_collapse_report(layered.compact())['collapsed'], 3)
+
+
+class TestKnowledgeBaseDeltas(unittest.TestCase):
+    """Test cases for delta segments and compaction"""
+    
+    def setUp(self):
+        self.base_datasets = make_datasets()
+        self.delta_datasets = (
+            pd.DataFrame({'Disease': ['Malaria', 'Dengue'], 'Precaution_1': ['ignored duplicate', 'Drink fluids']}),
+            pd.DataFrame({'Disease': ['Dengue'], 'Symptom_1': ['rash']}),
+            pd.DataFrame({'question': ['What is Dengue?', 'What is malaria exactly?'],
+                          'answer': ['A viral infection.', 'A parasite infection.']}),
+            pd.DataFrame({
+                'diseases': ['dengue', 'malaria', 'dengue'],
+                'rash': [1, 0, 1],
+                'fever': [1, 1, 1],
+                'headache': [0, 1, 1]
+            })
+        )
+        self.full = KnowledgeBase(*self._concatenated())
+        self.layered = LayeredKnowledgeBase(KnowledgeBase(*self.base_datasets),
+                                            (KnowledgeBase(*self.delta_datasets),), version='v1+1')
+    
+    def _concatenated(self):
+        """Concatenate base and delta datasets the way a rebuilt archive would hold them"""
+        frames = [pd.concat([base, delta], ignore_index=True)
+                  for base, delta in zip(self.base_datasets, self.delta_datasets)]
+        symptom_columns = [col for col in frames[3].columns if col != 'diseases']
+        frames[3][symptom_columns] = frames[3][symptom_columns].fillna(0)
+        return frames
+    
+    def assert_same_answers(self, kb):
+        """Assert that a knowledge base answers exactly like the one built from concatenated datasets"""
+        for symptoms in [['fever'], ['rash', 'fever'], ['headache', 'vomiting'], ['fever', 'headache'], ['cough']]:
+            expected = self.full.rank_diseases(symptoms)
+            actual = kb.rank_diseases(symptoms)
+            self.assertEqual([(d, round(s, 9)) for d, s, _ in actual], [(d, round(s, 9)) for d, s, _ in expected])
+            for (_, _, actual_vector), (_, _, expected_vector) in zip(actual, expected):
+                np.testing.assert_array_equal(actual_vector, expected_vector)
+        
+        for disease in ['malaria', 'Dengue', 'migraine', 'typhoid', 'denge']:
+            self.assertEqual(kb.symptoms_for(disease), self.full.symptoms_for(disease))
+            self.assertEqual(kb.precautions_for(disease), self.full.precautions_for(disease))
+            self.assertEqual(kb.description_for(disease), self.full.description_for(disease))
+            self.assertEqual(kb.match_disease(disease), self.full.match_disease(disease))
+        
+        candidates = [(disease, score) for disease, score, _ in self.full.rank_diseases(['fever'])]
+        self.assertEqual(kb.suggest_symptoms(['fever'], candidates), self.full.suggest_symptoms(['fever'], candidates))
+        self.assertEqual((kb.group_symptom_counts != self.full.group_symptom_counts).nnz, 0)
+        self.assertEqual([(d, round(p, 9)) for d, p, _ in kb.rank_diseases_bayes(['fever', 'rash'])],
+                         [(d, round(p, 9)) for d, p, _ in self.full.rank_diseases_bayes(['fever', 'rash'])])
+        
+        for question in ['what is dengue?', 'what is malaria exactly', 'what is typhoid?', 'zzz']:
+            self.assertEqual(kb.find_faq(question), self.full.find_faq(question))
+    
+    def test_layered_view_matches_concatenated_datasets(self):
+        """Test that base plus delta answers like a knowledge base built from all rows"""
+        self.assert_same_answers(self.layered)
+        self.assertEqual(self.layered.symptom_columns, self.full.symptom_columns)
+        self.assertEqual(self.layered.precautions_for('dengue'), ['Drink fluids'])
+    
+    def test_compaction_preserves_answers(self):
+        """Test that merging segments gives the same answers and keeps the version"""
+        compacted = self.layered.compact()
+        self.assertIsInstance(compacted, KnowledgeBase)
+        self.assertEqual(compacted.version, 'v1+1')
+        self.assert_same_answers(compacted)
+        with self.assertRaises(ValueError):
+            compacted.symptom_matrix.data[0] = 5
+    
+    def test_layered_view_is_read_only(self):
+        """Test that adding a delta returns a new view instead of modifying the old one"""
+        extended = self.layered.with_delta(KnowledgeBase(), version='v1+2')
+        self.assertEqual(len(self.layered.deltas), 1)
+        self.assertEqual(len(extended.deltas), 2)
+        with self.assertRaises(AttributeError):
+            self.layered.version = 'v2'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Unit tests for near_duplicates.py
+Tests MinHash signatures and LSH grouping of near-duplicate questions
+"""
+
+import unittest
+import sys
+import os
+import random
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicates import collapse_near_duplicates, jaccard, minhash_signatures, shingles
+
+
+class TestMinHash(unittest.TestCase):
+    """Test cases for shingles and MinHash signatures"""
+
+    def test_shingles_ignore_case_and_punctuation(self):
+        """Test that shingles are lowercased word unigrams and bigrams"""
+        self.assertEqual(shingles('What is Malaria?'), shingles('what is malaria'))
+        self.assertIn('is malaria', shingles('What is Malaria?'))
+        self.assertEqual(shingles(None), shingles('none'))
+        self.assertEqual(shingles('?!'), frozenset())
+
+    def test_jaccard(self):
+        """Test exact Jaccard similarity"""
+        self.assertEqual(jaccard(frozenset('ab'), frozenset('bc')), 1 / 3)
+        self.assertEqual(jaccard(frozenset(), frozenset()), 0.0)
+
+    def test_signature_agreement_estimates_jaccard(self):
+        """Test that the fraction of agreeing signature rows approximates the Jaccard similarity"""
+        first = frozenset(f"token{i}" for i in range(100))
+        second = frozenset(f"token{i}" for i in range(20, 120))
+        signatures = minhash_signatures([first, second], num_perm=256)
+        estimate = (signatures[0] == signatures[1]).mean()
+        self.assertAlmostEqual(estimate, jaccard(first, second), delta=0.1)
+
+    def test_signatures_are_deterministic(self):
+        """Test that signatures do not depend on the process hash seed"""
+        sets = [shingles('What are the symptoms of asthma?'), frozenset()]
+        signatures = minhash_signatures(sets)
+        np.testing.assert_array_equal(signatures, minhash_signatures(sets))
+        self.assertTrue((signatures[1] == np.iinfo(np.uint32).max).all())
+
+
+class TestCollapseNearDuplicates(unittest.TestCase):
+    """Test cases for grouping near-duplicate texts"""
+
+    def test_groups_rewordings_under_first_occurrence(self):
+        """Test that case, punctuation and small rewordings collapse onto the earliest question"""
+        questions = [
+            'What are the symptoms of Glaucoma?',
+            'What is Glaucoma?',
+            'what are the symptoms of glaucoma ?',
+            'What are the symptoms of Glaucoma',
+            'What are the symptoms of Asthma?',
+            'What is (are) Glaucoma?',
+            'What is Glaucoma ?',
+        ]
+        canonical = collapse_near_duplicates(questions)
+        self.assertEqual(canonical.tolist(), [0, 1, 0, 0, 4, 5, 1])
+
+    def test_distinct_diseases_stay_separate(self):
+        """Test that templated questions about different diseases are not merged"""
+        questions = [f"What are the symptoms of disease {i}?" for i in range(200)]
+        canonical = collapse_near_duplicates(questions)
+        self.assertEqual(canonical.tolist(), list(range(200)))
+
+    def test_numbered_variants_stay_separate(self):
+        """Test that questions differing only by a number or identifier are never merged"""
+        questions = [
+            'What are the symptoms of spinocerebellar ataxia type 1 ?',
+            'What are the symptoms of spinocerebellar ataxia type 2 ?',
+            'What is Bardet-Biedl syndrome 1 ?',
+            'What is Bardet-Biedl syndrome 2 ?',
+            'What are the treatments for hepatitis A ?',
+            'What are the treatments for hepatitis B ?',
+            'What are the symptoms of spinocerebellar ataxia type 1',
+        ]
+        self.assertEqual(collapse_near_duplicates(questions).tolist(), [0, 1, 2, 3, 4, 5, 0])
+
+    def test_groups_keep_texts_apart(self):
+        """Test that texts only merge within the same group"""
+        questions = ['What is Glaucoma?', 'What is Glaucoma ?', 'what is glaucoma', 'What is glaucoma?']
+        canonical = collapse_near_duplicates(questions, groups=['a', 'b', 'a', 'b'])
+        self.assertEqual(canonical.tolist(), [0, 1, 0, 1])
+
+    def test_empty_questions_are_kept(self):
+        """Test that questions without words are never collapsed"""
+        self.assertEqual(collapse_near_duplicates(['', '?', 'What is asthma?']).tolist(), [0, 1, 2])
+        self.assertEqual(collapse_near_duplicates([]).tolist(), [])
+
+    def test_matches_brute_force(self):
+        """Test that no kept question nearly duplicates an earlier kept one"""
+        rng = np.random.default_rng(0)
+        templates = ['What is {}?', 'What are the symptoms of {}?', 'What are the signs and symptoms of {}?',
+                     'How to diagnose {} ?', 'what is {} ?']
+        questions = [rng.choice(templates).format(f"disease {rng.integers(100)}") for _ in range(600)]
+        canonical = collapse_near_duplicates(questions)
+        kept = [i for i in range(len(questions)) if canonical[i] == i]
+        sets = [shingles(question) for question in questions]
+        for position, first in enumerate(kept):
+            for second in kept[position + 1:]:
+                self.assertLess(jaccard(sets[first], sets[second]), 0.8)
+        for i, target in enumerate(canonical):
+            self.assertLessEqual(target, i)
+            self.assertGreaterEqual(jaccard(sets[i], sets[target]), 0.8)
+
+    def test_linear_time_on_distinct_questions(self):
+        """Test that 16,000 distinct questions are grouped in a few seconds"""
+        rng = random.Random(1)
+        words = [f"word{i}" for i in range(5000)]
+        questions = [' '.join(rng.choices(words, k=8)) for _ in range(16000)]
+        start = time.perf_counter()
+        canonical = collapse_near_duplicates(questions)
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertEqual(len(set(canonical.tolist())), 16000)
+
+
+if __name__ == '__main__':
+    unittest.main()
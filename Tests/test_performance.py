@@ -6,13 +6,16 @@ Tests the performance improvements in key modules
 
 import unittest
 import time
+import re
 import sys
 import os
 import numpy as np
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from fixtures import benchmark
 from helper import fetch_gemini_recommendations
 from consultant import get_hospitals_data, get_doctors_data
 
@@ -193,6 +196,172 @@ class TestProfileManagerOptimizations(unittest.TestCase):
         print(f"\n✓ Numpy conversion: {conversion_time*1000:.2f}ms per conversion")
 
 
+def _legacy_route(user_input):
+    """Previous routing path: rebuild pattern lists and re.search each pattern on every call"""
+    if not user_input:
+        return 'question', False, None
+    
+    user_input_lower = user_input.lower().strip()
+    question_patterns = [
+        r'what (are|is)', r'how (to|do|can)', r'why (is|are)', r'when (should|do)',
+        r'where (can|do)', r'who (should|can)', r'can you', r'could you',
+        r'would you', r'explain', r'tell me about'
+    ]
+    is_question = any(re.search(pattern, user_input_lower) for pattern in question_patterns)
+    is_short_phrase = len(user_input.split()) <= 5 and not is_question
+    
+    if '?' in user_input or is_question:
+        input_type = 'question'
+    elif ',' in user_input and is_short_phrase:
+        input_type = 'symptoms'
+    elif len(user_input.split()) <= 3:
+        input_type = 'disease'
+    else:
+        input_type = 'question'
+    
+    symptom_question_patterns = [
+        r'what (are|is) (the )?(symptoms|signs) of',
+        r'what (are|is) (the )?(causes|reason) of',
+        r'what (are|is) (the )?(treatment|remedy) for',
+        r'how (to|do) (treat|handle|manage)',
+        r'what (is|are)'
+    ]
+    is_symptom_question = any(re.search(pattern, user_input_lower) for pattern in symptom_question_patterns)
+    
+    disease_match = re.search(r'(?:symptoms|signs|causes|treatment|of|for)\s+([^?]+)', user_input.lower())
+    disease_span = disease_match.group(1).strip() if disease_match else None
+    return input_type, is_symptom_question, disease_span
+
+
+class TestIntentRouterPerformance(unittest.TestCase):
+    """Micro-benchmark of the compiled intent router against the previous per-pattern path"""
+    
+    QUERIES = [
+        "What are the symptoms of malaria?",
+        "how to treat diabetes",
+        "fever, headache, cough",
+        "diabetis",
+        "tell me about heart attack",
+        "I have had a headache and high fever since Monday",
+        "why is my blood pressure high",
+        "what causes fever",
+        "chest pain, shortness of breath, dizziness",
+        "Could you explain the treatment for typhoid"
+    ]
+    
+    def test_router_matches_previous_classification(self):
+        """Test that the compiled router agrees with the previous path"""
+        from intent_router import route
+        
+        for query in self.QUERIES:
+            legacy_type, legacy_symptom_question, legacy_span = _legacy_route(query)
+            intent = route(query)
+            
+            self.assertEqual(intent.type, legacy_type, query)
+            self.assertEqual(intent.is_symptom_question, legacy_symptom_question, query)
+            self.assertEqual(intent.disease_span is None, legacy_span is None, query)
+            if legacy_span is not None:
+                # The router also drops a leading connective ("of malaria" -> "malaria")
+                self.assertTrue(legacy_span.endswith(intent.disease_span), query)
+    
+    def test_router_makes_one_regex_pass(self):
+        """Test that each query is routed with a single match of the combined regex"""
+        from unittest import mock
+        import intent_router
+        
+        with mock.patch.object(intent_router, '_INTENT_RE', mock.Mock(wraps=intent_router._INTENT_RE)) as pattern, \
+                mock.patch('re.search', side_effect=AssertionError("per-pattern search")):
+            for query in self.QUERIES:
+                intent_router.route(query)
+        self.assertEqual(pattern.match.call_count, len(self.QUERIES))
+    
+    @benchmark
+    def test_router_faster_than_previous_path(self):
+        """Benchmark single-pass routing against the previous per-pattern routing"""
+        from intent_router import route
+        
+        iterations = 2000
+        
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            for query in self.QUERIES:
+                _legacy_route(query)
+        legacy_time = (time.perf_counter() - start_time) / (iterations * len(self.QUERIES))
+        
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            for query in self.QUERIES:
+                route(query)
+        router_time = (time.perf_counter() - start_time) / (iterations * len(self.QUERIES))
+        
+        self.assertLess(router_time, legacy_time,
+                       f"Compiled router should be faster: {router_time*1e6:.1f}us vs {legacy_time*1e6:.1f}us")
+        
+        print(f"\n✓ Intent routing: previous path {legacy_time*1e6:.1f}us, "
+              f"compiled router {router_time*1e6:.1f}us per query "
+              f"({legacy_time / router_time:.1f}x faster)")
+
+
+class TestDiseaseScoringBenchmark(unittest.TestCase):
+    """Benchmark naive-Bayes disease scoring against row cosine similarity"""
+    
+    @classmethod
+    def setUpClass(cls):
+        import pandas as pd
+        from knowledge_base import KnowledgeBase
+        
+        # Each disease has a few characteristic symptoms with varying frequencies
+        rng = np.random.default_rng(7)
+        n_diseases, n_symptoms, rows_per_disease = 150, 120, 40
+        profiles = np.where(rng.random((n_diseases, n_symptoms)) < 0.06,
+                            rng.uniform(0.3, 0.95, (n_diseases, n_symptoms)), 0.01)
+        rows = np.vstack([rng.random((rows_per_disease, n_symptoms)) < profile for profile in profiles])
+        augmented_df = pd.DataFrame(rows.astype(np.int8), columns=[f'symptom_{i}' for i in range(n_symptoms)])
+        augmented_df.insert(0, 'diseases', np.repeat([f'disease {i}' for i in range(n_diseases)], rows_per_disease))
+        cls.kb = KnowledgeBase(augmented_df=augmented_df)
+        
+        # Held-out patients report three of the symptoms they actually have
+        cls.queries = []
+        while len(cls.queries) < 400:
+            disease = rng.integers(n_diseases)
+            present = np.flatnonzero(rng.random(n_symptoms) < profiles[disease])
+            if len(present) >= 3:
+                reported = [f'symptom_{i}' for i in rng.choice(present, 3, replace=False)]
+                cls.queries.append((f'disease {disease}', reported))
+    
+    def _evaluate(self, rank):
+        """Return (top-1 accuracy, mean latency in seconds) of a ranking function"""
+        hits = 0
+        start_time = time.perf_counter()
+        for disease, symptoms in self.queries:
+            hits += rank(symptoms, 1)[0][0] == disease
+        return hits / len(self.queries), (time.perf_counter() - start_time) / len(self.queries)
+    
+    def test_bayes_probabilities_are_calibrated(self):
+        """Test that posteriors over all diseases form a distribution"""
+        ranked = self.kb.rank_diseases_bayes(self.queries[0][1], top_k=len(self.kb.group_diseases))
+        probabilities = [probability for _, probability, _ in ranked]
+        self.assertAlmostEqual(sum(probabilities), 1.0, places=5)
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+    
+    def test_bayes_at_least_as_accurate_as_cosine(self):
+        """Test that naive Bayes ranks the true disease first at least as often as cosine"""
+        cosine_accuracy, _ = self._evaluate(self.kb.rank_diseases)
+        bayes_accuracy, _ = self._evaluate(self.kb.rank_diseases_bayes)
+        self.assertGreaterEqual(bayes_accuracy, cosine_accuracy)
+    
+    @benchmark
+    def test_bayes_against_cosine(self):
+        """Benchmark accuracy and latency of both scoring modes on held-out queries"""
+        cosine_accuracy, cosine_time = self._evaluate(self.kb.rank_diseases)
+        bayes_accuracy, bayes_time = self._evaluate(self.kb.rank_diseases_bayes)
+        
+        self.assertLess(bayes_time, cosine_time)
+        
+        print(f"\n✓ Disease scoring: cosine {cosine_accuracy:.1%} top-1 in {cosine_time*1000:.2f}ms, "
+              f"naive Bayes {bayes_accuracy:.1%} top-1 in {bayes_time*1000:.2f}ms per query")
+
+
 def run_performance_tests():
     """Run performance tests with detailed output"""
     print("\n" + "="*70)
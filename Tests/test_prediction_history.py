@@ -0,0 +1,144 @@
+"""
+Unit tests for prediction_history.py
+Tests the append-only per-patient prediction history and its trend queries
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from prediction_history import (PredictionHistory, history_for_store, model_version, new_predictions,
+                                stamp_predictions)
+
+DAY = 86400
+
+
+def prediction(prob, at, version='v1', **inputs):
+    """Build one stamped prediction"""
+    return {'prob': prob, 'inputs': inputs, 'model_version': version, 'predicted_at': at}
+
+
+class TestStamping(unittest.TestCase):
+    """Test cases for telling new predictions from recorded ones"""
+
+    def test_stamp_keeps_existing_times(self):
+        """Test that only predictions without a time are stamped"""
+        predictions = stamp_predictions({'A': {'prob': 1}, 'B': {'prob': 2, 'predicted_at': 5.0}}, now=10.0)
+        self.assertEqual((predictions['A']['predicted_at'], predictions['B']['predicted_at']), (10.0, 5.0))
+
+    def test_stamp_after_last_recorded_time(self):
+        """Test that a prediction in the same millisecond as the saved one still counts as new"""
+        previous = {'A': prediction(1.0, 10.0)}
+        predictions = stamp_predictions({'A': {'prob': 2.0}}, previous, now=10.0)
+        self.assertEqual(predictions['A']['predicted_at'], 10.001)
+        self.assertEqual(new_predictions(previous, predictions), predictions)
+
+    def test_recorded_and_unstamped_predictions_are_not_new(self):
+        """Test that a prediction no newer than the saved one, or without a time, is not new"""
+        previous = {'Fever': prediction(30.0, 100.0)}
+        self.assertEqual(new_predictions(previous, {'Fever': prediction(30.0, 100.0)}), {})
+        self.assertEqual(new_predictions(previous, {'Fever': {'prob': 10.0}}), {})
+        self.assertEqual(list(new_predictions(None, {'Fever': prediction(30.0, 100.0)})), ['Fever'])
+
+
+class TestModelVersion(unittest.TestCase):
+    """Test cases for fingerprinting the model files"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.path = os.path.join(self.test_dir, 'model.pkl')
+        with open(self.path, 'wb') as handle:
+            handle.write(b'weights')
+
+    def test_changes_with_model_file(self):
+        """Test that a retrained model gets a new version and an unchanged one keeps it"""
+        version = model_version([self.path])
+        self.assertEqual(model_version([self.path]), version)
+        with open(self.path, 'wb') as handle:
+            handle.write(b'new weights')
+        self.assertNotEqual(model_version([self.path]), version)
+        self.assertNotEqual(model_version([self.path + '.missing']), version)
+
+
+class TestPredictionHistory(unittest.TestCase):
+    """Test cases for appending predictions and querying trends"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.history = history_for_store(os.path.join(self.test_dir, 'profiles.json'))
+        for number, probs in enumerate(([10.0, 30.0], [50.0])):
+            for day, prob in enumerate(probs):
+                self.history.append(f"user_{number + 1:03d}",
+                                    {'Diabetes': prediction(prob, day * DAY + number, Glucose=100 + day)})
+
+    def test_files_sit_beside_the_store(self):
+        """Test that history and inputs go to their own files next to the profile store"""
+        self.assertEqual(sorted(name for name in os.listdir(self.test_dir) if not name.endswith('.lock')),
+                         ['profiles.history.jsonl', 'profiles.inputs.jsonl'])
+
+    def test_patient_trend_and_inputs(self):
+        """Test one patient's history as arrays, with the inputs kept apart"""
+        timestamps, probabilities, versions = self.history.patient_trend('user_001', 'Diabetes')
+        self.assertEqual((timestamps.tolist(), probabilities.tolist(), versions.tolist()),
+                         ([0.0, DAY], [10.0, 30.0], ['v1', 'v1']))
+        self.assertEqual(self.history.inputs('user_001', 'Diabetes'), [(0.0, {'Glucose': 100}), (DAY, {'Glucose': 101})])
+        self.assertEqual(len(self.history.patient_trend('user_009', 'Diabetes')[0]), 0)
+        self.assertEqual(len(self.history.patient_trend('user_001', 'Fever')[0]), 0)
+
+    def test_disease_trend_buckets(self):
+        """Test mean probability and count per day across patients"""
+        starts, means, counts = self.history.disease_trend('Diabetes')
+        self.assertEqual(starts.tolist(), [0.0, DAY])
+        self.assertEqual(means.tolist(), [30.0, 30.0])
+        self.assertEqual(counts.tolist(), [2, 1])
+        starts, means, counts = self.history.disease_trend('Diabetes', start=DAY)
+        self.assertEqual((starts.tolist(), counts.tolist()), ([DAY], [1]))
+        self.assertEqual(len(self.history.disease_trend('Fever')[0]), 0)
+
+    def test_latest_per_patient(self):
+        """Test each patient's most recent probability"""
+        ids, probabilities = self.history.index().latest('Diabetes')
+        self.assertEqual(ids, ['user_001', 'user_002'])
+        self.assertEqual(probabilities.tolist(), [30.0, 50.0])
+        self.assertEqual(self.history.index().diseases(), ['Diabetes'])
+
+    def test_reads_only_new_lines(self):
+        """Test that appends by another handle are picked up incrementally and a torn line waits"""
+        index = self.history.index()
+        self.assertIs(self.history.index(), index)
+        other = PredictionHistory(self.history.path, self.history.inputs_path)
+        other.append('user_003', {'Fever': prediction(np.float32(70.0), 5.0)})
+        with open(self.history.path, 'a') as f:
+            f.write('["user_004", "Fever", 6.0')
+        self.assertEqual(self.history.disease_trend('Fever')[2].tolist(), [1])
+        with open(self.history.path, 'a') as f:
+            f.write(', 20.0, "v1"]\n')
+        self.assertEqual(self.history.disease_trend('Fever')[2].tolist(), [2])
+
+    def test_large_history_is_fast(self):
+        """Test that a trend over 100,000 predictions takes well under a second"""
+        history = PredictionHistory(os.path.join(self.test_dir, 'large.history.jsonl'))
+        with open(history.path, 'w') as f:
+            for number in range(5000):
+                for day in range(20):
+                    f.write(f'["user_{number:05d}", "Fever", {day * DAY}, {number % 100}, "v1"]\n')
+        history.index()
+        started = time.perf_counter()
+        starts, means, counts = history.disease_trend('Fever')
+        history.patient_trend('user_00042', 'Fever')
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(int(counts.sum()), 100000)
+        self.assertTrue(np.allclose(means, 49.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
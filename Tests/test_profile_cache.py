@@ -0,0 +1,195 @@
+"""
+Unit tests for profile_cache.py
+Tests the process-wide profile cache and its read-write lock
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import threading
+import time
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import make_profile
+from profile_cache import ProfileCache, ReadWriteLock
+from profile_store import JSONProfileStore, JournalProfileStore, SQLiteProfileStore
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test cases for the shared/exclusive lock"""
+
+    def test_readers_share_the_lock(self):
+        """Test that a second reader gets in while the first still holds the lock"""
+        lock = ReadWriteLock()
+        entered = threading.Event()
+
+        def read():
+            with lock.read():
+                entered.set()
+
+        with lock.read():
+            thread = threading.Thread(target=read)
+            thread.start()
+            self.assertTrue(entered.wait(1))
+        thread.join()
+
+    def test_writer_excludes_readers(self):
+        """Test that readers wait for a writer and a writer waits for readers"""
+        lock = ReadWriteLock()
+        events = []
+
+        def read():
+            with lock.read():
+                events.append('read')
+
+        with lock.write():
+            thread = threading.Thread(target=read)
+            thread.start()
+            time.sleep(0.05)
+            events.append('write done')
+        thread.join()
+        self.assertEqual(events, ['write done', 'read'])
+
+
+class TestProfileCache(unittest.TestCase):
+    """Test cases for the process-wide profile cache"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = SQLiteProfileStore(os.path.join(self.test_dir, 'profiles.db'))
+        self.store.save_all([make_profile(1), make_profile(2)])
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_loads_lazily_and_reuses_the_snapshot(self):
+        """Test that the first read loads the store and later reads share one tuple"""
+        cache = ProfileCache(self.store)
+        profiles = cache.profiles()
+        self.assertEqual(profiles, (make_profile(1), make_profile(2)))
+        self.assertIs(cache.profiles(), profiles)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('user_002'), make_profile(2))
+        self.assertIsNone(cache.get('user_999'))
+
+    def test_put_replaces_in_place_and_appends(self):
+        """Test that puts keep insertion order and are visible without touching the store"""
+        cache = ProfileCache(self.store)
+        cache.profiles()
+        cache.put(make_profile(1, name='Renamed'))
+        cache.put(make_profile(3))
+        self.assertEqual([profile['name'] for profile in cache.profiles()], ['Renamed', 'Patient 2', 'Patient 3'])
+        self.assertEqual(len(self.store.load()), 2)
+
+    def test_puts_are_dirty_until_marked_clean(self):
+        """Test that only profiles put since their last write are dirty, and a newer put stays dirty"""
+        cache = ProfileCache(self.store)
+        self.assertEqual(cache.dirty_profiles(), [])
+        written = make_profile(1, name='Renamed')
+        cache.put(written)
+        cache.put(make_profile(3))
+        self.assertEqual(sorted(profile['id'] for profile in cache.dirty_profiles()), ['user_001', 'user_003'])
+        newer = make_profile(3, age=1)
+        cache.put(newer)
+        cache.mark_clean([written, make_profile(3)])
+        self.assertEqual(cache.dirty_profiles(), [newer])
+
+    def test_reloads_after_another_process_writes(self):
+        """Test that a write through another connection invalidates the cache"""
+        cache = ProfileCache(self.store)
+        cache.profiles()
+        other = SQLiteProfileStore(self.store.path)
+        try:
+            other.upsert(make_profile(3))
+        finally:
+            other.close()
+        self.assertEqual(len(cache.profiles()), 3)
+
+    def test_own_saves_do_not_reload(self):
+        """Test that saving through the cache's own store keeps the loaded profiles and search index"""
+        for store in (JSONProfileStore(os.path.join(self.test_dir, 'profiles.json')),
+                      JournalProfileStore(os.path.join(self.test_dir, 'journal.json')), self.store):
+            store.save_all([make_profile(1)])
+            cache = ProfileCache(store)
+            with mock.patch.object(store, 'load', wraps=store.load) as load:
+                for number in range(2, 5):
+                    profile = make_profile(number)
+                    cache.put(profile)
+                    store.upsert(profile)
+                    self.assertEqual(len(cache.search('patient')[0]), number)
+            self.assertEqual(load.call_count, 1)
+
+    def test_reload_keeps_pending_saves(self):
+        """Test that saves not yet written to the store survive a reload"""
+        queued = [make_profile(2, name='Queued'), make_profile(4)]
+        cache = ProfileCache(self.store, pending=lambda: queued)
+        self.assertEqual([profile['name'] for profile in cache.profiles()], ['Patient 1', 'Queued', 'Patient 4'])
+
+    def test_invalidate_forces_a_reload(self):
+        """Test that invalidate drops puts the store never received"""
+        cache = ProfileCache(self.store)
+        cache.put(make_profile(9))
+        cache.invalidate()
+        self.assertIsNone(cache.get('user_009'))
+
+    def test_reload_never_writes_the_store(self):
+        """Test that loading profiles with a duplicate id leaves renumbering to the store"""
+        store = JSONProfileStore(os.path.join(self.test_dir, 'profiles.json'))
+        store.save_all([make_profile(1), make_profile(2), make_profile(2, name='Second')])
+        cache = ProfileCache(store)
+        with mock.patch.object(store, 'save_all') as save_all, mock.patch.object(store, 'allocate_id') as allocate:
+            self.assertEqual([profile['name'] for profile in cache.profiles()], ['Patient 1', 'Patient 2'])
+        save_all.assert_not_called()
+        allocate.assert_not_called()
+
+    def test_search_pages_newest_first(self):
+        """Test that searches return one page of matches and the total count"""
+        cache = ProfileCache(self.store)
+        cache.profiles()
+        for number in range(3, 26):
+            cache.put(make_profile(number, name=f"{'Asha' if number % 2 else 'Ravi'} {number}"))
+        page, total = cache.search('', offset=0, limit=5)
+        self.assertEqual(total, 25)
+        self.assertEqual([profile['id'] for profile in page], [f"user_{n:03d}" for n in range(25, 20, -1)])
+        page, total = cache.search('asha', offset=10, limit=5)
+        self.assertEqual(total, 12)
+        self.assertEqual([profile['id'] for profile in page], ['user_005', 'user_003'])
+        self.assertEqual(cache.search('nobody', limit=5), ([], 0))
+        cache.put(make_profile(7, name='Renamed'))
+        self.assertEqual(cache.search('renamed')[0][0]['id'], 'user_007')
+
+    def test_concurrent_readers_and_writers(self):
+        """Test that readers always see a consistent snapshot while other threads write"""
+        cache = ProfileCache(self.store)
+        cache.profiles()
+        errors = []
+
+        def write(offset):
+            for number in range(offset, offset + 100):
+                cache.put(make_profile(number))
+
+        def read():
+            for _ in range(200):
+                profiles = cache.profiles()
+                if len({profile['id'] for profile in profiles}) != len(profiles):
+                    errors.append(profiles)
+
+        threads = [threading.Thread(target=write, args=(offset,)) for offset in (10, 200)]
+        threads += [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 202)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,12 +10,27 @@ import json
 import tempfile
 import shutil
 from datetime import datetime
+from unittest import mock
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import numpy as np
-from profile_manager import ProfileManager
+from profile_manager import PROFILES_PAGE_SIZE, ProfileManager
+from profile_store import JSONProfileStore, SQLiteProfileStore
+
+
+class SessionState(dict):
+    """Dict with attribute access, standing in for st.session_state outside a Streamlit run"""
+    
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+    
+    def __setattr__(self, name, value):
+        self[name] = value
 
 
 class TestProfileManager(unittest.TestCase):
@@ -45,6 +60,11 @@ class TestProfileManager(unittest.TestCase):
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
+    def test_convert_numpy_types_is_deprecated(self):
+        """Test that the old conversion helper warns, since profile stores encode NumPy values themselves"""
+        with self.assertWarns(DeprecationWarning):
+            self.assertEqual(self.manager.convert_numpy_types({'a': np.int64(1)}), {'a': 1})
+    
     def test_convert_numpy_types_integer(self):
         """Test conversion of numpy integer types"""
         np_int32 = np.int32(42)
@@ -371,5 +391,257 @@ class TestProfileManagerEdgeCases(unittest.TestCase):
         self.assertEqual(loaded[0]['name'], '张三')
 
 
+class TestProfileManagerStorage(unittest.TestCase):
+    """Test cases for saving through a pluggable storage backend"""
+    
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = SQLiteProfileStore(os.path.join(self.test_dir, "profiles.db"))
+        self.manager = ProfileManager(self.store)
+        self.session = SessionState(current_profile=None, current_profile_id=None, predictions={})
+        patcher = mock.patch('profile_manager.st.session_state', self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+    
+    def login(self, name):
+        """Create a profile and make it the current one, like the patient details form"""
+        profile = {'name': name, 'age': 40, 'contact': '1234567890', 'address': 'Street 1',
+                   'gender': 'Female', 'marital_status': 'Single', 'predictions': {}}
+        profile_id = self.manager.add_profile(profile)
+        self.session.current_profile = profile
+        self.session.current_profile_id = profile_id
+        return profile_id
+    
+    def test_profiles_file_selects_backend(self):
+        """Test that assigning profiles_file points the manager at that store"""
+        manager = ProfileManager()
+        manager.profiles_file = os.path.join(self.test_dir, "profiles.json")
+        self.assertEqual(manager.profiles_file, os.path.join(self.test_dir, "profiles.json"))
+        self.assertFalse(manager.store.row_level)
+    
+    def test_opening_a_store_renumbers_duplicate_ids(self):
+        """Test that the manager renumbers ids the old allocator handed out twice when it opens a store"""
+        path = os.path.join(self.test_dir, "profiles.json")
+        JSONProfileStore(path).save_all([{'id': 'user_001', 'name': 'Asha'}, {'id': 'user_001', 'name': 'Ravi'}])
+        manager = ProfileManager(JSONProfileStore(path))
+        self.assertEqual([profile['id'] for profile in manager.get_all_profiles()], ['user_001', 'user_002'])
+        self.assertEqual(manager.cache.get('user_002')['name'], 'Ravi')
+
+    def test_add_and_reload(self):
+        """Test that a new profile is written immediately and loads in a fresh process"""
+        profile_id = self.login('Asha')
+        restarted = ProfileManager(self.store)
+        self.assertEqual([profile['id'] for profile in restarted.get_all_profiles()], [profile_id])
+    
+    def test_sessions_share_one_profile_cache(self):
+        """Test that sessions read the process-wide cache and keep no profile list of their own"""
+        profile_id = self.login('Asha')
+        other_session = SessionState(current_profile=None, current_profile_id=None, predictions={})
+        with mock.patch('profile_manager.st.session_state', other_session):
+            profiles = self.manager.get_all_profiles()
+        self.assertEqual([profile['id'] for profile in profiles], [profile_id])
+        self.assertIs(profiles, self.manager.get_all_profiles())
+        self.assertNotIn('user_profiles', self.session)
+        self.assertNotIn('user_profiles', other_session)
+    
+    def test_ids_are_unique_across_processes(self):
+        """Test that managers in different processes never hand out the same id"""
+        other = ProfileManager(SQLiteProfileStore(self.store.path))
+        try:
+            ids = [self.login('Asha'), other.add_profile({'name': 'Ravi', 'predictions': {}}), self.login('Meera')]
+        finally:
+            other.store.close()
+        self.assertEqual(ids, ['user_001', 'user_002', 'user_003'])
+        self.assertEqual(len(self.manager.get_all_profiles()), 3)
+    
+    def test_search_profiles_by_page(self):
+        """Test that Profiles tab searches return a bounded page and the total count"""
+        for number in range(30):
+            self.login(f"Patient {number}")
+        page, total = self.manager.search_profiles('', page=1)
+        self.assertEqual((len(page), total), (PROFILES_PAGE_SIZE, 30))
+        self.assertEqual(page[0]['name'], 'Patient 29')
+        page, total = self.manager.search_profiles('patient 1', page=2, page_size=5)
+        self.assertEqual(total, 11)
+        self.assertEqual([profile['name'] for profile in page], ['Patient 14', 'Patient 13', 'Patient 12', 'Patient 11', 'Patient 10'])
+        self.assertEqual(self.manager.search_profiles('user_003')[0][0]['name'], 'Patient 2')
+        self.assertEqual(self.manager.search_profiles('Patient3')[0][0]['name'], 'Patient 2')
+    
+    def test_profile_card_uses_escaped_template_without_predictions(self):
+        """Test that cards are formatted from the template, escape values and only count predictions"""
+        profile = {'id': 'user_007', 'name': '<b>Asha</b>', 'age': 40,
+                   'predictions': {'Diabetes': {'prob': 61.5}, 'Anemia': {'prob': 3.0}}}
+        with mock.patch('profile_manager.st.markdown') as markdown:
+            self.manager._render_profile_card(profile, 0)
+        card = markdown.call_args[0][0]
+        self.assertIn('&lt;b&gt;Asha&lt;/b&gt;', card)
+        self.assertIn('Patient7', card)
+        self.assertIn('2 saved', card)
+        self.assertNotIn('61.5', card)
+        self.assertNotIn('style=', card)
+    
+    def test_predictions_are_rendered_on_demand(self):
+        """Test that a selected profile's predictions render in one line"""
+        profile = {'id': 'user_001', 'predictions': {'Diabetes': {'prob': 61.5, 'severity': 'High'}, 'Anemia': {'prob': 3.0}}}
+        with mock.patch('profile_manager.st.markdown') as markdown:
+            self.manager._render_predictions(profile)
+        self.assertIn('Diabetes: 61.5% (High)   |   Anemia: 3.0%', markdown.call_args[0][0])
+        with mock.patch('profile_manager.st.info') as info:
+            self.manager._render_predictions({'id': 'user_002', 'predictions': {}})
+        info.assert_called_once()
+    
+    def test_profile_summary_rows(self):
+        """Test that table rows summarize a profile without its predictions"""
+        row = self.manager._profile_summary({'id': 'user_012', 'name': 'Asha', 'predictions': {'Anemia': {'prob': 3.0}}}, 0)
+        self.assertEqual(row['ID'], 'Patient12')
+        self.assertEqual(row['Predictions'], 1)
+        self.assertEqual(row['Age'], 'N/A')
+        self.assertEqual(self.manager._profile_summary({'id': 'imported', 'predictions': {}}, 4)['ID'], 'Patient5')
+    
+    def test_saves_do_not_mutate_shared_profiles(self):
+        """Test that auto-save replaces the cached profile instead of editing the shared copy"""
+        profile_id = self.login('Asha')
+        before = self.manager.cache.get(profile_id)
+        self.session.current_profile['age'] = 77
+        self.manager.auto_save_profile()
+        self.assertEqual(before['age'], 40)
+        self.assertEqual(self.manager.cache.get(profile_id)['age'], 77)
+    
+    def test_auto_save_upserts_only_the_current_profile(self):
+        """Test that auto-save writes one row with converted predictions"""
+        self.login('Asha')
+        profile_id = self.login('Ravi')
+        self.session.predictions = {'Diabetes': {'prob': np.float64(61.5), 'inputs': {'Glucose': np.int64(150)}}}
+        
+        before = self.store._connection.total_changes
+        self.assertTrue(self.manager.auto_save_profile())
+        self.assertEqual(self.store._connection.total_changes - before, 1)
+        
+        stored = self.store.get(profile_id)
+        self.assertEqual(stored['predictions']['Diabetes']['prob'], 61.5)
+        self.assertIn('last_updated', stored)
+    
+    def test_auto_save_is_not_debounced_on_row_level_stores(self):
+        """Test that back-to-back auto-saves all reach the store"""
+        profile_id = self.login('Asha')
+        for age in (41, 42, 43):
+            self.session.current_profile['age'] = age
+            self.manager.auto_save_profile()
+        self.assertEqual(self.store.get(profile_id)['age'], 43)
+    
+    def test_reads_pick_up_writes_from_other_processes(self):
+        """Test that a session reloads once another store handle has written"""
+        self.login('Asha')
+        other = SQLiteProfileStore(self.store.path)
+        try:
+            other.upsert({'id': 'user_900', 'name': 'Ravi', 'predictions': {}})
+        finally:
+            other.close()
+        self.assertIn('user_900', [profile['id'] for profile in self.manager.get_all_profiles()])
+    
+    def test_json_saves_keep_profiles_written_elsewhere(self):
+        """Test that saving on the JSON store merges with profiles another process wrote meanwhile"""
+        manager = ProfileManager(JSONProfileStore(os.path.join(self.test_dir, "profiles.json")))
+        manager.load_profiles()
+        JSONProfileStore(manager.profiles_file).upsert({'id': 'user_900', 'name': 'Ravi', 'predictions': {}})
+        profile_id = manager.add_profile({'name': 'Asha', 'predictions': {}})
+        stored = [profile['id'] for profile in JSONProfileStore(manager.profiles_file).load()]
+        self.assertEqual(stored, ['user_900', profile_id])
+    
+    def test_rapid_auto_saves_on_json_store_are_coalesced(self):
+        """Test that a burst of auto-saves writes the JSON file once and keeps the last update"""
+        manager = ProfileManager(JSONProfileStore(os.path.join(self.test_dir, "profiles.json")), save_quiet_seconds=60)
+        self.manager = manager
+        profile_id = self.login('Asha')
+        writes = manager.writer.writes
+        for age in range(41, 61):
+            self.session.current_profile['age'] = age
+            manager.auto_save_profile()
+        self.assertEqual(manager.writer.writes, writes)
+        manager.flush_profiles()
+        self.assertEqual(manager.writer.writes, writes + 1)
+        stored = JSONProfileStore(manager.profiles_file).load()
+        self.assertEqual([(profile['id'], profile['age']) for profile in stored], [(profile_id, 60)])
+        manager.writer.close()
+    
+    def test_save_profile_with_predictions(self):
+        """Test that an explicit save stores the predictions and a timestamp"""
+        profile_id = self.login('Asha')
+        self.assertTrue(self.manager.save_profile_with_predictions(profile_id, {'Anemia': {'prob': np.float32(12.5)}}))
+        stored = self.store.get(profile_id)
+        self.assertEqual(stored['predictions']['Anemia']['prob'], 12.5)
+        self.assertIn('saved_at', stored)
+        self.assertFalse(self.manager.save_profile_with_predictions('user_999', {}))
+    
+    def test_save_profiles_writes_only_changed_profiles(self):
+        """Test that saving everything serializes just the profiles changed since their last save"""
+        for name in ('Asha', 'Ravi', 'Meera'):
+            self.login(name)
+        with mock.patch.object(self.store, 'merge', wraps=self.store.merge) as merge:
+            self.manager.save_profiles()
+            self.assertEqual(merge.call_count, 0)
+            self.manager.cache.put({**self.manager.cache.get('user_002'), 'age': np.int64(41)})
+            self.manager.save_profiles()
+            self.manager.save_profiles()
+        self.assertEqual([[profile['id'] for profile in call.args[0]] for call in merge.call_args_list], [['user_002']])
+        self.assertEqual(self.store.get('user_002')['age'], 41)
+    
+    def test_auto_save_appends_prediction_history(self):
+        """Test that each new prediction is appended to the history instead of replacing the last"""
+        profile_id = self.login('Asha')
+        for prob in (np.float64(40.0), np.float64(55.5)):
+            self.session.predictions = {'Diabetes': {'prob': prob, 'inputs': {'Glucose': 120}, 'model_version': 'v1'}}
+            self.assertTrue(self.manager.auto_save_profile())
+            # Saving the same prediction again must not record it twice
+            self.assertTrue(self.manager.auto_save_profile())
+        stored = self.store.get(profile_id)
+        self.assertEqual(stored['predictions']['Diabetes']['prob'], 55.5)
+        # The profile keeps only its latest predictions; the history lives beside the store
+        self.assertNotIn('history', stored)
+        timestamps, probabilities, versions = self.manager.patient_trend(profile_id, 'Diabetes')
+        self.assertEqual(probabilities.tolist(), [40.0, 55.5])
+        self.assertEqual(versions.tolist(), ['v1', 'v1'])
+        self.assertEqual(timestamps[-1], stored['predictions']['Diabetes']['predicted_at'])
+        self.assertEqual([inputs for _, inputs in self.manager.history.inputs(profile_id, 'Diabetes')],
+                         [{'Glucose': 120}] * 2)
+    
+    def test_predictions_are_copied_without_recursive_conversion(self):
+        """Test that saved predictions are a copy of the session's, with NumPy values left to the encoder"""
+        profile_id = self.login('Asha')
+        self.session.predictions = {'Fever': {'prob': np.float32(12.5), 'inputs': {'Temp': 101}}}
+        with mock.patch.object(self.manager, 'convert_numpy_types') as convert:
+            self.assertTrue(self.manager.auto_save_profile())
+        convert.assert_not_called()
+        cached = self.manager.cache.get(profile_id)['predictions']
+        self.assertIsNot(cached['Fever'], self.session.predictions['Fever'])
+        self.session.predictions['Fever']['prob'] = 99.0
+        self.assertEqual(cached['Fever']['prob'], 12.5)
+        self.assertEqual(self.store.get(profile_id)['predictions']['Fever']['prob'], 12.5)
+    
+    def test_prediction_history_leaves_profile_saves_small(self):
+        """Test that a profile's stored size does not grow with the number of predictions"""
+        profile_id = self.login('Asha')
+        sizes = []
+        for prob in range(20):
+            self.session.predictions = {'Diabetes': {'prob': float(prob), 'inputs': {'Glucose': 120}}}
+            self.manager.auto_save_profile()
+            sizes.append(len(json.dumps(self.store.get(profile_id))))
+        self.assertLess(max(sizes) - min(sizes), 10)
+        self.assertEqual(len(self.manager.patient_trend(profile_id, 'Diabetes')[0]), 20)
+    
+    def test_disease_trend_across_patients(self):
+        """Test that the trend across patients reflects new saves"""
+        for name, prob in (('Asha', 20.0), ('Ravi', 60.0)):
+            profile_id = self.login(name)
+            self.manager.save_profile_with_predictions(profile_id, {'Anemia': {'prob': prob, 'inputs': {}}})
+        _, means, counts = self.manager.disease_trend('Anemia', bucket_seconds=10 ** 9)
+        self.assertEqual(counts.tolist(), [2])
+        self.assertAlmostEqual(float(means[0]), 40.0)
+
+
 if __name__ == '__main__':
     unittest.main()
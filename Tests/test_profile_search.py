@@ -0,0 +1,105 @@
+"""
+Unit tests for profile_search.py
+Tests the n-gram index behind the Profiles tab search
+"""
+
+import unittest
+import sys
+import os
+import random
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import make_profile
+from profile_search import ProfileSearchIndex
+
+
+class TestProfileSearchIndex(unittest.TestCase):
+    """Test cases for searching profiles by name, contact and id"""
+
+    def setUp(self):
+        self.profiles = [
+            make_profile(1, name='Asha Rao', contact='9000000001'),
+            make_profile(2, name='Ravi Kumar', contact='9000000002'),
+            make_profile(3, name='Ashok Mehta', contact='8111111111'),
+            make_profile(4, name='Meera Shah', contact='9000000004'),
+        ]
+        self.index = ProfileSearchIndex(self.profiles)
+
+    def brute_force(self, query):
+        """The old substring filter, extended to contact and id, newest first"""
+        query = query.strip().lower()
+        return [profile['id'] for profile in reversed(self.profiles)
+                if any(query in str(profile.get(field) or '').lower() for field in ('name', 'contact', 'id'))]
+
+    def test_matches_substrings_case_insensitively(self):
+        """Test that short and long queries match anywhere in the name, newest first"""
+        self.assertEqual(self.index.search('ash'), ['user_003', 'user_001'])
+        self.assertEqual(self.index.search('ASHO'), ['user_003'])
+        self.assertEqual(self.index.search('a'), ['user_004', 'user_003', 'user_002', 'user_001'])
+        self.assertEqual(self.index.search('kumar'), ['user_002'])
+        self.assertEqual(self.index.search('zzz'), [])
+
+    def test_matches_contact_and_id(self):
+        """Test that contact numbers and profile ids are searchable too"""
+        self.assertEqual(self.index.search('8111'), ['user_003'])
+        self.assertEqual(self.index.search('user_002'), ['user_002'])
+        self.assertEqual(self.index.search(' 00004 '), ['user_004'])
+
+    def test_matches_displayed_patient_id(self):
+        """Test that the PatientN id shown in the Profiles tab finds its profile"""
+        self.assertEqual(self.index.search('Patient3'), ['user_003'])
+        self.assertEqual(self.index.search('patient1'), ['user_001'])
+        self.assertEqual(self.index.search('PATIENT004'), ['user_004'])
+        self.assertEqual(self.index.search('Patient9'), [])
+        # The word alone stays a plain text search
+        self.assertEqual(self.index.search('patient'), [])
+
+    def test_empty_query_returns_everything_newest_first(self):
+        """Test that a blank search lists every profile"""
+        self.assertEqual(self.index.search(''), ['user_004', 'user_003', 'user_002', 'user_001'])
+        self.assertEqual(len(self.index), 4)
+
+    def test_updates_reindex_and_keep_position(self):
+        """Test that renaming a profile changes its matches but not its order"""
+        self.index.add(make_profile(1, name='Asha Iyer', contact='9000000001'))
+        self.assertEqual(self.index.search('rao'), [])
+        self.assertEqual(self.index.search('iyer'), ['user_001'])
+        self.assertEqual(self.index.search('')[-1], 'user_001')
+
+    def test_updates_after_postings_are_built(self):
+        """Test that profiles added or changed after the first indexed search are found"""
+        self.assertEqual(self.index.search('rao'), ['user_001'])
+        self.index.add(make_profile(1, name='Asha Iyer', contact='9000000001'))
+        self.index.add(make_profile(5, name='Rao Sahib', contact='7000000005'))
+        self.assertEqual(self.index.search('rao'), ['user_005'])
+        self.assertEqual(self.index.search('iyer'), ['user_001'])
+
+    def test_agrees_with_a_linear_scan(self):
+        """Test that indexed results equal the brute-force filter on random data"""
+        rng = random.Random(3)
+        syllables = ['ra', 'vi', 'as', 'ha', 'me', 'er', 'ku', 'mar', 'sh', 'ah']
+        self.profiles = [make_profile(i, name=' '.join(''.join(rng.choices(syllables, k=3)) for _ in range(2)),
+                                      contact=str(rng.randrange(10 ** 9, 10 ** 10))) for i in range(1, 301)]
+        self.index = ProfileSearchIndex(self.profiles)
+        for query in ['r', 'ra', 'ash', 'kumar', 'ravi me', 'user_1', '98', 'hah', 'xyz', 'rara']:
+            self.assertEqual(self.index.search(query), self.brute_force(query), query)
+
+    def test_search_scales_with_matches(self):
+        """Test that searching 50,000 profiles takes milliseconds"""
+        self.profiles = [make_profile(i, name=f"Patient {i:05d} Name", contact=str(9000000000 + i))
+                         for i in range(1, 50001)]
+        index = ProfileSearchIndex(self.profiles)
+        index.search('Patient')  # builds the trigram postings
+        start = time.perf_counter()
+        for _ in range(100):
+            matches = index.search('12345')
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(matches, ['user_12345'])
+
+
+if __name__ == '__main__':
+    unittest.main()
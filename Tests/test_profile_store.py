@@ -0,0 +1,471 @@
+"""
+Unit tests for profile_store.py
+Tests the JSON, SQLite (WAL) and journal patient profile storage backends
+"""
+
+import unittest
+import sys
+import os
+import json
+import multiprocessing
+import sqlite3
+import tempfile
+import shutil
+import time
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import profile_store
+from fixtures import make_profile
+from profile_store import CoalescingWriter, JSONProfileStore, JournalProfileStore, SQLiteProfileStore, open_profile_store
+
+
+class StoreContract:
+    """Behaviour every profile store must provide"""
+
+    def open_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = self.open_store()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_empty_store_loads_nothing(self):
+        """Test that a new store has no profiles"""
+        self.assertEqual(self.store.load(), [])
+
+    def test_save_all_round_trip(self):
+        """Test that saved profiles load back in order"""
+        profiles = [make_profile(i) for i in range(1, 4)]
+        self.store.save_all(profiles)
+        self.assertEqual(self.store.load(), profiles)
+
+    def test_save_all_replaces_previous_profiles(self):
+        """Test that save_all drops profiles not in the new list"""
+        self.store.save_all([make_profile(1), make_profile(2)])
+        self.store.save_all([make_profile(2)])
+        self.assertEqual([profile['id'] for profile in self.store.load()], ['user_002'])
+
+    def test_upsert_inserts_and_updates_in_place(self):
+        """Test that upsert appends new profiles and updates existing ones without reordering"""
+        self.store.save_all([make_profile(1), make_profile(2)])
+        self.store.upsert(make_profile(3))
+        self.store.upsert(make_profile(1, age=99, predictions={'Diabetes': {'prob': 42.5}}))
+        loaded = self.store.load()
+        self.assertEqual([profile['id'] for profile in loaded], ['user_001', 'user_002', 'user_003'])
+        self.assertEqual(loaded[0]['age'], 99)
+        self.assertEqual(loaded[0]['predictions']['Diabetes']['prob'], 42.5)
+
+    def test_unicode_round_trip(self):
+        """Test that non-ASCII names survive a save"""
+        self.store.upsert(make_profile(1, name='张三', address='Москва'))
+        self.assertEqual(self.store.load()[0]['name'], '张三')
+
+    def test_merge_keeps_other_profiles(self):
+        """Test that merge upserts the given profiles without dropping the rest"""
+        self.store.save_all([make_profile(1), make_profile(2)])
+        self.store.merge([make_profile(2, age=7), make_profile(3)])
+        loaded = self.store.load()
+        self.assertEqual([profile['id'] for profile in loaded], ['user_001', 'user_002', 'user_003'])
+        self.assertEqual(loaded[1]['age'], 7)
+
+    def test_numpy_values_are_encoded(self):
+        """Test that NumPy scalars and arrays left in a profile are stored as plain JSON values"""
+        predictions = {'Diabetes': {'prob': np.float32(42.5), 'inputs': {'Age': np.int64(50), 'Levels': np.array([1, 2])}}}
+        self.store.upsert(make_profile(1, predictions=predictions))
+        stored = self.store.load()[0]['predictions']['Diabetes']
+        self.assertEqual(stored, {'prob': 42.5, 'inputs': {'Age': 50, 'Levels': [1, 2]}})
+        self.assertIs(type(stored['inputs']['Age']), int)
+
+    def test_generation_changes_on_writes_by_other_instances(self):
+        """Test that a write through another handle on the same files is detectable"""
+        self.store.save_all([make_profile(1)])
+        generation = self.store.generation()
+        self.assertEqual(self.store.generation(), generation)
+        other = self.open_store()
+        try:
+            other.load()
+            other.upsert(make_profile(2))
+        finally:
+            other.close()
+        self.assertNotEqual(self.store.generation(), generation)
+
+    def test_own_writes_keep_the_generation(self):
+        """Test that a handle's own writes do not look like changes by another process"""
+        self.store.save_all([make_profile(1)])
+        generation = self.store.generation()
+        self.store.upsert(make_profile(2))
+        self.store.merge([make_profile(1, age=5), make_profile(3)])
+        self.store.save_all([make_profile(4)])
+        self.assertEqual(self.store.generation(), generation)
+
+    def test_allocate_id_continues_after_existing_profiles(self):
+        """Test that ids are allocated after the highest stored user_NNN and never repeat"""
+        self.store.save_all([make_profile(1), make_profile(7), {'id': 'custom', 'name': 'Imported'}])
+        self.assertEqual([self.store.allocate_id() for _ in range(3)], ['user_008', 'user_009', 'user_010'])
+        other = self.open_store()
+        try:
+            self.assertEqual(other.allocate_id(), 'user_011')
+        finally:
+            other.close()
+
+    def _allocate_from_process(self, name):
+        store = self.open_store()
+        ids = [store.allocate_id() for _ in range(25)]
+        store.close()
+        with open(os.path.join(self.test_dir, name), 'w') as f:
+            json.dump(ids, f)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs fork")
+    def test_concurrent_processes_allocate_distinct_ids(self):
+        """Test that four processes allocating at once never receive the same id"""
+        context = multiprocessing.get_context('fork')
+        names = [f"ids_{i}.json" for i in range(4)]
+        processes = [context.Process(target=self._allocate_from_process, args=(name,)) for name in names]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        ids = []
+        for name in names:
+            with open(os.path.join(self.test_dir, name)) as f:
+                ids.extend(json.load(f))
+        self.assertEqual(sorted(ids), [make_profile(i)['id'] for i in range(1, 101)])
+
+    def _write_from_process(self, first):
+        store = self.open_store()
+        store.load()
+        for number in range(first, first + 25):
+            store.upsert(make_profile(number))
+        store.close()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs fork")
+    def test_concurrent_processes_lose_no_profiles(self):
+        """Test that four processes writing one store at once keep every profile"""
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=self._write_from_process, args=(first,)) for first in (1, 26, 51, 76)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        loaded = self.open_store().load()
+        self.assertEqual(sorted(profile['id'] for profile in loaded), [make_profile(i)['id'] for i in range(1, 101)])
+
+
+class TestJSONProfileStore(StoreContract, unittest.TestCase):
+    """Test cases for the single-file JSON store"""
+
+    def open_store(self):
+        return JSONProfileStore(os.path.join(self.test_dir, 'profiles.json'))
+
+    def test_file_format_is_a_json_list(self):
+        """Test that the file keeps the original user_profiles.json layout"""
+        self.store.save_all([make_profile(1)])
+        with open(self.store.path) as f:
+            self.assertEqual(json.load(f), [make_profile(1)])
+
+    def test_writes_replace_the_file_atomically(self):
+        """Test that saves rename a new file into place and leave no temp files behind"""
+        self.store.save_all([make_profile(1)])
+        inode = os.stat(self.store.path).st_ino
+        self.store.upsert(make_profile(2))
+        self.assertNotEqual(os.stat(self.store.path).st_ino, inode)
+        self.assertEqual([name for name in os.listdir(self.test_dir) if not name.endswith('.lock')], ['profiles.json'])
+
+    def test_file_layout_matches_json_dump(self):
+        """Test that records encoded one by one produce the same text as dumping the whole list"""
+        profiles = [make_profile(1, address='Line 1\nLine 2'), make_profile(2, name='张三')]
+        self.store.save_all(profiles[:1])
+        self.store.upsert(profiles[1])
+        with open(self.store.path) as f:
+            self.assertEqual(f.read(), json.dumps(profiles, indent=4))
+        self.store.save_all([])
+        with open(self.store.path) as f:
+            self.assertEqual(f.read(), json.dumps([], indent=4))
+
+    def test_merge_encodes_only_the_given_profiles(self):
+        """Test that a save re-encodes the changed profile, not every stored one"""
+        self.store.save_all([make_profile(i) for i in range(1, 101)])
+        with mock.patch('profile_store._file_record', wraps=profile_store._file_record) as encode:
+            self.store.upsert(make_profile(50, age=1))
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(self.store.load()[49]['age'], 1)
+
+    def test_unchanged_save_leaves_the_file_alone(self):
+        """Test that saving profiles whose content did not change does not rewrite the file"""
+        self.store.save_all([make_profile(1), make_profile(2)])
+        signature = profile_store._file_signature(self.store.path)
+        self.store.merge([make_profile(2), make_profile(1)])
+        self.assertEqual(profile_store._file_signature(self.store.path), signature)
+
+    def test_records_are_reread_after_another_process_writes(self):
+        """Test that cached encodings are dropped once another handle rewrites the file"""
+        self.store.save_all([make_profile(1)])
+        other = self.open_store()
+        other.upsert(make_profile(1, age=5))
+        self.store.upsert(make_profile(2))
+        self.assertEqual([profile['age'] for profile in self.store.load()], [5, 32])
+
+    def test_duplicate_ids_are_renumbered_under_the_lock(self):
+        """Test that profiles sharing an old id get fresh ids, keeping profiles other handles just wrote"""
+        self.store.save_all([make_profile(1), make_profile(2), make_profile(2, name='Second'), make_profile(3)])
+        self.store.load()
+        self.open_store().upsert(make_profile(5))
+        self.assertTrue(self.store.renumber_duplicate_ids())
+        self.assertEqual([(profile['id'], profile['name']) for profile in self.store.load()],
+                         [('user_001', 'Patient 1'), ('user_002', 'Patient 2'), ('user_006', 'Second'),
+                          ('user_003', 'Patient 3'), ('user_005', 'Patient 5')])
+        self.assertFalse(self.store.renumber_duplicate_ids())
+
+    def test_failed_write_keeps_previous_file(self):
+        """Test that a profile that cannot be encoded leaves the stored file intact"""
+        self.store.save_all([make_profile(1)])
+        with self.assertRaises(TypeError):
+            self.store.upsert(make_profile(2, predictions={'Asthma': object()}))
+        self.assertEqual(self.store.load(), [make_profile(1)])
+        self.assertNotIn('.tmp', ''.join(os.listdir(self.test_dir)))
+
+
+class TestSQLiteProfileStore(StoreContract, unittest.TestCase):
+    """Test cases for the SQLite store"""
+
+    def open_store(self):
+        return SQLiteProfileStore(os.path.join(self.test_dir, 'profiles.db'))
+
+    def test_wal_mode_and_indexes(self):
+        """Test that the database uses WAL and indexes id and name"""
+        with sqlite3.connect(self.store.path) as connection:
+            self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            indexes = {row[1] for row in connection.execute("PRAGMA index_list(profiles)")}
+            columns = {connection.execute(f"PRAGMA index_info('{index}')").fetchone()[2] for index in indexes}
+        self.assertEqual(columns, {'id', 'name'})
+
+    def test_upsert_writes_one_row(self):
+        """Test that saving one profile touches one row whatever the store size"""
+        self.store.save_all([make_profile(i) for i in range(1, 501)])
+        before = self.store._connection.total_changes
+        self.store.upsert(make_profile(250, age=1))
+        self.assertEqual(self.store._connection.total_changes - before, 1)
+        self.assertEqual(self.store.get('user_250')['age'], 1)
+        self.assertIsNone(self.store.get('user_999'))
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        """Test that rows whose content hash is unchanged are skipped"""
+        self.store.save_all([make_profile(i) for i in range(1, 11)])
+        before = self.store._connection.total_changes
+        self.store.merge([make_profile(i) for i in range(1, 11)] + [make_profile(3, age=1)])
+        self.assertEqual(self.store._connection.total_changes - before, 1)
+        self.assertEqual(self.store.get('user_003')['age'], 1)
+
+    def test_other_connections_see_committed_writes(self):
+        """Test that a second process-like connection reads what the first wrote"""
+        self.store.upsert(make_profile(1))
+        other = SQLiteProfileStore(self.store.path)
+        try:
+            self.assertEqual(other.load(), [make_profile(1)])
+        finally:
+            other.close()
+
+
+class TestJournalProfileStore(StoreContract, unittest.TestCase):
+    """Test cases for the snapshot plus JSONL journal store"""
+
+    def open_store(self):
+        return JournalProfileStore(os.path.join(self.test_dir, 'profiles.json'))
+
+    def reopen(self):
+        """Load the files from a fresh store, as a restarted app would"""
+        return JournalProfileStore(self.store.path).load()
+
+    def journal_records(self):
+        with open(self.store.journal_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_duplicate_ids_in_the_snapshot_are_renumbered(self):
+        """Test that an old snapshot's duplicate ids are renumbered with the journal folded in"""
+        JSONProfileStore(self.store.path).save_all([make_profile(1), make_profile(1, name='Second')])
+        self.store.upsert(make_profile(2))
+        self.assertTrue(self.store.renumber_duplicate_ids())
+        self.assertEqual([(profile['id'], profile['name']) for profile in self.reopen()],
+                         [('user_001', 'Patient 1'), ('user_003', 'Second'), ('user_002', 'Patient 2')])
+        self.assertFalse(os.path.exists(self.store.journal_path))
+        self.assertFalse(self.store.renumber_duplicate_ids())
+
+    def test_upsert_appends_only_changed_fields(self):
+        """Test that new profiles are journaled whole and updates as the changed fields only"""
+        self.store.upsert(make_profile(1))
+        self.store.upsert(make_profile(1, predictions={'Asthma': {'prob': 12.0}}))
+        self.store.upsert(make_profile(1, predictions={'Asthma': {'prob': 12.0}}))
+        self.assertEqual(self.journal_records(), [
+            {'op': 'create', 'profile': make_profile(1)},
+            {'op': 'update', 'id': 'user_001', 'fields': {'predictions': {'Asthma': {'prob': 12.0}}}},
+        ])
+        self.assertFalse(os.path.exists(self.store.path))
+        self.assertEqual(self.reopen(), [make_profile(1, predictions={'Asthma': {'prob': 12.0}})])
+
+    def test_replay_skips_torn_final_record(self):
+        """Test that a partially written last line does not lose the earlier changes"""
+        self.store.save_all([make_profile(1)])
+        self.store.upsert(make_profile(1, age=50))
+        with open(self.store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "update", "id": "user_0')
+        self.assertEqual(self.reopen(), [make_profile(1, age=50)])
+
+    def test_caller_mutations_do_not_leak_into_the_store(self):
+        """Test that changing a profile after saving it is journaled as a later update"""
+        profile = make_profile(1)
+        self.store.upsert(profile)
+        profile['predictions']['Asthma'] = {'prob': 3.0}
+        self.store.upsert(profile)
+        self.assertEqual(len(self.journal_records()), 2)
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        """Test that passing the size threshold rewrites the snapshot and empties the journal"""
+        self.store.compact_bytes = 2000
+        for i in range(1, 40):
+            self.store.upsert(make_profile(i))
+        self.store.close()
+        self.assertLess(os.path.getsize(self.store.journal_path), 2000)
+        self.assertFalse(os.path.exists(self.store._compacting_path))
+        with open(self.store.path) as f:
+            self.assertGreater(len(json.load(f)), 1)
+        self.assertEqual(self.reopen(), [make_profile(i) for i in range(1, 40)])
+
+    def test_interrupted_compaction_is_replayed_and_finished(self):
+        """Test that a rotated journal left by a crash is replayed, then folded by the next compaction"""
+        self.store.save_all([make_profile(1)])
+        self.store.upsert(make_profile(1, age=60))
+        os.replace(self.store.journal_path, self.store._compacting_path)
+        self.store.upsert(make_profile(2))
+        self.assertEqual(self.reopen(), [make_profile(1, age=60), make_profile(2)])
+
+        self.store.compact(background=False)
+        self.assertFalse(os.path.exists(self.store._compacting_path))
+        self.assertEqual(self.reopen(), [make_profile(1, age=60), make_profile(2)])
+
+
+class TestProfileStoreBase(unittest.TestCase):
+    """Test cases for the abstract store interface"""
+
+    def test_incomplete_backend_fails_when_created(self):
+        """Test that a store missing a required method cannot be instantiated"""
+        class PartialStore(profile_store.ProfileStore):
+            def load(self):
+                return []
+
+        with self.assertRaises(TypeError):
+            PartialStore()
+
+
+class CountingStore(JSONProfileStore):
+    """JSON store that counts merges and can be told to fail"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.merges = 0
+        self.fail = False
+
+    def merge(self, profiles):
+        if self.fail:
+            raise OSError("disk full")
+        self.merges += 1
+        super().merge(profiles)
+
+
+class TestCoalescingWriter(unittest.TestCase):
+    """Test cases for the background writer that coalesces bursts of saves"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        # Registered first so it runs after the writers' close() cleanups
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.store = CountingStore(os.path.join(self.test_dir, 'profiles.json'))
+
+    def open_writer(self, **options):
+        writer = CoalescingWriter(self.store, **options)
+        self.addCleanup(writer.close)
+        return writer
+
+    def wait_for_writes(self, writer, count, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while writer.writes < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_burst_is_written_once_with_the_latest_copies(self):
+        """Test that rapid saves become one trailing write holding the last version of each profile"""
+        writer = self.open_writer(quiet_seconds=0.1)
+        for age in range(50):
+            writer.submit([make_profile(1, age=age), make_profile(2)])
+        self.assertEqual(self.store.merges, 0)
+        self.wait_for_writes(writer, 1)
+        time.sleep(0.2)
+        self.assertEqual(self.store.merges, 1)
+        self.assertEqual(self.store.load(), [make_profile(1, age=49), make_profile(2)])
+
+    def test_steady_stream_is_written_within_max_delay(self):
+        """Test that saves arriving faster than the quiet period still get written"""
+        writer = self.open_writer(quiet_seconds=0.2, max_delay_seconds=0.1)
+        deadline = time.monotonic() + 0.6
+        while time.monotonic() < deadline:
+            writer.submit([make_profile(1)])
+            time.sleep(0.02)
+        self.assertGreaterEqual(self.store.merges, 1)
+
+    def test_flush_and_close_write_immediately(self):
+        """Test that flush writes the queue now and close writes what is left"""
+        writer = self.open_writer(quiet_seconds=60)
+        writer.submit([make_profile(1)])
+        writer.flush()
+        self.assertEqual(self.store.load(), [make_profile(1)])
+        writer.submit([make_profile(2)])
+        writer.close()
+        self.assertEqual(len(self.store.load()), 2)
+        writer.submit([make_profile(3)])
+        self.assertEqual(len(self.store.load()), 3)
+
+    def test_failed_write_keeps_profiles_queued(self):
+        """Test that a failed write is reported and retried without losing newer copies"""
+        writer = self.open_writer(quiet_seconds=60)
+        self.store.fail = True
+        writer.submit([make_profile(1), make_profile(2)])
+        with self.assertRaises(OSError):
+            writer.flush()
+        writer.submit([make_profile(1, age=5)])
+        self.store.fail = False
+        writer.flush()
+        self.assertIsNone(writer.error)
+        self.assertEqual(self.store.load(), [make_profile(1, age=5), make_profile(2)])
+
+
+class TestOpenProfileStore(unittest.TestCase):
+    """Test cases for choosing a backend from a path"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_backend_follows_extension(self):
+        """Test that .db paths open SQLite, .jsonl the journal and anything else the JSON file"""
+        store = open_profile_store(os.path.join(self.test_dir, 'profiles.db'))
+        self.assertIsInstance(store, SQLiteProfileStore)
+        store.close()
+        self.assertIsInstance(open_profile_store(os.path.join(self.test_dir, 'profiles.json')), JSONProfileStore)
+        journal = open_profile_store(os.path.join(self.test_dir, 'profiles.jsonl'))
+        self.assertIsInstance(journal, JournalProfileStore)
+        self.assertEqual(journal.path, os.path.join(self.test_dir, 'profiles.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit tests for response_cache.py
+Tests LRU eviction, TTL expiry and hit-rate accounting of the shared response cache
+"""
+
+import unittest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+
+class FakeTimer:
+    """Manually advanced clock for TTL tests"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for ResponseCache"""
+    
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = ResponseCache(maxsize=2, ttl_seconds=10, timer=self.timer)
+    
+    def test_get_and_set(self):
+        """Test basic storage and retrieval"""
+        self.cache.set('a', {'disease': 'malaria'})
+        self.assertEqual(self.cache.get('a'), {'disease': 'malaria'})
+        self.assertIsNone(self.cache.get('missing'))
+    
+    def test_values_are_copied(self):
+        """Test that mutating a returned value does not affect the cache"""
+        self.cache.set('a', {'symptoms': ['fever']})
+        value = self.cache.get('a')
+        value['symptoms'].append('cough')
+        self.assertEqual(self.cache.get('a'), {'symptoms': ['fever']})
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+    
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL"""
+        self.cache.set('a', 1)
+        self.timer.now = 9.9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.timer.now = 10.0
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+        self.assertEqual(len(self.cache), 0)
+    
+    def test_hit_rate(self):
+        """Test hit and miss accounting"""
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('a')
+        self.cache.get('b')
+        
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+    
+    def test_clear(self):
+        """Test that clear empties the cache and resets counters"""
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.clear()
+        
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats()['hits'], 0)
+    
+    def test_concurrent_access(self):
+        """Test that concurrent sets never exceed the size bound"""
+        cache = ResponseCache(maxsize=50, ttl_seconds=60)
+        
+        def worker(offset):
+            for i in range(200):
+                cache.set((offset, i), i)
+                cache.get((offset, i))
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertLessEqual(len(cache), 50)
+        self.assertEqual(cache.stats()['hits'], 800)
+
+
+if __name__ == '__main__':
+    unittest.main()
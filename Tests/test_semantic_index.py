@@ -0,0 +1,141 @@
+"""
+Unit tests for semantic_index.py
+Tests LSA embeddings, IVF nearest-neighbour search and index persistence
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_index import SemanticFAQIndex, load_semantic_index, questions_fingerprint
+
+
+FAQ_QUESTIONS = [
+    "What is diabetes?",
+    "How does diabetes affect blood sugar levels?",
+    "What are the symptoms of diabetes and high blood sugar?",
+    "What is hypertension?",
+    "How is high blood pressure treated?",
+    "What causes hypertension and blood pressure problems?",
+    "What is asthma?",
+    "What are the symptoms of asthma and wheezing?",
+    "How is asthma treated with an inhaler?",
+    "What is malaria?",
+    "How is malaria spread by mosquitoes?",
+    "What are the symptoms of malaria fever?",
+]
+
+
+def synthetic_questions(count, seed=0):
+    """Generate a large corpus of FAQ-like questions over a random vocabulary"""
+    rng = np.random.default_rng(seed)
+    topics = [f"condition{i}" for i in range(200)]
+    words = [f"term{i}" for i in range(2000)]
+    questions = []
+    for _ in range(count):
+        topic = topics[rng.integers(len(topics))]
+        extra = ' '.join(words[j] for j in rng.integers(len(words), size=4))
+        questions.append(f"What are the symptoms of {topic} {extra}?")
+    return questions
+
+
+class TestSemanticFAQIndex(unittest.TestCase):
+    """Test cases for building and searching the semantic FAQ index"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.index = SemanticFAQIndex.build(FAQ_QUESTIONS, n_components=8)
+    
+    def test_embeddings_are_normalized_float32(self):
+        """Test that question embeddings are unit-length float32 rows"""
+        self.assertEqual(self.index.embeddings.dtype, np.float32)
+        self.assertEqual(len(self.index), len(FAQ_QUESTIONS))
+        norms = np.linalg.norm(self.index.embeddings, axis=1)
+        np.testing.assert_allclose(norms, 1.0, atol=1e-5)
+    
+    def test_exact_question_ranks_first(self):
+        """Test that a known question retrieves itself"""
+        matches = self.index.search("How is malaria spread by mosquitoes?", k=3)
+        self.assertEqual(matches[0][0], 10)
+        self.assertGreater(matches[0][1], 0.9)
+    
+    def test_paraphrase_finds_related_question(self):
+        """Test that a paraphrase without the disease name finds the disease's questions"""
+        matches = self.index.search("my blood sugar is high", k=3)
+        self.assertTrue(matches)
+        self.assertIn("diabetes", FAQ_QUESTIONS[matches[0][0]].lower())
+    
+    def test_unknown_query_returns_nothing(self):
+        """Test that a query with no known terms returns no matches"""
+        self.assertEqual(self.index.search("xyzzy plugh"), [])
+    
+    def test_results_are_sorted(self):
+        """Test that matches come back best first"""
+        scores = [score for _, score in self.index.search("symptoms of asthma", k=5)]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+    
+    def test_save_and_load(self):
+        """Test that a saved index loads back with identical results"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'faq_index.joblib')
+            self.index.save(path)
+            loaded = load_semantic_index(path, FAQ_QUESTIONS)
+        
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.search("what is asthma"), self.index.search("what is asthma"))
+    
+    def test_stale_index_is_rejected(self):
+        """Test that an index built from different questions is not loaded"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'faq_index.joblib')
+            self.index.save(path)
+            self.assertIsNone(load_semantic_index(path, FAQ_QUESTIONS[:-1]))
+            self.assertIsNone(load_semantic_index(os.path.join(tmp_dir, 'missing.joblib'), FAQ_QUESTIONS))
+        
+        self.assertNotEqual(questions_fingerprint(FAQ_QUESTIONS), questions_fingerprint(FAQ_QUESTIONS[::-1]))
+
+
+class TestSemanticIndexAtScale(unittest.TestCase):
+    """Test approximate search quality and latency on a MedQuAD-sized corpus"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.questions = synthetic_questions(16000)
+        cls.index = SemanticFAQIndex.build(cls.questions, n_components=64)
+    
+    def test_builds_inverted_lists(self):
+        """Test that every question lands in exactly one inverted list"""
+        self.assertGreater(self.index.n_lists, 1)
+        self.assertEqual(self.index.list_offsets[-1], len(self.questions))
+        self.assertEqual(sorted(self.index.list_ids.tolist()), list(range(len(self.questions))))
+    
+    def test_approximate_search_recall(self):
+        """Test that IVF search agrees with exhaustive search on the top result"""
+        hits = 0
+        for question in self.questions[:100]:
+            exact = self.index.search(question, k=1, n_probe=self.index.n_lists)
+            approximate = self.index.search(question, k=1)
+            hits += int(exact[0][0] == approximate[0][0])
+        self.assertGreaterEqual(hits, 90)
+    
+    def test_query_latency(self):
+        """Test that a query is embedded and searched in about a millisecond"""
+        queries = self.questions[:200]
+        start = time.perf_counter()
+        for query in queries:
+            self.index.search(query, k=5)
+        per_query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        
+        print(f"\nSemantic FAQ search: {per_query_ms:.3f} ms/query over {len(self.questions)} questions")
+        self.assertLess(per_query_ms, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+"""
+Unit tests for text_index.py
+Tests n-gram indexing and fuzzy resolution of free-typed symptoms
+"""
+
+import unittest
+import sys
+import os
+import time
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import benchmark
+from text_index import (
+    normalize_term,
+    char_ngrams,
+    NGramIndex,
+    SymptomResolver,
+    DiseaseResolver,
+    SymptomGazetteer
+)
+
+
+SYMPTOM_COLUMNS = [
+    'fever', 'headache', 'cough', 'fatigue', 'vomiting', 'nausea',
+    'dizziness', 'shortness of breath', 'sharp chest pain', 'skin_rash'
+]
+
+
+class TestTextNormalization(unittest.TestCase):
+    """Test cases for term normalization and n-gram extraction"""
+    
+    def test_normalize_term(self):
+        """Test lowercasing and collapsing of separators"""
+        self.assertEqual(normalize_term('  Skin_Rash '), 'skin rash')
+        self.assertEqual(normalize_term('Shortness-of  breath!'), 'shortness of breath')
+        self.assertEqual(normalize_term(''), '')
+        self.assertEqual(normalize_term(None), '')
+    
+    def test_char_ngrams_are_padded(self):
+        """Test that n-grams include word boundary markers"""
+        grams = char_ngrams('flu')
+        self.assertIn('$fl', grams)
+        self.assertIn('lu$', grams)
+    
+    def test_char_ngrams_short_term(self):
+        """Test n-grams of terms shorter than n"""
+        self.assertEqual(char_ngrams('a', 3), {'$a$'})
+
+
+class TestNGramIndex(unittest.TestCase):
+    """Test cases for the inverted n-gram index"""
+    
+    def setUp(self):
+        self.index = NGramIndex(['fever', 'headache', 'fatigue', 'dizziness'])
+    
+    def test_exact_term_ranks_first(self):
+        """Test that an exact term is the best match"""
+        results = self.index.search('headache')
+        self.assertEqual(results[0][0], 'headache')
+        self.assertAlmostEqual(results[0][1], 1.0)
+    
+    def test_misspelling_is_found(self):
+        """Test that a misspelt query still finds its term"""
+        results = self.index.search('diziness', limit=1)
+        self.assertEqual(results[0][0], 'dizziness')
+    
+    def test_min_score_filters_results(self):
+        """Test that unrelated queries return no matches above threshold"""
+        self.assertEqual(self.index.search('xylophone', min_score=0.8), [])
+    
+    def test_empty_query(self):
+        """Test that an empty query returns nothing"""
+        self.assertEqual(self.index.search(''), [])
+
+
+class TestSymptomResolver(unittest.TestCase):
+    """Test cases for symptom resolution"""
+    
+    def setUp(self):
+        self.resolver = SymptomResolver(SYMPTOM_COLUMNS)
+    
+    def test_exact_and_spaced_columns(self):
+        """Test resolution of exact names with spaces or underscores"""
+        self.assertEqual(self.resolver.resolve_term('Fever'), 'fever')
+        self.assertEqual(self.resolver.resolve_term('skin rash'), 'skin_rash')
+        self.assertEqual(self.resolver.resolve_term('shortness_of_breath'), 'shortness of breath')
+    
+    def test_typos(self):
+        """Test resolution of common misspellings"""
+        self.assertEqual(self.resolver.resolve_term('feaver'), 'fever')
+        self.assertEqual(self.resolver.resolve_term('headahce'), 'headache')
+        self.assertEqual(self.resolver.resolve_term('vomitting'), 'vomiting')
+    
+    def test_synonyms(self):
+        """Test resolution of lay synonyms present in the vocabulary"""
+        self.assertEqual(self.resolver.resolve_term('tiredness'), 'fatigue')
+        self.assertEqual(self.resolver.resolve_term('throwing up'), 'vomiting')
+        self.assertEqual(self.resolver.resolve_term('short of breath'), 'shortness of breath')
+    
+    def test_resolve_reports_unresolved(self):
+        """Test that unknown terms are reported and duplicates collapsed"""
+        resolved, unresolved = self.resolver.resolve(['fever', 'feaver', 'xylophone', ' '])
+        self.assertEqual(resolved, ['fever'])
+        self.assertEqual(unresolved, ['xylophone'])
+    
+    def test_exact_names_and_synonyms_skip_the_index(self):
+        """Test that only terms without an exact or synonym match are looked up in the n-gram index"""
+        with mock.patch.object(self.resolver._index, 'search', wraps=self.resolver._index.search) as search:
+            self.assertEqual(self.resolver.resolve_term('Skin Rash'), 'skin_rash')
+            self.assertEqual(self.resolver.resolve_term('throwing up'), 'vomiting')
+            self.assertEqual(search.call_count, 0)
+            self.assertEqual(self.resolver.resolve_term('headahce'), 'headache')
+            self.assertEqual(search.call_count, 1)
+
+    @benchmark
+    def test_resolution_is_sub_millisecond(self):
+        """Test that resolving a term takes well under a millisecond"""
+        start_time = time.perf_counter()
+        for _ in range(200):
+            self.resolver.resolve_term('headahce')
+        avg_time = (time.perf_counter() - start_time) / 200
+        self.assertLess(avg_time, 0.001)
+
+
+class TestDiseaseResolver(unittest.TestCase):
+    """Test cases for disease-name resolution"""
+    
+    def setUp(self):
+        self.resolver = DiseaseResolver([
+            'Diabetes ', 'Hypertension ', 'Heart attack', 'Malaria',
+            'Dimorphic hemmorhoids(piles)', 'Common Cold', 'malaria'
+        ])
+    
+    def test_duplicates_across_datasets_collapse(self):
+        """Test that names differing only by case or whitespace are one entry"""
+        self.assertEqual(len(self.resolver), 6)
+    
+    def test_misspelt_disease(self):
+        """Test ranking of a misspelt disease name"""
+        matches = self.resolver.match('diabetis')
+        self.assertEqual(matches[0][0], 'Diabetes')
+        self.assertGreaterEqual(matches[0][1], 0.8)
+    
+    def test_synonym(self):
+        """Test resolution of lay synonyms"""
+        self.assertEqual(self.resolver.resolve('high blood pressure'), 'Hypertension')
+        self.assertEqual(self.resolver.resolve('piles'), 'Dimorphic hemmorhoids(piles)')
+        self.assertEqual(self.resolver.resolve('heart attack'), 'Heart attack')
+        self.assertEqual(self.resolver.resolve('high bp'), 'Hypertension')
+
+    def test_ambiguous_aliases_do_not_resolve(self):
+        """Test that cardiac arrest and bare short tokens do not force a disease"""
+        self.assertNotEqual(self.resolver.resolve('cardiac arrest'), 'Heart attack')
+        for text in ('bp', 'sugar', 'sugar cravings', 'cold'):
+            self.assertIsNone(self.resolver.resolve(text), text)
+    
+    def test_unknown_disease(self):
+        """Test that unrelated text does not resolve"""
+        self.assertIsNone(self.resolver.resolve('spaceship'))
+    
+    def test_matches_are_ranked(self):
+        """Test that match scores are in descending order"""
+        matches = self.resolver.match('malarya cold', limit=5)
+        scores = [score for _, score in matches]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+class TestSymptomGazetteer(unittest.TestCase):
+    """Test cases for extracting symptom mentions from free text"""
+    
+    def setUp(self):
+        self.gazetteer = SymptomGazetteer(SYMPTOM_COLUMNS)
+    
+    def test_extracts_symptoms_from_sentence(self):
+        """Test that symptoms are found anywhere in a free-text description"""
+        text = "I have had a headache and high fever since Monday"
+        self.assertEqual(self.gazetteer.extract(text), ['headache', 'fever'])
+    
+    def test_longest_match_wins(self):
+        """Test that multi-word names are matched whole and map to their column"""
+        self.assertEqual(self.gazetteer.extract("Sharp chest pain and a skin-rash"), ['sharp chest pain', 'skin_rash'])
+        mentions = self.gazetteer.find("shortness of breath")
+        self.assertEqual(mentions, [('shortness of breath', 0, 3, False)])
+    
+    def test_synonyms_and_plurals(self):
+        """Test that lay variants and plural forms resolve to canonical columns"""
+        self.assertEqual(self.gazetteer.extract("I keep throwing up and feel tired"), ['vomiting', 'fatigue'])
+        self.assertEqual(self.gazetteer.extract("terrible headaches"), ['headache'])
+    
+    def test_negated_mentions_are_skipped(self):
+        """Test that symptoms the user denies are not extracted"""
+        self.assertEqual(self.gazetteer.extract("fever for two days but no cough"), ['fever'])
+        self.assertTrue(self.gazetteer.find("without nausea")[0][3])
+
+    def test_negated_contractions_are_skipped(self):
+        """Test that symptoms denied with "don't", "haven't" and the like are not extracted"""
+        self.assertEqual(self.gazetteer.extract("I don't have a fever but I have a cough"), ['cough'])
+        self.assertEqual(self.gazetteer.extract("I haven't had a cough"), [])
+        self.assertEqual(self.gazetteer.extract("She doesn’t get headaches, only vomiting"), ['vomiting'])
+        self.assertEqual(self.gazetteer.extract("I dont have nausea"), [])
+        self.assertEqual(self.gazetteer.extract("I can t sleep and I have a fever"), ['fever'])
+
+    def test_no_symptoms(self):
+        """Test that text without symptom names yields nothing"""
+        self.assertEqual(self.gazetteer.extract("how do I book an appointment"), [])
+        self.assertEqual(self.gazetteer.extract(""), [])
+    
+    def _count_trie_lookups(self, text):
+        """Return (mentions, number of trie node lookups) for one scan of the text"""
+        lookups = [0]
+
+        class CountingNode(dict):
+            def get(self, key, default=None):
+                lookups[0] += 1
+                return dict.get(self, key, default)
+
+        def counting(node):
+            return CountingNode({key: counting(child) if isinstance(child, dict) else child
+                                 for key, child in node.items()})
+
+        with mock.patch.object(self.gazetteer, '_root', counting(self.gazetteer._root)):
+            mentions = self.gazetteer.find(text)
+        return mentions, lookups[0]
+
+    def test_scan_steps_are_linear(self):
+        """Test that the trie is consulted a bounded number of times per token"""
+        sentence = "yesterday I had a headache then nausea and some dizziness "
+        short_mentions, short_lookups = self._count_trie_lookups(sentence * 200)
+        long_mentions, long_lookups = self._count_trie_lookups(sentence * 2000)
+        self.assertEqual((len(short_mentions), len(long_mentions)), (600, 6000))
+        self.assertAlmostEqual(long_lookups / short_lookups, 10, delta=0.01)
+        self.assertLessEqual(long_lookups, len(sentence.split()) * 2000 * self.gazetteer.max_phrase_tokens)
+
+    @benchmark
+    def test_scan_is_linear(self):
+        """Test that extraction time grows linearly with text length"""
+        sentence = "yesterday I had a headache then nausea and some dizziness "
+        start = time.perf_counter()
+        self.gazetteer.find(sentence * 200)
+        short_time = time.perf_counter() - start
+        start = time.perf_counter()
+        mentions = self.gazetteer.find(sentence * 2000)
+        long_time = time.perf_counter() - start
+        
+        self.assertEqual(len(mentions), 6000)
+        self.assertLess(long_time, short_time * 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
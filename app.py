@@ -10,6 +10,7 @@ from consultant import render_consultant_tab
 from helper import fetch_gemini_recommendations
 from chatbot import render_chatbot_tab
 from profile_manager import profile_manager 
+from prediction_history import model_version
 from datetime import datetime 
 
 
@@ -189,9 +190,8 @@ def initialize_session_state():
         st.session_state.predictions = {}
         st.session_state.current_profile = None
         st.session_state.current_profile_id = None
-        st.session_state.user_profiles = []
+        # Profiles are read from the process-wide cache in profile_manager, not copied per session
         st.session_state.initialized = True
-        profile_manager.load_profiles()
 
 
 initialize_session_state()
@@ -243,6 +243,18 @@ def load_models():
         "anemia_type_model": joblib.load(os.path.join(MODEL_DIR, "anemia_type_model.pkl")),
         "anemia_scaler": joblib.load(os.path.join(MODEL_DIR, "feature_scaler.pkl")),
         "anemia_label_encoder": joblib.load(os.path.join(MODEL_DIR, "label_encoder.pkl")),
+
+        # Fingerprints of the files behind each prediction, kept in its history
+        "versions": {
+            disease: model_version([os.path.join(MODEL_DIR, name) for name in files])
+            for disease, files in {
+                "Diabetes": ["diabetes_model.pkl", "diabetes_scaler.pkl"],
+                "Heart Disease": ["heart_model.pkl", "heart_scaler.pkl"],
+                "Fever": ["fever_severity_model.pkl", "fever_risk_model.pkl", "fever_scaler.pkl",
+                          "fever_target_encoder.pkl", "fever_label_encoders.pkl"],
+                "Anemia": ["anemia_risk_model.pkl", "anemia_type_model.pkl", "feature_scaler.pkl", "label_encoder.pkl"],
+            }.items()
+        },
     }
 
 # Preload models at app start
@@ -487,7 +499,8 @@ def render_input_page():
                 arr = np.array([[preg_val, user_inputs["Glucose"], user_inputs["Blood Pressure"], user_inputs["Skin Thickness"], user_inputs["Insulin"], user_inputs["BMI"], user_inputs["Diabetes Pedigree Function"], user_inputs["Age"]]], dtype=np.float64)
                 arr_scaled = models["diabetes_scaler"].transform(arr)
                 prob = models["diabetes_model"].predict_proba(arr_scaled)[0][1] * 100
-                st.session_state.predictions["Diabetes"] = {"prob": prob, "inputs": user_inputs}
+                st.session_state.predictions["Diabetes"] = {"prob": float(prob), "inputs": user_inputs,
+                                                          "model_version": models["versions"]["Diabetes"]}
                 
                 profile_manager.auto_save_profile()
                 st.rerun()
@@ -570,7 +583,8 @@ def render_input_page():
                 ]], dtype=np.float64)
                 arr_scaled = models["heart_scaler"].transform(arr)
                 prob = models["heart_model"].predict_proba(arr_scaled)[0][1] * 100
-                st.session_state.predictions["Heart Disease"] = {"prob": prob, "inputs": user_inputs_heart}
+                st.session_state.predictions["Heart Disease"] = {"prob": float(prob), "inputs": user_inputs_heart,
+                                                               "model_version": models["versions"]["Heart Disease"]}
                 
                 profile_manager.auto_save_profile()
                 st.rerun()
@@ -662,9 +676,10 @@ def render_input_page():
                 risk_percent = np.clip(risk_percent, 0, 100)
 
                 st.session_state.predictions["Fever"] = {
-                    "prob": risk_percent, 
+                    "prob": float(risk_percent), 
                     "inputs": user_inputs_fever, 
-                    "severity": severity_label
+                    "severity": str(severity_label),
+                    "model_version": models["versions"]["Fever"]
                 }
                 
                 profile_manager.auto_save_profile()
@@ -757,9 +772,10 @@ def render_input_page():
 
                     # Save to session state
                     st.session_state.predictions["Anemia"] = {
-                        "prob": risk_prob,
+                        "prob": float(risk_prob),
                         "inputs": user_inputs_anemia,
-                        "severity": anemia_type_label
+                        "severity": str(anemia_type_label),
+                        "model_version": models["versions"]["Anemia"]
                     }
                     
                     # AUTO-SAVE after prediction
@@ -0,0 +1,65 @@
+"""
+Knowledge Base Build Command
+Reads the chatbot dataset archive once, offline, and writes the single
+versioned knowledge-base bundle the app loads at startup:
+
+    python build_kb.py --zip chatdata.zip --output models/chatbot_kb.bundle
+
+Rerun it whenever chatdata.zip changes; the app falls back to parsing the
+archive while the bundle is older than it.
+"""
+
+import argparse
+import os
+import sys
+
+from chatbot_engine import get_kb_version, read_datasets
+from kb_bundle import DEFAULT_BUNDLE_PATH, write_bundle
+from knowledge_base import KnowledgeBase
+from semantic_index import DEFAULT_INDEX_PATH, SemanticFAQIndex, load_semantic_index
+
+
+def build_bundle(zip_path, output, index_path=DEFAULT_INDEX_PATH, semantic=True, components=128):
+    """Build the knowledge base from the archive and write it as a bundle, returning the manifest"""
+    errors = []
+    precautions_df, symptoms_df, faq_df, augmented_df = read_datasets(zip_path, errors)
+    for error in errors:
+        print(f"warning: {error['message']}", file=sys.stderr)
+    if precautions_df is None:
+        return None
+
+    kb = KnowledgeBase(precautions_df, symptoms_df, faq_df, augmented_df, version=get_kb_version(zip_path))
+    questions = list(kb.faq_questions)
+    if semantic and questions:
+        # Reuse a matching prebuilt index instead of refitting it
+        kb = kb.with_semantic_index(load_semantic_index(index_path, questions) or SemanticFAQIndex.build(
+            questions, n_components=components))
+    source = {'path': os.path.basename(zip_path), 'version': get_kb_version(zip_path)}
+    return write_bundle(kb, output, source=source)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the chatbot knowledge-base bundle from the dataset archive")
+    parser.add_argument('--zip', default='chatdata.zip', help="Chatbot dataset archive (default: chatdata.zip)")
+    parser.add_argument('--output', default=DEFAULT_BUNDLE_PATH, help="Where to write the bundle")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Prebuilt semantic FAQ index to reuse if current")
+    parser.add_argument('--components', type=int, default=128, help="LSA dimensions when fitting the semantic index")
+    parser.add_argument('--no-semantic', action='store_true', help="Leave the semantic FAQ index out of the bundle")
+    args = parser.parse_args(argv)
+
+    manifest = build_bundle(args.zip, args.output, args.index, semantic=not args.no_semantic,
+                            components=args.components)
+    if manifest is None:
+        print(f"Could not load the datasets from {args.zip}")
+        return 1
+
+    faq = manifest['faq']
+    print(f"FAQ index: {faq['questions']} questions -> {faq['entries']} entries "
+          f"({faq['collapsed']} near-duplicates collapsed, {faq['reduction']:.1%} smaller)")
+    print(f"Wrote {manifest['kb_version']} ({len(manifest['arrays'])} arrays, "
+          f"{manifest['payload_size'] / 1e6:.1f} MB) -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,590 @@
+"""
+Chatbot Engine Module
+Streamlit-independent retrieval and prediction core of the CureHelp+ chatbot.
+Loads the datasets, builds the shared read-only knowledge base and answers
+queries with structured results. Problems are reported as structured error
+records ({'code', 'message'}) instead of UI warnings, so the engine can run in
+a worker, a batch job or a separate service. chatbot.py only renders results.
+"""
+
+import copy
+import itertools
+import logging
+import os
+import threading
+from collections import OrderedDict
+from zipfile import ZipFile
+
+import pandas as pd
+
+from knowledge_base import KnowledgeBase, LayeredKnowledgeBase
+from response_cache import ResponseCache
+from intent_router import route
+from semantic_index import DEFAULT_INDEX_PATH, load_semantic_index
+from kb_bundle import load_bundle, write_bundle
+
+logger = logging.getLogger(__name__)
+
+# Minimum fuzzy score for a disease-name match to replace the raw user text
+DISEASE_MATCH_THRESHOLD = 0.8
+
+# Disease scoring for symptom queries: cosine similarity against individual augmented
+# rows, or naive-Bayes posteriors over per-disease symptom frequencies
+SCORING_METHODS = ('cosine', 'bayes')
+
+# Process-wide response cache shared by every session (OPTIMIZATION)
+response_cache = ResponseCache(maxsize=1024, ttl_seconds=3600)
+
+DATASET_FILES = {
+    'precautions': 'chatdata/Disease precaution.csv',
+    'symptoms': 'chatdata/DiseaseAndSymptoms.csv',
+    'faq': 'chatdata/medquad.csv',
+    'augmented': 'chatdata/Final_Augmented_dataset_Diseases_and_Symptoms.csv'
+}
+
+
+def make_error(code, message):
+    """Build a structured error record"""
+    return {'code': code, 'message': str(message)}
+
+
+def empty_response():
+    """Return a response with every field at its default"""
+    return {
+        'type': None,
+        'disease': None,
+        'confidence': 0,
+        'symptoms': [],
+        'precautions': [],
+        'description': None,
+        'faq_question': None,
+        'faq_answer': None,
+        'unresolved_symptoms': [],
+        'candidates': [],
+        'suggested_symptoms': [],
+        'error': None
+    }
+
+
+# ------------------------------------------------------------------ datasets
+
+def clean_dataframe(df):
+    """Clean dataframe by handling missing values and inconsistent data"""
+    if df is None:
+        return None
+
+    # Remove completely empty rows and columns
+    df = df.dropna(how='all')
+    df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
+
+    # Fill NaN values with empty strings for string columns
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].fillna('')
+
+    return df
+
+
+def load_csv_flexible_from_zip(zip_file, file_name, errors=None):
+    """Load CSV from ZipFile with flexible column handling, appending any problem to `errors`"""
+    try:
+        with zip_file.open(file_name) as f:
+            try:
+                df = pd.read_csv(f, encoding='utf-8', on_bad_lines='skip')
+            except:
+                try:
+                    df = pd.read_csv(f, encoding='latin-1', on_bad_lines='skip')
+                except:
+                    # For older pandas versions
+                    df = pd.read_csv(f, encoding='utf-8', error_bad_lines=False, warn_bad_lines=False)
+
+        return clean_dataframe(df)
+
+    except Exception as e:
+        if errors is not None:
+            errors.append(make_error('dataset_unreadable', f"Could not load {file_name} from zip: {e}"))
+        return None
+
+
+def read_datasets(zip_path='chatdata.zip', errors=None):
+    """Load all four datasets from the zip archive, appending any problems to `errors`"""
+    try:
+        with ZipFile(zip_path) as z:
+            # CSVs are inside chatdata/ folder within the zip
+            return tuple(load_csv_flexible_from_zip(z, file_name, errors) for file_name in DATASET_FILES.values())
+
+    except Exception as e:
+        if errors is not None:
+            errors.append(make_error('archive_unreadable', f"Error loading datasets from zip: {e}"))
+        return None, None, None, None
+
+
+def read_delta(delta_path, errors=None):
+    """Load whichever of the four datasets a delta archive contains, or None if it cannot be opened"""
+    try:
+        with ZipFile(delta_path) as z:
+            names = set(z.namelist())
+            return tuple(load_csv_flexible_from_zip(z, file_name, errors) if file_name in names else None
+                         for file_name in DATASET_FILES.values())
+
+    except Exception as e:
+        if errors is not None:
+            errors.append(make_error('delta_unreadable', f"Error loading delta from {delta_path}: {e}"))
+        return None
+
+
+def preprocess_datasets(precautions_df, symptoms_df, faq_df, augmented_df):
+    """Add lowercased lookup columns; datasets are returned unchanged if that fails"""
+    try:
+        # Clean disease names across all datasets
+        for df in [precautions_df, symptoms_df, faq_df]:
+            if df is not None and 'Disease' in df.columns:
+                df['Disease_clean'] = df['Disease'].str.lower().str.strip()
+
+        if augmented_df is not None and 'diseases' in augmented_df.columns:
+            augmented_df['diseases_clean'] = augmented_df['diseases'].str.lower().str.strip()
+
+        if faq_df is not None and 'question' in faq_df.columns:
+            faq_df['question_clean'] = faq_df['question'].str.lower().str.strip()
+    except Exception:
+        pass
+    return precautions_df, symptoms_df, faq_df, augmented_df
+
+
+def get_kb_version(zip_path='chatdata.zip'):
+    """Fingerprint the knowledge-base archive so cached responses invalidate when it changes"""
+    try:
+        stat = os.stat(zip_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    except OSError:
+        return 'missing'
+
+
+def build_knowledge_base(zip_path='chatdata.zip', version=None, index_path=DEFAULT_INDEX_PATH, errors=None):
+    """Load the archive and build a read-only knowledge base, or return None if it cannot be loaded"""
+    precautions_df, symptoms_df, faq_df, augmented_df = read_datasets(zip_path, errors)
+    if precautions_df is None:
+        return None
+    # The knowledge base checks the index against its FAQ entries after collapsing near-duplicates
+    semantic_index = load_semantic_index(index_path)
+    return KnowledgeBase(precautions_df, symptoms_df, faq_df, augmented_df, version=version,
+                         semantic_index=semantic_index)
+
+
+# ------------------------------------------------------------------ answering
+
+def classify_input_type(user_input):
+    """Improved input type classification"""
+    return route(user_input).type
+
+
+def normalize_query(user_input):
+    """Normalize a query for cache keying (case and whitespace insensitive)"""
+    return ' '.join(user_input.lower().split())
+
+
+def respond(user_input, kb, scoring='cosine'):
+    """Process user input against a knowledge base and return a structured response"""
+    response = empty_response()
+
+    if not user_input:
+        return response
+
+    # Classify input type and extract the disease span in one pass
+    intent = route(user_input)
+    input_type = intent.type
+    response['type'] = input_type
+
+    try:
+        # Free-text descriptions ("I have had a headache and high fever since Monday") are not
+        # questions; if the gazetteer finds symptoms in them, predict from those symptoms
+        mentioned_symptoms = []
+        if input_type == 'question' and not intent.is_question and '?' not in user_input:
+            mentioned_symptoms = kb.extract_symptoms(user_input)
+            if mentioned_symptoms:
+                input_type = 'symptoms'
+        response['type'] = input_type
+
+        if input_type == 'question':
+            if intent.disease_span:
+                potential_disease = intent.disease_span
+                # Try to get symptoms directly for symptom questions
+                if intent.mentions_symptoms:
+                    matches = kb.match_disease(potential_disease)
+                    if matches and matches[0][1] >= DISEASE_MATCH_THRESHOLD:
+                        potential_disease = matches[0][0]
+                    symptoms = kb.symptoms_for(potential_disease)
+                    if symptoms:
+                        response['type'] = 'disease'
+                        response['disease'] = potential_disease
+                        response['confidence'] = 0.95
+                        response['symptoms'] = symptoms
+                        response['precautions'] = kb.precautions_for(potential_disease)
+                        response['description'] = kb.description_for(potential_disease)
+                        response['candidates'] = matches
+                        return response
+
+            # Fallback to FAQ search
+            faq_match = kb.find_faq(user_input, intent.is_symptom_question)
+            if faq_match is not None:
+                response['faq_question'] = faq_match['question']
+                response['faq_answer'] = faq_match['answer']
+
+        elif input_type == 'symptoms':
+            if mentioned_symptoms:
+                symptoms_list = mentioned_symptoms
+            else:
+                symptoms_list = [symptom.strip() for symptom in user_input.split(',')]
+
+            # Resolve typos and synonyms once, and report what could not be matched
+            resolved_symptoms, unresolved_symptoms = kb.resolve_symptoms(symptoms_list)
+            response['unresolved_symptoms'] = unresolved_symptoms
+
+            # Predict disease, keeping the runners-up as ranked candidates
+            if scoring == 'bayes':
+                ranked = kb.rank_diseases_bayes(resolved_symptoms)
+            else:
+                ranked = kb.rank_diseases(resolved_symptoms)
+            response['candidates'] = [(disease, score) for disease, score, _ in ranked]
+            if ranked:
+                disease_name, confidence, disease_vector = ranked[0]
+                response['disease'] = disease_name
+                response['confidence'] = confidence
+
+                # Get additional information
+                response['symptoms'] = kb.symptoms_for(disease_name)
+                response['precautions'] = kb.precautions_for(disease_name)
+                response['description'] = kb.description_for(disease_name)
+
+                # Ask about the symptoms that would best tell the top candidates apart
+                response['suggested_symptoms'] = kb.suggest_symptoms(resolved_symptoms, response['candidates'])
+
+        elif input_type == 'disease':
+            # Resolve typos and lay names ("diabetis", "high blood pressure") to a known disease
+            matches = kb.match_disease(user_input)
+            response['candidates'] = matches
+
+            if matches and matches[0][1] >= DISEASE_MATCH_THRESHOLD:
+                disease_name = matches[0][0]
+                response['confidence'] = round(0.95 * matches[0][1], 2)
+            else:
+                disease_name = user_input.strip()
+                response['confidence'] = 0.95
+            response['disease'] = disease_name
+
+            # Get disease information
+            response['symptoms'] = kb.symptoms_for(disease_name)
+            response['precautions'] = kb.precautions_for(disease_name)
+            response['description'] = kb.description_for(disease_name)
+
+    except Exception as e:
+        response['error'] = make_error('processing_failed', f"Error processing user input: {e}")
+
+    return response
+
+
+def _respond_cached(user_input, kb_version, get_kb, cache=response_cache, scoring='cosine'):
+    """Serve repeated queries from the response cache, building the response on a miss (OPTIMIZATION)"""
+    # A knowledge base built without a version (by a caller of answer_query) cannot be told apart from
+    # the next one, so bypass the cache; the engine and the DataFrame helpers always assign a version
+    if not user_input or kb_version is None:
+        return respond(user_input, get_kb(), scoring)
+
+    cache_key = (normalize_query(user_input), kb_version, scoring)
+    response = cache.get(cache_key)
+    if response is not None:
+        return response
+
+    response = respond(user_input, get_kb(), scoring)
+    if response['error'] is None:
+        cache.set(cache_key, response)
+    return response
+
+
+def answer_query(user_input, kb, cache=response_cache, scoring='cosine'):
+    """Answer a query from an already built knowledge base"""
+    return _respond_cached(user_input, kb.version, lambda: kb, cache, scoring)
+
+
+class _FrameKnowledgeBases:
+    """Knowledge bases built from raw DataFrames, reused while the same DataFrame objects are passed again
+
+    Entries keep their DataFrames alive, so an id in a key is never reused by
+    another object; DataFrames must not be modified in place once passed.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (frames, kb)
+        self._lock = threading.Lock()
+        self._serials = itertools.count(1)
+
+    def get(self, precautions_df=None, symptoms_df=None, faq_df=None, augmented_df=None, version=None):
+        frames = (precautions_df, symptoms_df, faq_df, augmented_df)
+        key = tuple(None if df is None else id(df) for df in frames) + (version,)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+        # Ad hoc datasets get a unique version, so their responses can be cached too
+        kb = KnowledgeBase(*frames, version=version if version is not None else f"frames-{next(self._serials)}")
+        with self._lock:
+            entry = self._entries.setdefault(key, (frames, kb))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Legacy DataFrame-level helpers build each knowledge base once, not on every call (OPTIMIZATION)
+frame_knowledge_bases = _FrameKnowledgeBases()
+
+
+def process_user_input(user_input, precautions_df, symptoms_df, faq_df, augmented_df, kb_version=None):
+    """Process user input against raw datasets; services should use ChatbotEngine instead"""
+    kb = frame_knowledge_bases.get(precautions_df, symptoms_df, faq_df, augmented_df, version=kb_version)
+    return answer_query(user_input, kb)
+
+
+# ------------------------------------------------- DataFrame-level helpers
+
+def find_question_answer(question, faq_df, intent=None):
+    """Find the best matching question in FAQ dataset - Optimized with early exit"""
+    if faq_df is None or faq_df.empty:
+        return None
+
+    # Check if it's a symptom question (patterns are precompiled in the intent router)
+    if intent is None:
+        intent = route(question)
+    return frame_knowledge_bases.get(faq_df=faq_df).find_faq(question, intent.is_symptom_question)
+
+
+def resolve_symptoms(symptoms_list, augmented_df):
+    """Map free-typed symptoms to canonical symptom columns, returning (resolved, unresolved)"""
+    return frame_knowledge_bases.get(augmented_df=augmented_df).resolve_symptoms(symptoms_list)
+
+
+def extract_symptoms(text, augmented_df):
+    """Find the symptom columns mentioned (and not negated) in free text"""
+    return frame_knowledge_bases.get(augmented_df=augmented_df).extract_symptoms(text)
+
+
+def rank_diseases_from_symptoms(symptoms_list, augmented_df, top_k=5):
+    """Rank distinct diseases by cosine similarity to the symptoms, returning (disease, score, vector) triples"""
+    if augmented_df is None:
+        return []
+    return frame_knowledge_bases.get(augmented_df=augmented_df).rank_diseases(symptoms_list, top_k)
+
+
+def predict_disease_from_symptoms(symptoms_list, augmented_df):
+    """Predict disease based on symptoms using cosine similarity - Optimized with vectorization"""
+    ranked = rank_diseases_from_symptoms(symptoms_list, augmented_df, top_k=1)
+    return ranked[0] if ranked else None
+
+
+def match_disease_name(user_text, precautions_df, symptoms_df, augmented_df, limit=5):
+    """Rank known disease names against free-typed text, tolerating typos and lay synonyms"""
+    return frame_knowledge_bases.get(precautions_df, symptoms_df, None, augmented_df).match_disease(user_text, limit)
+
+
+def get_disease_symptoms(disease_name, symptoms_df, augmented_df):
+    """Get all symptoms for a given disease"""
+    return frame_knowledge_bases.get(symptoms_df=symptoms_df, augmented_df=augmented_df).symptoms_for(disease_name)
+
+
+def get_disease_precautions(disease_name, precautions_df):
+    """Get precautions for a given disease"""
+    return frame_knowledge_bases.get(precautions_df=precautions_df).precautions_for(disease_name)
+
+
+def get_disease_description(disease_name, faq_df):
+    """Get description for a disease from FAQ dataset"""
+    return frame_knowledge_bases.get(faq_df=faq_df).description_for(disease_name)
+
+
+# ------------------------------------------------------------------ engine
+
+class ChatbotEngine:
+    """Thread-safe chatbot service over one dataset archive plus incremental delta segments
+
+    A bundle at `bundle_path` (written offline by build_kb.py) is loaded when
+    it is current. With `publish_bundle`, an engine that had to parse the
+    archive also writes the bundle for other local processes to attach to.
+    """
+
+    def __init__(self, zip_path='chatdata.zip', index_path=DEFAULT_INDEX_PATH, cache=response_cache, max_deltas=4,
+                 scoring='cosine', bundle_path=None, publish_bundle=False):
+        if scoring not in SCORING_METHODS:
+            raise ValueError(f"Unknown scoring method {scoring!r}; expected one of {SCORING_METHODS}")
+        self.scoring = scoring
+        self.zip_path = zip_path
+        self.index_path = index_path
+        self.bundle_path = bundle_path
+        self.publish_bundle = publish_bundle
+        self.cache = cache
+        self.max_deltas = max_deltas
+        self.load_errors = []
+        self._kb = None
+        self._archive_version = None
+        self._generation = 0
+        self._compaction = None
+        self._lock = threading.RLock()
+
+    def _source_path(self):
+        """Load from the prebuilt bundle when there is one at least as new as the archive"""
+        if not self.bundle_path:
+            return self.zip_path
+        try:
+            bundle_mtime = os.stat(self.bundle_path).st_mtime_ns
+        except OSError:
+            return self.zip_path
+        try:
+            stale = os.stat(self.zip_path).st_mtime_ns > bundle_mtime
+        except OSError:
+            stale = False
+        return self.zip_path if stale else self.bundle_path
+
+    def _load(self, source, version, errors):
+        """Load the knowledge base from its source, returning it with the version it was loaded under"""
+        if source == self.bundle_path:
+            try:
+                return load_bundle(source, use_mmap=True, version=version), version
+            except (OSError, ValueError, KeyError) as e:
+                errors.append(make_error('bundle_unreadable', f"Ignoring knowledge-base bundle {source}: {e}"))
+
+        kb = build_knowledge_base(self.zip_path, version, self.index_path, errors)
+        if kb is None or not (self.bundle_path and self.publish_bundle):
+            return kb, version
+        return self._publish(kb, version)
+
+    def _publish(self, kb, version):
+        """Write a freshly built knowledge base as the bundle and switch to its memory-mapped copy"""
+        # Every other local process then attaches to the same read-only pages instead of
+        # parsing the archive and holding its own copy of the arrays (OPTIMIZATION)
+        try:
+            write_bundle(kb, self.bundle_path, source={'path': os.path.basename(self.zip_path), 'version': version})
+            bundle_version = get_kb_version(self.bundle_path)
+            return load_bundle(self.bundle_path, verify=False, use_mmap=True, version=bundle_version), bundle_version
+        except (OSError, ValueError) as e:
+            # An operator problem (e.g. a read-only deploy), not something to show every user
+            logger.warning("Could not publish knowledge-base bundle %s: %s", self.bundle_path, e)
+            return kb, version
+
+    def knowledge_base(self):
+        """Return the shared knowledge base, rebuilding it only when the bundle or archive changes"""
+        source = self._source_path()
+        version = get_kb_version(source)
+        if self._archive_version == version:
+            return self._kb
+
+        with self._lock:
+            # Another thread may have rebuilt (and published) it while we waited
+            source = self._source_path()
+            version = get_kb_version(source)
+            if self._archive_version != version:
+                errors = []
+                # A rebuilt archive is expected to include earlier deltas, so they are dropped
+                self._kb, version = self._load(source, version, errors)
+                self.load_errors = errors
+                self._archive_version = version
+                self._generation = 0
+            return self._kb
+
+    def apply_delta(self, delta_path):
+        """Merge a delta archive (any subset of the dataset CSVs) into the live knowledge base"""
+        errors = []
+        frames = read_delta(delta_path, errors)
+        if frames is None:
+            return {'version': None, 'errors': errors}
+        result = self.apply_delta_frames(*frames)
+        result['errors'] = errors + result['errors']
+        return result
+
+    def apply_delta_frames(self, precautions_df=None, symptoms_df=None, faq_df=None, augmented_df=None):
+        """Append new dataset rows as a delta segment and bump the knowledge-base version"""
+        delta = KnowledgeBase(precautions_df, symptoms_df, faq_df, augmented_df)
+
+        with self._lock:
+            kb = self.knowledge_base()
+            if kb is None:
+                return {'version': None, 'errors': [make_error('knowledge_base_unavailable',
+                        f"Medical databases could not be loaded from {self.zip_path}")]}
+
+            # A new version keys new cache entries, so answers cached before the delta are never served
+            self._generation += 1
+            version = f"{self._archive_version}+{self._generation}"
+            if isinstance(kb, LayeredKnowledgeBase):
+                self._kb = kb.with_delta(delta, version)
+            else:
+                self._kb = LayeredKnowledgeBase(kb, (delta,), version=version)
+
+            if len(self._kb.deltas) >= self.max_deltas:
+                self.compact()
+            return {'version': version, 'errors': []}
+
+    def compact(self, background=True):
+        """Merge delta segments into a single base, in a background thread by default"""
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return self._compaction
+            snapshot = self._kb
+            if not isinstance(snapshot, LayeredKnowledgeBase):
+                return None
+            if background:
+                self._compaction = threading.Thread(target=self._compact, args=(snapshot,),
+                                                    name='kb-compaction', daemon=True)
+                self._compaction.start()
+                return self._compaction
+        self._compact(snapshot)
+        return None
+
+    def _compact(self, snapshot):
+        """Build the merged base outside the lock, then swap it in if the archive was not reloaded"""
+        merged = snapshot.compact()
+
+        with self._lock:
+            current = self._kb
+            if not isinstance(current, LayeredKnowledgeBase) or current.base is not snapshot.base:
+                return
+            # Deltas applied while compacting stay layered on top of the merged base
+            remaining = current.deltas[len(snapshot.deltas):]
+            self._kb = LayeredKnowledgeBase(merged, remaining, version=current.version) if remaining else merged
+
+    def answer(self, query):
+        """Answer one query, returning a structured response dict"""
+        kb = self.knowledge_base()
+        if kb is None:
+            return self._unavailable(query)
+        return answer_query(query, kb, self.cache, self.scoring)
+
+    def answer_batch(self, queries):
+        """Answer several queries against one knowledge-base snapshot, computing each distinct query once"""
+        kb = self.knowledge_base()
+        answers = {}
+        responses = []
+        for query in queries:
+            key = normalize_query(query) if query else query
+            if key not in answers:
+                if kb is None:
+                    answers[key] = self._unavailable(query)
+                else:
+                    answers[key] = answer_query(query, kb, self.cache, self.scoring)
+                responses.append(answers[key])
+            else:
+                # Each caller gets its own copy of a shared answer
+                responses.append(copy.deepcopy(answers[key]))
+        return responses
+
+    def _unavailable(self, query):
+        """Response for a query that arrives while no knowledge base could be loaded"""
+        response = empty_response()
+        if query:
+            response['type'] = classify_input_type(query)
+            response['error'] = make_error('knowledge_base_unavailable',
+                                           f"Medical databases could not be loaded from {self.zip_path}")
+        return response
@@ -0,0 +1,88 @@
+"""
+Intent Router Module
+Routes chatbot input in a single regex pass. All question, symptom-question and
+disease-span patterns are compiled once at import time into one combined regex
+with named groups, so classification and disease extraction no longer rebuild
+pattern lists or call re.search once per pattern.
+"""
+
+import re
+from collections import namedtuple
+
+# Phrases that mark the input as a question
+QUESTION_PATTERNS = (
+    r'what (are|is)',
+    r'how (to|do|can)',
+    r'why (is|are)',
+    r'when (should|do)',
+    r'where (can|do)',
+    r'who (should|can)',
+    r'can you',
+    r'could you',
+    r'would you',
+    r'explain',
+    r'tell me about'
+)
+
+# Phrases that mark a question as asking about symptoms, causes or treatment
+SYMPTOM_QUESTION_PATTERNS = (
+    r'what (are|is) (the )?(symptoms|signs) of',
+    r'what (are|is) (the )?(causes|reason) of',
+    r'what (are|is) (the )?(treatment|remedy) for',
+    r'how (to|do) (treat|handle|manage)',
+    r'what (is|are)'
+)
+
+# The disease a question is about, e.g. "symptoms of <malaria>?". The connective
+# after a keyword ("of", "for") is consumed so it never leaks into the span.
+DISEASE_SPAN_PATTERN = r'(?:symptoms|signs|causes|treatment|of|for)\s+(?:(?:of|for)\s+)?(?P<disease>[^?]+)'
+
+Intent = namedtuple('Intent', ['type', 'is_question', 'is_symptom_question', 'mentions_symptoms', 'disease_span'])
+
+
+def _optional_lookahead(name, patterns):
+    """Wrap alternatives in an optional lookahead that records the leftmost match as a named group"""
+    alternatives = '|'.join(f'(?:{pattern})' for pattern in patterns)
+    return rf'(?:(?=.*?(?P<{name}>{alternatives})))?'
+
+
+# Every lookahead is anchored at position 0 and scans forward, so one match()
+# call sets each named group exactly as a separate re.search would have.
+_INTENT_RE = re.compile(
+    _optional_lookahead('question', QUESTION_PATTERNS)
+    + _optional_lookahead('symptom_question', SYMPTOM_QUESTION_PATTERNS)
+    + _optional_lookahead('symptom_word', (r'symptom', r'sign'))
+    + rf'(?:(?=.*?{DISEASE_SPAN_PATTERN}))?',
+    re.DOTALL
+)
+
+
+def route(user_input):
+    """Classify the input and extract the disease span in a single regex pass"""
+    if not user_input:
+        return Intent('question', False, False, False, None)
+
+    text = user_input.lower()
+    match = _INTENT_RE.match(text)
+
+    is_question = match.group('question') is not None
+    disease_span = match.group('disease')
+    word_count = len(user_input.split())
+
+    if is_question or '?' in user_input:
+        input_type = 'question'
+    elif ',' in user_input and word_count <= 5:
+        input_type = 'symptoms'
+    elif word_count <= 3:
+        input_type = 'disease'
+    else:
+        # Default to question for ambiguous cases
+        input_type = 'question'
+
+    return Intent(
+        input_type,
+        is_question,
+        match.group('symptom_question') is not None,
+        match.group('symptom_word') is not None,
+        disease_span.strip() if disease_span is not None else None
+    )
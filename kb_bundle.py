@@ -0,0 +1,218 @@
+"""
+Knowledge Base Bundle Module
+Single-file binary artifact holding a fully built knowledge base: the cleaned
+lookup tables, FAQ entries, disease index, sparse symptom matrix and its
+statistics, plus the semantic FAQ index and vocabulary. The file starts with a
+JSON manifest (format version, content checksum, array table) followed by a
+payload of 64-byte aligned arrays, so it loads in one read or a memory map with
+np.frombuffer views and no pandas CSV parsing. Memory-mapped, the arrays and
+the FAQ answer text live in the page cache and are shared read-only by every
+local process that maps the same bundle.
+
+Layout:
+    MAGIC (8 bytes) | manifest length (uint64 LE) | manifest JSON | padding | payload
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+import numpy as np
+
+from knowledge_base import KnowledgeBase, LayeredKnowledgeBase, faq_collapse_report
+from semantic_index import SemanticFAQIndex
+
+BUNDLE_MAGIC = b'CHKB\x00\x00\x00\x01'
+BUNDLE_FORMAT_VERSION = 1
+
+# Arrays start on cache-line boundaries so mapped views are aligned for vectorized code
+_ALIGNMENT = 64
+_HEADER = struct.Struct('<8sQ')
+
+DEFAULT_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "chatbot_kb.bundle")
+
+
+def _padding(offset):
+    """Bytes needed to move offset to the next alignment boundary"""
+    return -offset % _ALIGNMENT
+
+
+class StringTable(Sequence):
+    """Read-only sequence of strings decoded on access from UTF-8 bytes and an offsets array"""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets      # (strings + 1,) int64 byte offsets into data
+        self.data = data            # uint8 UTF-8 bytes of every string, concatenated
+
+    @classmethod
+    def encode(cls, strings):
+        """Build a table from Python strings"""
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+
+def _collect_state(kb):
+    """Gather the knowledge base and semantic index state under one namespace"""
+    kb_objects, kb_arrays = kb.to_state()
+    objects = {'kb': kb_objects, 'semantic_index': None}
+    arrays = {f'kb/{name}': array for name, array in kb_arrays.items()}
+
+    # FAQ answers are most of the text; as a string table they stay in the shared pages (OPTIMIZATION)
+    answers = kb_objects['faq_answers']
+    if all(isinstance(answer, str) for answer in answers):
+        table = StringTable.encode(answers)
+        kb_objects['faq_answers'] = None
+        arrays['kb/faq_answers.offsets'] = table.offsets
+        arrays['kb/faq_answers.utf8'] = table.data
+    if kb.semantic_index is not None:
+        index_objects, index_arrays = kb.semantic_index.to_state()
+        objects['semantic_index'] = index_objects
+        arrays.update({f'semantic_index/{name}': array for name, array in index_arrays.items()})
+    return objects, arrays
+
+
+def write_bundle(kb, path, source=None):
+    """Write a knowledge base to a bundle file and return its manifest"""
+    if isinstance(kb, LayeredKnowledgeBase):
+        kb = kb.compact()
+    objects, arrays = _collect_state(kb)
+
+    blob = json.dumps(objects, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    chunks = [blob]
+    offset = len(blob)
+    table = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise ValueError(f"Array {name} has dtype object and cannot be bundled")
+        pad = _padding(offset)
+        chunks.append(b'\0' * pad)
+        offset += pad
+        table[name] = {'offset': offset, 'size': array.nbytes, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        chunks.append(array.tobytes())
+        offset += array.nbytes
+    payload = b''.join(chunks)
+    checksum = hashlib.sha256(payload).hexdigest()
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'kb_version': f"bundle-{checksum[:16]}",
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'source': source or {},
+        'faq': faq_collapse_report(kb),
+        'checksum': {'algorithm': 'sha256', 'value': checksum},
+        'payload_size': len(payload),
+        'objects': {'offset': 0, 'size': len(blob)},
+        'arrays': table
+    }
+    manifest_bytes = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+    header = _HEADER.pack(BUNDLE_MAGIC, len(manifest_bytes)) + manifest_bytes
+    header += b'\0' * _padding(len(header))
+
+    # Write next to the target and rename, so readers never see a half-written bundle
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return manifest
+
+
+def _parse_header(buffer, path):
+    """Return (manifest, payload start) after validating the magic and format version"""
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f"{path} is too short to be a knowledge-base bundle")
+    magic, manifest_size = _HEADER.unpack_from(buffer)
+    if magic != BUNDLE_MAGIC:
+        raise ValueError(f"{path} is not a knowledge-base bundle")
+    manifest_end = _HEADER.size + manifest_size
+    try:
+        manifest = json.loads(bytes(buffer[_HEADER.size:manifest_end]))
+    except ValueError:
+        raise ValueError(f"{path} has a corrupt bundle manifest")
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported knowledge-base bundle format in {path}")
+    return manifest, manifest_end + _padding(manifest_end)
+
+
+def read_manifest(path):
+    """Read only the manifest of a bundle file"""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) == _HEADER.size and header[:len(BUNDLE_MAGIC)] == BUNDLE_MAGIC:
+            header += f.read(_HEADER.unpack(header)[1])
+    return _parse_header(header, path)[0]
+
+
+def _view_array(payload, entry):
+    """Zero-copy read-only view of one payload array"""
+    dtype = np.dtype(entry['dtype'])
+    if entry['size'] == 0:
+        array = np.zeros(entry['shape'], dtype=dtype)
+        array.setflags(write=False)
+        return array
+    count = entry['size'] // dtype.itemsize
+    array = np.frombuffer(payload, dtype=dtype, count=count, offset=entry['offset']).reshape(entry['shape'])
+    array.setflags(write=False)
+    return array
+
+
+def load_bundle(path, verify=True, use_mmap=False, version=None):
+    """Load a knowledge base from a bundle with one read (or one memory map) and no dataset parsing"""
+    with open(path, 'rb') as f:
+        if use_mmap:
+            # Pages are shared with every other process mapping the same file (OPTIMIZATION)
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    view = memoryview(buffer)
+    manifest, payload_start = _parse_header(view, path)
+    payload = view[payload_start:payload_start + manifest['payload_size']]
+    if len(payload) != manifest['payload_size']:
+        raise ValueError(f"{path} is truncated")
+    if verify and hashlib.sha256(payload).hexdigest() != manifest['checksum']['value']:
+        raise ValueError(f"{path} failed its checksum")
+
+    objects_entry = manifest['objects']
+    objects = json.loads(bytes(payload[objects_entry['offset']:objects_entry['offset'] + objects_entry['size']]))
+    arrays = {name: _view_array(payload, entry) for name, entry in manifest['arrays'].items()}
+
+    def namespace(prefix):
+        return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+    kb_arrays = namespace('kb/')
+    if objects['kb']['faq_answers'] is None:
+        objects['kb']['faq_answers'] = StringTable(kb_arrays.pop('faq_answers.offsets'), kb_arrays.pop('faq_answers.utf8'))
+
+    semantic_index = None
+    if objects['semantic_index'] is not None:
+        semantic_index = SemanticFAQIndex.from_state(objects['semantic_index'], namespace('semantic_index/'))
+    return KnowledgeBase.from_state(objects['kb'], kb_arrays,
+                                    version=version if version is not None else manifest['kb_version'],
+                                    semantic_index=semantic_index)
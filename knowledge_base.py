@@ -0,0 +1,858 @@
+"""
+Knowledge Base Module
+Immutable, once-built container for everything the chatbot derives from its
+datasets: normalized lookup tables, the FAQ word index, the sparse symptom
+matrix and the symptom/disease resolvers. A KnowledgeBase is read-only after
+construction, so one instance can be shared by every session in the process.
+"""
+
+import re
+from collections import defaultdict
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from near_duplicates import collapse_near_duplicates
+from text_index import SymptomResolver, DiseaseResolver, SymptomGazetteer
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Words long enough to be treated as disease terms in FAQ scoring
+_DISEASE_TERM_RE = re.compile(r'[a-zA-Z]{5,}')
+
+_NON_SYMPTOM_COLUMNS = ('diseases', 'diseases_clean')
+
+# Laplace smoothing for naive-Bayes symptom likelihoods
+BAYES_SMOOTHING = 1.0
+
+# Minimum cosine similarity for a semantic FAQ match to be trusted
+SEMANTIC_MATCH_THRESHOLD = 0.6
+
+# Minimum word-shingle Jaccard similarity for two FAQ questions to collapse into one entry
+FAQ_DUPLICATE_THRESHOLD = 0.8
+
+# Numeric state exported by KnowledgeBase.to_state(), dense arrays then CSR matrices
+_STATE_ARRAYS = ('_row_inv_norms', '_group_starts', '_group_sizes', '_row_ids', '_log_likelihoods', '_log_priors')
+_STATE_MATRICES = ('symptom_matrix', 'group_symptom_counts', 'symptom_cooccurrence')
+
+
+def _clean_name(name):
+    """Normalize a disease name the way the lookups compare it"""
+    return str(name).lower().strip()
+
+
+def union_in_order(sequences):
+    """Return the distinct items of several sequences as a tuple, in first-appearance order"""
+    return tuple(dict.fromkeys(item for sequence in sequences for item in sequence))
+
+
+def _remap_sparse(matrix, row_map, column_map, shape):
+    """Move the entries of a sparse matrix to new row and column ids in a larger CSR matrix"""
+    coo = matrix.tocoo()
+    return sparse.csr_matrix((coo.data, (row_map[coo.row], column_map[coo.col])), shape=shape)
+
+
+def separating_symptoms(group_counts, group_sizes, cooccurrence, columns, reported, groups, weights, limit=3):
+    """Rank unreported symptoms by how well they split the candidate diseases
+
+    A symptom separates candidates when its frequency differs strongly between
+    them, measured as the score-weighted variance of per-disease frequencies.
+    Only symptoms that co-occur with a reported symptom are proposed.
+    """
+    if len(groups) < 2 or not len(reported):
+        return []
+
+    # Per-disease symptom frequencies of the candidate rows only, all at once
+    frequencies = group_counts[groups].toarray() / group_sizes[groups][:, None]
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum() if weights.sum() > 0 else np.full(len(groups), 1.0 / len(groups))
+    mean = weights @ frequencies
+    spread = weights @ (frequencies - mean) ** 2
+
+    plausible = np.asarray(cooccurrence[reported].sum(axis=0)).ravel() > 0
+    spread[~plausible] = 0
+    spread[reported] = 0
+
+    best = np.argsort(-spread, kind='stable')[:limit]
+    return [columns[column].replace('_', ' ') for column in best if spread[column] > 0]
+
+
+def naive_bayes_tables(group_counts, group_sizes, alpha=BAYES_SMOOTHING):
+    """Return smoothed per-disease symptom log-likelihoods and log priors from row counts"""
+    sizes = np.asarray(group_sizes, dtype=np.float64)
+    if not len(sizes):
+        return np.zeros(group_counts.shape, dtype=np.float32), np.zeros(0)
+    likelihoods = (group_counts.toarray() + alpha) / (sizes[:, None] + 2 * alpha)
+    return np.log(likelihoods).astype(np.float32), np.log(sizes / sizes.sum())
+
+
+def _rank_bayes(kb, symptoms_list, top_k):
+    """Rank diseases by naive-Bayes posterior over the reported symptoms"""
+    resolved, _ = kb.symptom_resolver.resolve(symptoms_list)
+    if not resolved or not kb.group_diseases:
+        return []
+
+    column_index = kb.symptom_resolver.column_index
+    reported = [column_index[column] for column in resolved]
+
+    # One pass over the reported columns of the log-likelihood table plus priors
+    log_posterior = kb._log_priors + kb._log_likelihoods[:, reported].sum(axis=1, dtype=np.float64)
+    probabilities = np.exp(log_posterior - log_posterior.max())
+    probabilities /= probabilities.sum()
+
+    ranked = []
+    for group in np.argsort(-probabilities, kind='stable')[:top_k]:
+        profile = kb.group_symptom_counts[group].toarray().ravel() / kb._group_sizes[group]
+        ranked.append((kb.group_diseases[group], float(probabilities[group]), profile))
+    return ranked
+
+
+def _suggest_for(kb, resolved, candidates, limit):
+    """Map resolved symptoms and candidate diseases to ids and rank separating symptoms"""
+    column_index = kb.symptom_resolver.column_index
+    reported = np.array([column_index[column] for column in resolved if column in column_index], dtype=np.int64)
+    known = [(kb._group_ids[disease], score) for disease, score in candidates if disease in kb._group_ids]
+    groups = np.array([group for group, _ in known], dtype=np.int64)
+    weights = [score for _, score in known]
+    return separating_symptoms(kb.group_symptom_counts, kb._group_sizes, kb.symptom_cooccurrence,
+                               kb.symptom_columns, reported, groups, weights, limit)
+
+
+def faq_entries(faq_df):
+    """Return the FAQ questions and answers of a dataset, in order"""
+    if faq_df is None or 'question' not in faq_df.columns:
+        return [], []
+    answers = list(faq_df['answer']) if 'answer' in faq_df.columns else [None] * len(faq_df)
+    return list(faq_df['question']), answers
+
+
+def collapse_faq(questions, answers, threshold=FAQ_DUPLICATE_THRESHOLD):
+    """Keep the first of each group of near-duplicate questions, returning (questions, answers, alternates)
+
+    alternates maps each kept entry's position to the questions collapsed into it.
+    Only questions with the same answer (ignoring case and spacing) collapse, so
+    an alternate's answer is always the kept entry's answer.
+    """
+    if not questions:
+        return list(questions), list(answers), {}
+    answer_keys = [None if answer is None else ' '.join(str(answer).lower().split()) for answer in answers]
+    canonical = collapse_near_duplicates(questions, threshold, groups=answer_keys)
+    kept = np.flatnonzero(canonical == np.arange(len(canonical)))
+    position = {int(faq_id): index for index, faq_id in enumerate(kept)}
+    alternates = defaultdict(list)
+    for faq_id, canonical_id in enumerate(canonical):
+        if canonical_id != faq_id:
+            alternates[position[int(canonical_id)]].append(questions[faq_id])
+    return ([questions[faq_id] for faq_id in kept], [answers[faq_id] for faq_id in kept],
+            {index: tuple(collapsed) for index, collapsed in alternates.items()})
+
+
+def _offset_alternates(segments):
+    """Combine segments' collapsed FAQ questions, keyed by position in the concatenated FAQ"""
+    alternates, offset = {}, 0
+    for segment in segments:
+        alternates.update({faq_id + offset: questions for faq_id, questions in segment.faq_alternates.items()})
+        offset += len(segment.faq_questions)
+    return alternates
+
+
+def faq_collapse_report(kb):
+    """Summarize how much near-duplicate collapsing shrank a knowledge base's FAQ index"""
+    collapsed = sum(len(questions) for questions in kb.faq_alternates.values())
+    total = len(kb.faq_questions) + collapsed
+    return {'questions': total, 'entries': len(kb.faq_questions), 'collapsed': collapsed,
+            'reduction': collapsed / total if total else 0.0}
+
+
+def _freeze_array(array):
+    """Mark a numpy array read-only and return it"""
+    array.setflags(write=False)
+    return array
+
+
+def _freeze_sparse(matrix):
+    """Mark the backing arrays of a CSR matrix read-only and return it"""
+    for array in (matrix.data, matrix.indices, matrix.indptr):
+        array.setflags(write=False)
+    return matrix
+
+
+class KnowledgeBase:
+    """Read-only chatbot knowledge base built once from the four datasets"""
+
+    def __init__(self, precautions_df=None, symptoms_df=None, faq_df=None, augmented_df=None, version=None,
+                 semantic_index=None):
+        self.version = version
+        self._build_precautions(precautions_df)
+        self._build_symptom_lists(symptoms_df)
+        self._build_faq(faq_df)
+        self._attach_semantic_index(semantic_index)
+        self._build_symptom_matrix(augmented_df)
+        self._build_symptom_statistics()
+        self._build_disease_resolver(precautions_df, symptoms_df, augmented_df)
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("KnowledgeBase is read-only")
+        super().__setattr__(name, value)
+
+    @classmethod
+    def merge(cls, segments, version=None, semantic_index=None):
+        """Compact knowledge bases into one that answers like a base built from their concatenated datasets"""
+        kb = cls.__new__(cls)
+        kb.version = version
+        kb._merge_lookups(segments)
+        kb._merge_faq(segments)
+        kb._attach_semantic_index(semantic_index)
+        kb._merge_symptom_matrix(segments)
+        kb._build_symptom_statistics()
+        kb._merge_disease_names(segments)
+        kb._frozen = True
+        return kb
+
+    def to_state(self):
+        """Split the knowledge base into JSON-serializable tables and named NumPy arrays"""
+        objects = {
+            'version': self.version,
+            'precautions': {disease: list(values) for disease, values in self.precautions.items()},
+            'symptom_lists': {disease: list(values) for disease, values in self._symptom_lists.items()},
+            'faq_questions': list(self.faq_questions),
+            'faq_answers': list(self.faq_answers),
+            'faq_alternates': {str(faq_id): list(questions) for faq_id, questions in self.faq_alternates.items()},
+            'symptom_columns': list(self.symptom_columns),
+            'group_diseases': list(self.group_diseases),
+            'disease_names': list(self.disease_names),
+            'matrix_shapes': {name: list(getattr(self, name).shape) for name in _STATE_MATRICES}
+        }
+        arrays = {name: getattr(self, name) for name in _STATE_ARRAYS}
+        for name in _STATE_MATRICES:
+            matrix = getattr(self, name)
+            arrays.update({f'{name}.data': matrix.data, f'{name}.indices': matrix.indices,
+                           f'{name}.indptr': matrix.indptr})
+        return objects, arrays
+
+    @classmethod
+    def from_state(cls, objects, arrays, version=None, semantic_index=None):
+        """Rebuild a knowledge base from to_state() output without touching the source datasets"""
+        # The arrays are used as-is, so read-only views of a mapped file stay zero-copy (OPTIMIZATION)
+        kb = cls.__new__(cls)
+        kb.version = version if version is not None else objects['version']
+        kb.precautions = MappingProxyType({disease: tuple(values) for disease, values in objects['precautions'].items()})
+        kb._symptom_lists = MappingProxyType({disease: tuple(values)
+                                              for disease, values in objects['symptom_lists'].items()})
+        kb._index_faq(objects['faq_questions'], objects['faq_answers'],
+                      {int(faq_id): tuple(questions) for faq_id, questions in objects['faq_alternates'].items()})
+        kb._attach_semantic_index(semantic_index)
+        kb._index_symptom_columns(objects['symptom_columns'])
+        for name in _STATE_ARRAYS:
+            setattr(kb, name, _freeze_array(arrays[name]))
+        for name in _STATE_MATRICES:
+            matrix = sparse.csr_matrix((arrays[f'{name}.data'], arrays[f'{name}.indices'], arrays[f'{name}.indptr']),
+                                       shape=tuple(objects['matrix_shapes'][name]))
+            setattr(kb, name, _freeze_sparse(matrix))
+        kb._index_groups(objects['group_diseases'])
+        kb._index_disease_names(objects['disease_names'])
+        kb._frozen = True
+        return kb
+
+    # ------------------------------------------------------------------ build
+
+    def _build_precautions(self, precautions_df):
+        """Map each disease to the precautions of its first row"""
+        precautions = {}
+        if precautions_df is not None and 'Disease' in precautions_df.columns:
+            columns = [col for col in ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
+                       if col in precautions_df.columns]
+            for row in precautions_df[['Disease'] + columns].itertuples(index=False):
+                disease = _clean_name(row[0])
+                if disease in precautions:
+                    continue
+                values = [str(value).strip() for value in row[1:] if pd.notna(value)]
+                precautions[disease] = tuple(value for value in values if value and value != 'nan')
+        self.precautions = MappingProxyType(precautions)
+
+    def _build_symptom_lists(self, symptoms_df):
+        """Map each disease to the Symptom_* values of its first row in the symptoms dataset"""
+        symptom_lists = {}
+        if symptoms_df is not None and 'Disease' in symptoms_df.columns:
+            columns = [col for col in symptoms_df.columns if col.startswith('Symptom_')]
+            for row in symptoms_df[['Disease'] + columns].itertuples(index=False):
+                disease = _clean_name(row[0])
+                if disease in symptom_lists:
+                    continue
+                values = [str(value).strip() for value in row[1:] if pd.notna(value)]
+                symptom_lists[disease] = tuple(value for value in values if value and value != 'nan')
+        self._symptom_lists = MappingProxyType(symptom_lists)
+
+    def _build_faq(self, faq_df):
+        """Collect FAQ entries in dataset order, collapsing near-duplicate questions into one entry"""
+        # Duplicates would only lengthen the lexical scan and crowd the matches (OPTIMIZATION)
+        self._index_faq(*collapse_faq(*faq_entries(faq_df)))
+
+    def _index_faq(self, questions, answers, alternates=None):
+        """Precompute lowercased questions, their word sets and a token index for descriptions"""
+        questions_lower, word_sets = [], []
+        postings = defaultdict(list)
+
+        for faq_id, question in enumerate(questions):
+            question_lower = str(question).lower() if pd.notna(question) else ''
+            questions_lower.append(question_lower)
+            word_sets.append(frozenset(question_lower.split()))
+            for token in set(_TOKEN_RE.findall(question_lower)):
+                postings[token].append(faq_id)
+
+        self.faq_questions = tuple(questions)
+        # Read-only sequences such as a bundle's memory-mapped answer table are kept as-is, not copied (OPTIMIZATION)
+        self.faq_answers = tuple(answers) if isinstance(answers, list) else answers
+        self._faq_questions_lower = tuple(questions_lower)
+        self._faq_word_sets = tuple(word_sets)
+        self._faq_postings = MappingProxyType({token: tuple(ids) for token, ids in postings.items()})
+        self.faq_alternates = MappingProxyType(dict(alternates or {}))
+
+    def with_semantic_index(self, semantic_index):
+        """Return a knowledge base sharing this one's read-only tables, with a semantic FAQ index attached"""
+        kb = self.__class__.__new__(self.__class__)
+        kb.__dict__.update({name: value for name, value in self.__dict__.items() if name != '_frozen'})
+        kb._attach_semantic_index(semantic_index)
+        kb._frozen = True
+        return kb
+
+    def _attach_semantic_index(self, semantic_index):
+        """Keep a prebuilt semantic FAQ index only if it was built from the leading FAQ questions"""
+        # FAQ rows appended by delta segments are not covered until the index is rebuilt offline
+        if semantic_index is not None and not semantic_index.matches(self.faq_questions[:len(semantic_index)]):
+            semantic_index = None
+        self.semantic_index = semantic_index
+
+    @property
+    def _row_span(self):
+        """Number of source rows covered by this knowledge base's row ids"""
+        return int(self._row_ids.max()) + 1 if len(self._row_ids) else 0
+
+    def _build_symptom_matrix(self, augmented_df):
+        """Build a sparse disease-by-symptom matrix with rows grouped by disease"""
+        if augmented_df is None or 'diseases' not in augmented_df.columns:
+            self._set_empty_symptom_matrix(())
+            return
+
+        self._index_symptom_columns(tuple(col for col in augmented_df.columns if col not in _NON_SYMPTOM_COLUMNS))
+
+        # Stable-sort rows by disease (in first-appearance order) so every disease
+        # is one contiguous slice and the first row of each slice is its first row.
+        # Rows without a disease name (factorize code -1) are dropped.
+        codes, uniques = pd.factorize(augmented_df['diseases'])
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else np.zeros(0, dtype=np.int64)
+
+        values = augmented_df[list(self.symptom_columns)].to_numpy(dtype=np.float32)[order]
+        matrix = sparse.csr_matrix(values)
+        row_norms = np.sqrt(np.asarray(matrix.astype(np.float64).power(2).sum(axis=1)).ravel())
+        inv_norms = np.divide(1.0, row_norms, out=np.zeros_like(row_norms, dtype=np.float64), where=row_norms > 0)
+
+        self.symptom_matrix = _freeze_sparse(matrix)
+        self._row_inv_norms = _freeze_array(inv_norms)
+        self._group_starts = _freeze_array(starts.astype(np.int64))
+        self._group_sizes = _freeze_array(np.diff(np.r_[starts, len(order)]).astype(np.int64))
+        self._row_ids = _freeze_array(order.astype(np.int64))
+        self._index_groups(tuple(uniques[sorted_codes[starts]]))
+
+    def _set_empty_symptom_matrix(self, columns):
+        """Set up a symptom matrix without rows over the given columns"""
+        self._index_symptom_columns(columns)
+        self.symptom_matrix = _freeze_sparse(sparse.csr_matrix((0, len(columns)), dtype=np.float32))
+        self._row_inv_norms = _freeze_array(np.zeros(0))
+        self._group_starts = _freeze_array(np.zeros(0, dtype=np.int64))
+        self._group_sizes = _freeze_array(np.zeros(0, dtype=np.int64))
+        self._row_ids = _freeze_array(np.zeros(0, dtype=np.int64))
+        self._index_groups(())
+
+    def _index_symptom_columns(self, columns):
+        """Set the symptom vocabulary and build its resolver and gazetteer"""
+        self.symptom_columns = tuple(columns)
+        self.symptom_resolver = SymptomResolver(self.symptom_columns)
+        self.symptom_gazetteer = SymptomGazetteer(self.symptom_columns)
+
+    def _index_groups(self, group_diseases):
+        """Set the disease of each row group and the name lookups into the groups"""
+        self.group_diseases = tuple(group_diseases)
+        group_index = {}
+        for group, disease in enumerate(self.group_diseases):
+            group_index.setdefault(_clean_name(disease), group)
+        self._group_index = MappingProxyType(group_index)
+        self._group_ids = MappingProxyType({disease: group for group, disease in enumerate(self.group_diseases)})
+
+    def _build_symptom_statistics(self):
+        """Precompute per-disease symptom counts and the symptom co-occurrence matrix"""
+        present = (self.symptom_matrix > 0).astype(np.float32)
+        n_groups, n_rows = len(self.group_diseases), present.shape[0]
+
+        # Sum each disease's rows with one sparse product instead of a per-disease loop
+        group_of_row = np.repeat(np.arange(n_groups), self._group_sizes)
+        membership = sparse.csr_matrix((np.ones(n_rows, dtype=np.float32), (group_of_row, np.arange(n_rows))),
+                                       shape=(n_groups, n_rows))
+
+        self.group_symptom_counts = _freeze_sparse((membership @ present).tocsr())
+        self.symptom_cooccurrence = _freeze_sparse((present.T @ present).tocsr())
+        self._log_likelihoods, self._log_priors = map(_freeze_array, naive_bayes_tables(
+            self.group_symptom_counts, self._group_sizes))
+
+    def _build_disease_resolver(self, precautions_df, symptoms_df, augmented_df):
+        """Index every disease name across the precautions, symptoms and augmented datasets"""
+        names = set()
+        for df, column in [(precautions_df, 'Disease'), (symptoms_df, 'Disease'), (augmented_df, 'diseases')]:
+            if df is not None and column in df.columns:
+                names.update(str(name).strip() for name in df[column].dropna().unique() if str(name).strip())
+        self._index_disease_names(sorted(names))
+
+    def _index_disease_names(self, names):
+        """Set the known disease names and build their resolver"""
+        self.disease_names = tuple(names)
+        self.disease_resolver = DiseaseResolver(self.disease_names)
+
+    # ------------------------------------------------------------------ merge
+
+    def _merge_lookups(self, segments):
+        """Merge precautions and symptom lists, keeping the first segment's entry for each disease"""
+        precautions, symptom_lists = {}, {}
+        for segment in segments:
+            for disease, values in segment.precautions.items():
+                precautions.setdefault(disease, values)
+            for disease, values in segment._symptom_lists.items():
+                symptom_lists.setdefault(disease, values)
+        self.precautions = MappingProxyType(precautions)
+        self._symptom_lists = MappingProxyType(symptom_lists)
+
+    def _merge_faq(self, segments):
+        """Concatenate FAQ entries in segment order"""
+        self._index_faq([q for segment in segments for q in segment.faq_questions],
+                        [a for segment in segments for a in segment.faq_answers],
+                        _offset_alternates(segments))
+
+    def _merge_symptom_matrix(self, segments):
+        """Stack segment matrices over the union of symptom columns and regroup rows by disease"""
+        columns = union_in_order(segment.symptom_columns for segment in segments)
+        column_index = {column: idx for idx, column in enumerate(columns)}
+        group_diseases = union_in_order(segment.group_diseases for segment in segments)
+        group_ids = {disease: group for group, disease in enumerate(group_diseases)}
+
+        blocks, codes, row_ids, inv_norms = [], [], [], []
+        row_offset = 0
+        for segment in segments:
+            matrix = segment.symptom_matrix
+            if matrix.shape[0]:
+                # Remap the segment's column ids into the union column space
+                column_map = np.array([column_index[column] for column in segment.symptom_columns], dtype=np.int64)
+                coo = matrix.tocoo()
+                blocks.append(sparse.csr_matrix((coo.data, (coo.row, column_map[coo.col])),
+                                                shape=(matrix.shape[0], len(columns))))
+                group_map = np.array([group_ids[disease] for disease in segment.group_diseases], dtype=np.int64)
+                codes.append(np.repeat(group_map, segment._group_sizes))
+                row_ids.append(segment._row_ids + row_offset)
+                inv_norms.append(segment._row_inv_norms)
+            row_offset += segment._row_span
+
+        if not blocks:
+            self._set_empty_symptom_matrix(columns)
+            return
+
+        self._index_symptom_columns(columns)
+
+        # Stable sort keeps each disease's rows in segment order, as a concatenated dataset would
+        codes = np.concatenate(codes)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+
+        self.symptom_matrix = _freeze_sparse(sparse.vstack(blocks, format='csr')[order])
+        self._row_inv_norms = _freeze_array(np.concatenate(inv_norms)[order])
+        self._group_starts = _freeze_array(starts.astype(np.int64))
+        self._group_sizes = _freeze_array(np.diff(np.r_[starts, len(order)]).astype(np.int64))
+        self._row_ids = _freeze_array(np.concatenate(row_ids)[order])
+        self._index_groups(group_diseases)
+
+    def _merge_disease_names(self, segments):
+        """Index the union of every segment's disease names"""
+        self._index_disease_names(sorted(set().union(*(segment.disease_names for segment in segments))))
+
+    # ---------------------------------------------------------------- queries
+
+    def _group_bounds(self, group):
+        """Return the [start, end) row range of a disease group"""
+        start = self._group_starts[group]
+        end = self._group_starts[group + 1] if group + 1 < len(self._group_starts) else self.symptom_matrix.shape[0]
+        return start, end
+
+    def resolve_symptoms(self, symptoms_list):
+        """Map free-typed symptoms to canonical columns, returning (resolved, unresolved)"""
+        return self.symptom_resolver.resolve(symptoms_list)
+
+    def extract_symptoms(self, text):
+        """Find the symptom columns mentioned (and not negated) in free text"""
+        return self.symptom_gazetteer.extract(text)
+
+    def _group_scores(self, resolved, query_norm):
+        """Score rows against resolved symptom columns, returning (row scores, best per disease, first best row id)"""
+        if not self.group_diseases:
+            return None
+
+        query_vector = np.zeros(len(self.symptom_columns))
+        for column in resolved:
+            column_id = self.symptom_resolver.column_index.get(column)
+            if column_id is not None:
+                query_vector[column_id] = 1
+
+        # Sparse mat-vec over all rows; cosine = dot / (|row| * |query|)
+        scores = (self.symptom_matrix @ query_vector) * self._row_inv_norms / query_norm
+
+        # Best row per disease; ties between diseases go to the earliest dataset row
+        # holding the best score, exactly like an argmax over the unsorted rows
+        best_per_disease = np.maximum.reduceat(scores, self._group_starts)
+        is_best_row = scores == np.repeat(best_per_disease, self._group_sizes)
+        first_best_row = np.minimum.reduceat(np.where(is_best_row, self._row_ids, len(scores)), self._group_starts)
+        return scores, best_per_disease, first_best_row
+
+    def _best_row_vector(self, scores, group):
+        """Return the dense symptom vector of the best-scoring row of a disease group"""
+        start, end = self._group_bounds(group)
+        best_row = start + int(np.argmax(scores[start:end]))
+        return scores[best_row], self.symptom_matrix[best_row].toarray().ravel()
+
+    def rank_diseases(self, symptoms_list, top_k=5):
+        """Rank distinct diseases by cosine similarity to the symptoms, returning (disease, score, vector) triples"""
+        resolved, _ = self.symptom_resolver.resolve(symptoms_list)
+        if not resolved or not self.group_diseases:
+            return []
+
+        scores, best_per_disease, first_best_row = self._group_scores(resolved, np.sqrt(len(resolved)))
+        top_groups = np.lexsort((first_best_row, -best_per_disease))[:top_k]
+
+        ranked = []
+        for group in top_groups:
+            score, vector = self._best_row_vector(scores, group)
+            ranked.append((self.group_diseases[group], score, vector))
+        return ranked
+
+    def rank_diseases_bayes(self, symptoms_list, top_k=5):
+        """Rank diseases by naive-Bayes posterior probability, returning (disease, probability, profile) triples"""
+        return _rank_bayes(self, symptoms_list, top_k)
+
+    def suggest_symptoms(self, resolved, candidates, limit=3):
+        """Suggest symptoms to ask about next that best separate the (disease, score) candidates"""
+        return _suggest_for(self, resolved, candidates, limit)
+
+    def match_disease(self, user_text, limit=5):
+        """Rank known disease names against free-typed text"""
+        return self.disease_resolver.match(user_text, limit=limit)
+
+    def _augmented_symptoms(self, disease_clean):
+        """Return the symptom columns set in a disease's first augmented row, or None if it has no rows"""
+        group = self._group_index.get(disease_clean)
+        if group is None:
+            return None
+        first_row = self.symptom_matrix[self._group_starts[group]]
+        return [self.symptom_columns[col] for col, value in sorted(zip(first_row.indices, first_row.data)) if value == 1]
+
+    def symptoms_for(self, disease_name):
+        """Get all symptoms for a disease, preferring the augmented dataset"""
+        if not disease_name:
+            return []
+        disease_clean = _clean_name(disease_name)
+
+        symptoms = self._augmented_symptoms(disease_clean)
+        if symptoms:
+            return [symptom.replace('_', ' ') for symptom in symptoms]
+
+        return list(self._symptom_lists.get(disease_clean, ()))
+
+    def precautions_for(self, disease_name):
+        """Get precautions for a disease"""
+        if not disease_name:
+            return []
+        return list(self.precautions.get(_clean_name(disease_name), ()))
+
+    def _description_id(self, disease_clean):
+        """Return the id of the first FAQ question mentioning the disease, or None"""
+        # Intersect token postings to find candidates, then confirm the full phrase
+        tokens = _TOKEN_RE.findall(disease_clean)
+        if not tokens:
+            return None
+        candidates = None
+        for token in tokens:
+            ids = self._faq_postings.get(token)
+            if not ids:
+                return None
+            candidates = set(ids) if candidates is None else candidates.intersection(ids)
+            if not candidates:
+                return None
+
+        for faq_id in sorted(candidates):
+            if disease_clean in self._faq_questions_lower[faq_id]:
+                return faq_id
+        return None
+
+    def description_for(self, disease_name):
+        """Get the answer of the first FAQ question mentioning the disease"""
+        if not disease_name:
+            return None
+        faq_id = self._description_id(_clean_name(disease_name))
+        return self.faq_answers[faq_id] if faq_id is not None else None
+
+    def find_faq(self, question, is_symptom_question=False):
+        """Find the best matching FAQ entry, returning {'question', 'answer'} or None"""
+        if not self.faq_questions:
+            return None
+
+        best_id, best_score = self._lexical_faq_match(question, is_symptom_question)
+
+        # A strong lexical match wins; otherwise let the semantic index catch paraphrases
+        if best_score <= 0.9 and self.semantic_index is not None:
+            matches = self.semantic_index.search(question, k=1)
+            if matches and matches[0][1] >= SEMANTIC_MATCH_THRESHOLD:
+                best_id, best_score = matches[0][0], 1.0
+
+        if best_id is None or best_score <= 0.4:
+            return None
+        return {'question': self.faq_questions[best_id], 'answer': self.faq_answers[best_id]}
+
+    def _lexical_faq_match(self, question, is_symptom_question):
+        """Score FAQ questions by word overlap, returning (best id, best score)"""
+        question_clean = question.lower().strip()
+        best_id = None
+        best_score = 0
+
+        # Pre-compute question words once (OPTIMIZATION)
+        question_words = set(question_clean.split())
+        disease_terms = _DISEASE_TERM_RE.findall(question_clean)
+
+        for faq_id, faq_question in enumerate(self._faq_questions_lower):
+            # Skip empty questions early (OPTIMIZATION)
+            if not faq_question:
+                continue
+
+            score = 0
+
+            # For symptom questions, prioritize answers that actually list symptoms
+            if is_symptom_question and ('symptom' in faq_question or 'sign' in faq_question):
+                score += 0.3
+
+            # Word overlap scoring against the precomputed word set
+            faq_words = self._faq_word_sets[faq_id]
+            if question_words and faq_words:
+                score += len(question_words.intersection(faq_words)) / len(question_words)
+
+            # Boost score for exact disease matches
+            for term in disease_terms:
+                if term in faq_question:
+                    score += 0.2
+
+            if score > best_score:
+                best_score = score
+                best_id = faq_id
+
+                # Early exit if we find a very good match (OPTIMIZATION)
+                if best_score > 0.9:
+                    break
+
+        return best_id, best_score
+
+
+class LayeredKnowledgeBase:
+    """Read-only view of a base knowledge base plus append-only delta segments
+
+    Answers exactly like a KnowledgeBase built from the base and delta datasets
+    concatenated in order, without re-reading or re-indexing the base. Delta
+    segments are meant to stay small; KnowledgeBase.merge() compacts them.
+    """
+
+    def __init__(self, base, deltas=(), version=None):
+        self.version = version
+        self.base = base
+        self.deltas = tuple(deltas)
+        self.segments = (base,) + self.deltas
+        self.semantic_index = base.semantic_index
+
+        self.symptom_columns = union_in_order(segment.symptom_columns for segment in self.segments)
+        self.symptom_resolver = SymptomResolver(self.symptom_columns)
+        self.symptom_gazetteer = SymptomGazetteer(self.symptom_columns)
+        self.disease_names = tuple(sorted(set().union(*(segment.disease_names for segment in self.segments))))
+        self.disease_resolver = DiseaseResolver(self.disease_names)
+
+        # Map every segment's disease groups and columns into the combined numbering
+        self.group_diseases = union_in_order(segment.group_diseases for segment in self.segments)
+        group_ids = {disease: group for group, disease in enumerate(self.group_diseases)}
+        column_index = {column: idx for idx, column in enumerate(self.symptom_columns)}
+        group_maps, column_maps, row_offsets, faq_offsets = [], [], [], []
+        row_offset = faq_offset = 0
+        for segment in self.segments:
+            group_maps.append(np.array([group_ids[disease] for disease in segment.group_diseases], dtype=np.int64))
+            column_maps.append(np.array([column_index[column] for column in segment.symptom_columns], dtype=np.int64))
+            row_offsets.append(row_offset)
+            faq_offsets.append(faq_offset)
+            row_offset += segment._row_span
+            faq_offset += len(segment.faq_questions)
+        self._group_maps = tuple(group_maps)
+        self._column_maps = tuple(column_maps)
+        self._row_offsets = tuple(row_offsets)
+        self._faq_offsets = tuple(faq_offsets)
+
+        self.faq_questions = tuple(q for segment in self.segments for q in segment.faq_questions)
+        self.faq_answers = tuple(a for segment in self.segments for a in segment.faq_answers)
+        self.faq_alternates = MappingProxyType(_offset_alternates(self.segments))
+        self._build_symptom_statistics()
+        self._frozen = True
+
+    def _build_symptom_statistics(self):
+        """Sum every segment's per-disease counts and co-occurrences in the combined numbering"""
+        n_groups, n_columns = len(self.group_diseases), len(self.symptom_columns)
+        counts = sparse.csr_matrix((n_groups, n_columns), dtype=np.float32)
+        cooccurrence = sparse.csr_matrix((n_columns, n_columns), dtype=np.float32)
+        sizes = np.zeros(n_groups, dtype=np.int64)
+        for segment, group_map, column_map in zip(self.segments, self._group_maps, self._column_maps):
+            counts = counts + _remap_sparse(segment.group_symptom_counts, group_map, column_map, (n_groups, n_columns))
+            cooccurrence = cooccurrence + _remap_sparse(segment.symptom_cooccurrence, column_map, column_map,
+                                                        (n_columns, n_columns))
+            np.add.at(sizes, group_map, segment._group_sizes)
+
+        self.group_symptom_counts = _freeze_sparse(counts.tocsr())
+        self.symptom_cooccurrence = _freeze_sparse(cooccurrence.tocsr())
+        self._group_sizes = _freeze_array(sizes)
+        self._group_ids = MappingProxyType({disease: group for group, disease in enumerate(self.group_diseases)})
+        self._log_likelihoods, self._log_priors = map(_freeze_array, naive_bayes_tables(
+            self.group_symptom_counts, self._group_sizes))
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("LayeredKnowledgeBase is read-only")
+        super().__setattr__(name, value)
+
+    def with_delta(self, delta, version=None):
+        """Return a new view with one more delta segment appended"""
+        return LayeredKnowledgeBase(self.base, self.deltas + (delta,), version=version)
+
+    def compact(self):
+        """Merge every segment into a single KnowledgeBase with the same answers"""
+        return KnowledgeBase.merge(self.segments, version=self.version, semantic_index=self.semantic_index)
+
+    def resolve_symptoms(self, symptoms_list):
+        """Map free-typed symptoms to canonical columns, returning (resolved, unresolved)"""
+        return self.symptom_resolver.resolve(symptoms_list)
+
+    def extract_symptoms(self, text):
+        """Find the symptom columns mentioned (and not negated) in free text"""
+        return self.symptom_gazetteer.extract(text)
+
+    def rank_diseases(self, symptoms_list, top_k=5):
+        """Rank distinct diseases across all segments, returning (disease, score, vector) triples"""
+        resolved, _ = self.symptom_resolver.resolve(symptoms_list)
+        if not resolved or not self.group_diseases:
+            return []
+
+        n_groups = len(self.group_diseases)
+        best = np.full(n_groups, -np.inf)
+        first = np.full(n_groups, np.iinfo(np.int64).max, dtype=np.int64)
+        source = np.full(n_groups, -1, dtype=np.int64)
+        segment_scores = []
+        query_norm = np.sqrt(len(resolved))
+
+        # Keep each disease's best score over all segments, ties going to the earliest row
+        for index, segment in enumerate(self.segments):
+            result = segment._group_scores(resolved, query_norm)
+            segment_scores.append(result[0] if result is not None else None)
+            if result is None:
+                continue
+            _, segment_best, segment_first = result
+            groups = self._group_maps[index]
+            segment_first = segment_first + self._row_offsets[index]
+            wins = (segment_best > best[groups]) | ((segment_best == best[groups]) & (segment_first < first[groups]))
+            best[groups[wins]] = segment_best[wins]
+            first[groups[wins]] = segment_first[wins]
+            source[groups[wins]] = index
+
+        ranked = []
+        for group in np.lexsort((first, -best))[:top_k]:
+            index = source[group]
+            local_group = int(np.flatnonzero(self._group_maps[index] == group)[0])
+            score, segment_vector = self.segments[index]._best_row_vector(segment_scores[index], local_group)
+            vector = np.zeros(len(self.symptom_columns), dtype=segment_vector.dtype)
+            vector[self._column_maps[index]] = segment_vector
+            ranked.append((self.group_diseases[group], score, vector))
+        return ranked
+
+    def rank_diseases_bayes(self, symptoms_list, top_k=5):
+        """Rank diseases by naive-Bayes posterior probability, returning (disease, probability, profile) triples"""
+        return _rank_bayes(self, symptoms_list, top_k)
+
+    def suggest_symptoms(self, resolved, candidates, limit=3):
+        """Suggest symptoms to ask about next that best separate the (disease, score) candidates"""
+        return _suggest_for(self, resolved, candidates, limit)
+
+    def match_disease(self, user_text, limit=5):
+        """Rank known disease names across all segments against free-typed text"""
+        return self.disease_resolver.match(user_text, limit=limit)
+
+    def symptoms_for(self, disease_name):
+        """Get all symptoms for a disease from the first segment that lists it"""
+        if not disease_name:
+            return []
+        disease_clean = _clean_name(disease_name)
+
+        for index, segment in enumerate(self.segments):
+            symptoms = segment._augmented_symptoms(disease_clean)
+            if symptoms is not None:
+                # Report columns in combined column order, as a compacted base would
+                column_index = self.symptom_resolver.column_index
+                symptoms = sorted(symptoms, key=column_index.get)
+                if symptoms:
+                    return [symptom.replace('_', ' ') for symptom in symptoms]
+                break
+
+        for segment in self.segments:
+            if disease_clean in segment._symptom_lists:
+                return list(segment._symptom_lists[disease_clean])
+        return []
+
+    def precautions_for(self, disease_name):
+        """Get precautions for a disease from the first segment that lists it"""
+        if not disease_name:
+            return []
+        disease_clean = _clean_name(disease_name)
+        for segment in self.segments:
+            if disease_clean in segment.precautions:
+                return list(segment.precautions[disease_clean])
+        return []
+
+    def description_for(self, disease_name):
+        """Get the answer of the first FAQ question, in any segment, mentioning the disease"""
+        if not disease_name:
+            return None
+        disease_clean = _clean_name(disease_name)
+        for segment in self.segments:
+            faq_id = segment._description_id(disease_clean)
+            if faq_id is not None:
+                return segment.faq_answers[faq_id]
+        return None
+
+    def find_faq(self, question, is_symptom_question=False):
+        """Find the best matching FAQ entry across all segments, returning {'question', 'answer'} or None"""
+        best_id, best_score = None, 0
+        for index, segment in enumerate(self.segments):
+            if best_score > 0.9:
+                break
+            faq_id, score = segment._lexical_faq_match(question, is_symptom_question)
+            if faq_id is not None and score > best_score:
+                best_id, best_score = faq_id + self._faq_offsets[index], score
+
+        # The semantic index covers the leading base questions, whose ids come first
+        if best_score <= 0.9 and self.semantic_index is not None:
+            matches = self.semantic_index.search(question, k=1)
+            if matches and matches[0][1] >= SEMANTIC_MATCH_THRESHOLD:
+                best_id, best_score = matches[0][0], 1.0
+
+        if best_id is None or best_score <= 0.4:
+            return None
+        return {'question': self.faq_questions[best_id], 'answer': self.faq_answers[best_id]}
@@ -0,0 +1,114 @@
+"""
+Near-Duplicate Detection Module
+MinHash signatures with LSH banding to group near-identical short texts, such
+as MedQuAD questions asked in several wordings, in roughly linear time.
+Candidates that share an LSH bucket are confirmed with the exact Jaccard
+similarity of their shingle sets, so the probabilistic step can only miss a
+duplicate, never merge two distinct questions. Texts that differ in a number
+or a short identifier ("type 1" / "type 2", "hepatitis A" / "hepatitis B")
+are never merged, however similar the rest of their wording is.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+_UINT32_MASK = np.uint64(0xFFFFFFFF)
+
+# Tokens that name a specific variant: anything with a digit, single letters and roman numerals
+_IDENTIFIER_RE = re.compile(r'[a-z]*\d[a-z0-9]*|[a-z]|[ivx]+')
+
+
+def shingles(text):
+    """Word unigrams and bigrams of a lowercased text"""
+    tokens = _TOKEN_RE.findall(str(text).lower())
+    return frozenset(tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])])
+
+
+def jaccard(first, second):
+    """Jaccard similarity of two sets (0 when both are empty)"""
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+def differ_by_identifier(first, second):
+    """True when the word tokens only one of two shingle sets has include a number or identifier"""
+    return any(' ' not in token and _IDENTIFIER_RE.fullmatch(token) for token in first ^ second)
+
+
+def minhash_signatures(shingle_sets, num_perm=64, seed=1):
+    """Return (sets, num_perm) uint32 MinHash signatures; empty sets get all-max signatures"""
+    lengths = np.fromiter(map(len, shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    # crc32 is stable across processes, unlike the salted built-in hash
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle_set in shingle_sets for shingle in shingle_set),
+                         dtype=np.uint64, count=int(lengths.sum()))
+
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 32, num_perm, dtype=np.uint64) | np.uint64(1)
+    increments = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(shingle_sets), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    nonempty = lengths > 0
+    if hashes.size:
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        # One vectorized pass per permutation over every shingle, min-reduced per set (OPTIMIZATION)
+        for perm in range(num_perm):
+            permuted = (multipliers[perm] * hashes + increments[perm]) & _UINT32_MASK
+            signatures[nonempty, perm] = np.minimum.reduceat(permuted, starts)
+    return signatures
+
+
+def collapse_near_duplicates(texts, threshold=0.8, num_perm=128, bands=16, seed=1, groups=None):
+    """Map each text to the id of the first earlier text it nearly duplicates (or to itself)
+
+    Texts are compared against canonical texts only, so duplicates never chain
+    into a group whose members are far apart. With `groups`, a text only
+    merges into one with an equal group key (e.g. the same answer).
+    """
+    shingle_sets = [shingles(text) for text in texts]
+    groups = [None] * len(texts) if groups is None else list(groups)
+    signatures = minhash_signatures(shingle_sets, num_perm, seed)
+
+    # Each band of rows becomes one hashable bucket key per text; 16 bands of 8 rows make
+    # texts around 0.7 similarity or more likely to share a bucket
+    rows = num_perm // bands
+    band_keys = np.ascontiguousarray(signatures[:, :rows * bands]).view(np.dtype((np.void, rows * 4))).tolist()
+
+    buckets = [{} for _ in range(bands)]
+    canonical = np.arange(len(texts), dtype=np.int64)
+    # Identical shingle sets collapse without touching the buckets (OPTIMIZATION)
+    exact = {}
+    for text_id, keys in enumerate(band_keys):
+        shingle_set = shingle_sets[text_id]
+        if not shingle_set:
+            continue
+        exact_key = (groups[text_id], shingle_set)
+        if exact_key in exact:
+            canonical[text_id] = exact[exact_key]
+            continue
+
+        candidates = set()
+        for bucket, key in zip(buckets, keys):
+            candidates.update(bucket.get(key, ()))
+        match = None
+        if candidates:
+            candidates = np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+            # Signature agreement estimates the similarity; only plausible candidates are checked exactly
+            estimates = (signatures[candidates] == signatures[text_id]).mean(axis=1)
+            for candidate in candidates[estimates >= threshold - 0.05]:
+                other = shingle_sets[candidate]
+                if (groups[candidate] == groups[text_id] and jaccard(shingle_set, other) >= threshold
+                        and not differ_by_identifier(shingle_set, other)):
+                    match = int(candidate)
+                    break
+
+        if match is not None:
+            canonical[text_id] = exact[exact_key] = match
+            continue
+        exact[exact_key] = text_id
+        for bucket, key in zip(buckets, keys):
+            bucket.setdefault(key, []).append(text_id)
+    return canonical
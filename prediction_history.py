@@ -0,0 +1,228 @@
+"""
+Prediction History Module
+Timestamped history of each patient's risk predictions, kept out of the
+profile records so saving a profile never re-encodes its history. Every new
+prediction is appended as one compact line to a history file next to the
+profile store, with the bulky model inputs in a second file:
+
+    <store>.history.jsonl   [profile id, disease, timestamp, probability, model version]
+    <store>.inputs.jsonl    [profile id, disease, timestamp, inputs]
+
+The profile itself keeps only its latest prediction per disease, whose
+'predicted_at' marks how far its history goes. PredictionHistory reads new
+lines incrementally into NumPy columns per disease, so trends for one patient
+or across patients never load a profile.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from profile_store import ProfileJSONEncoder, _file_lock
+
+
+def model_version(paths):
+    """Short fingerprint of the model files behind a prediction, from their names, sizes and mtimes"""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode('utf-8'))
+        except OSError:
+            digest.update(f"{os.path.basename(path)}:missing;".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def history_for_store(store_path):
+    """PredictionHistory kept next to a profile store"""
+    base = os.path.splitext(store_path)[0]
+    return PredictionHistory(base + '.history.jsonl', base + '.inputs.jsonl')
+
+
+def _recorded_at(previous, disease):
+    """'predicted_at' of the latest recorded prediction for a disease, or None"""
+    prediction = (previous or {}).get(disease)
+    return prediction.get('predicted_at') if isinstance(prediction, dict) else None
+
+
+def stamp_predictions(predictions, previous=None, now=None):
+    """Give each prediction without one a 'predicted_at' time, so later saves recognise it as already recorded
+
+    `previous` is the profile's saved predictions; times are kept strictly
+    after them, so two predictions within the same millisecond are both kept.
+    """
+    now = round(time.time() if now is None else now, 3)
+    for disease, prediction in predictions.items():
+        if isinstance(prediction, dict) and prediction.get('predicted_at') is None:
+            last = _recorded_at(previous, disease)
+            prediction['predicted_at'] = now if last is None else max(now, round(last + 0.001, 3))
+    return predictions
+
+
+def new_predictions(previous, predictions):
+    """Stamped predictions newer than the saved ones they replace"""
+    new = {}
+    for disease, prediction in predictions.items():
+        timestamp = prediction.get('predicted_at') if isinstance(prediction, dict) else None
+        last = _recorded_at(previous, disease)
+        if timestamp is not None and (last is None or timestamp > last):
+            new[disease] = prediction
+    return new
+
+
+class HistoryIndex:
+    """Every patient's prediction history per disease as contiguous NumPy columns"""
+
+    def __init__(self, profile_ids, model_versions, columns):
+        self.profile_ids = profile_ids
+        self.model_versions = model_versions
+        self._columns = columns
+        self._rows = {profile_id: row for row, profile_id in enumerate(profile_ids)}
+
+    def diseases(self):
+        return sorted(self._columns)
+
+    def columns(self, disease):
+        """(profile rows, timestamps, probabilities, model version codes) for one disease"""
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64),
+                 np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int32))
+        return self._columns.get(disease, empty)
+
+    def patient_trend(self, profile_id, disease):
+        """(timestamps, probabilities, model versions) of one patient's predictions, oldest first"""
+        rows, timestamps, probabilities, versions = self.columns(disease)
+        mask = rows == self._rows.get(profile_id, -1)
+        order = np.argsort(timestamps[mask], kind='stable')
+        return (timestamps[mask][order], probabilities[mask][order],
+                np.asarray(self.model_versions, dtype=object)[versions[mask][order]]
+                if self.model_versions else np.empty(0, dtype=object))
+
+    def disease_trend(self, disease, bucket_seconds=86400, start=None, end=None):
+        """(bucket start times, mean probability, prediction count) across all patients per time bucket"""
+        _, timestamps, probabilities, _ = self.columns(disease)
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        timestamps, probabilities = timestamps[mask], probabilities[mask]
+        buckets, inverse = np.unique(np.floor_divide(timestamps, bucket_seconds), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(buckets))
+        sums = np.bincount(inverse, weights=probabilities, minlength=len(buckets))
+        return buckets * bucket_seconds, sums / np.maximum(counts, 1), counts
+
+    def latest(self, disease):
+        """(profile ids, latest probability) of every patient with a prediction for the disease"""
+        rows, timestamps, probabilities, _ = self.columns(disease)
+        # Sort by patient, then time, and keep each patient's last entry
+        order = np.lexsort((timestamps, rows))
+        rows, probabilities = rows[order], probabilities[order]
+        last = np.flatnonzero(np.append(rows[1:] != rows[:-1], True)) if len(rows) else rows
+        return [self.profile_ids[row] for row in rows[last]], probabilities[last]
+
+
+class PredictionHistory:
+    """Append-only prediction history of every patient, shared by the processes using one profile store"""
+
+    def __init__(self, path, inputs_path=None):
+        self.path = path
+        self.inputs_path = inputs_path or path + '.inputs'
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0
+        self._inode = None
+        self._profile_rows = {}
+        self._versions = {}
+        self._columns = {}  # disease -> (rows, timestamps, probabilities, version codes) lists
+        self._index = None
+
+    def append(self, profile_id, predictions):
+        """Append one history line per prediction, with its inputs in the inputs file"""
+        if not predictions:
+            return
+        history_lines, input_lines = [], []
+        for disease, prediction in predictions.items():
+            timestamp = prediction['predicted_at']
+            # Compact rows: times to the millisecond, probabilities to two decimals (OPTIMIZATION)
+            history_lines.append(json.dumps([profile_id, disease, timestamp, round(float(prediction.get('prob', 0)), 2),
+                                             prediction.get('model_version')], cls=ProfileJSONEncoder) + '\n')
+            input_lines.append(json.dumps([profile_id, disease, timestamp, prediction.get('inputs', {})],
+                                          cls=ProfileJSONEncoder) + '\n')
+        with _file_lock(self.path):
+            with open(self.inputs_path, 'a', encoding='utf-8') as f:
+                f.writelines(input_lines)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(history_lines)
+
+    def _refresh(self):
+        """Read lines appended since the last call; call with the lock held"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset()
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        # A torn final line is left for the next read, once its writer has finished it
+        complete = data.rfind(b'\n') + 1
+        self._offset += complete
+        for line in data[:complete].splitlines():
+            try:
+                profile_id, disease, timestamp, probability, version = json.loads(line)
+            except ValueError:
+                continue
+            parts = self._columns.setdefault(disease, ([], [], [], []))
+            parts[0].append(self._profile_rows.setdefault(profile_id, len(self._profile_rows)))
+            parts[1].append(timestamp)
+            parts[2].append(probability)
+            parts[3].append(self._versions.setdefault(version, len(self._versions)))
+        if complete:
+            self._index = None
+
+    def index(self):
+        """HistoryIndex of every prediction so far, rebuilt only after new lines arrive (OPTIMIZATION)"""
+        with self._lock:
+            self._refresh()
+            if self._index is None:
+                self._index = HistoryIndex(
+                    list(self._profile_rows), list(self._versions),
+                    {disease: (np.asarray(rows, dtype=np.int32), np.asarray(times, dtype=np.float64),
+                               np.asarray(probabilities, dtype=np.float32), np.asarray(versions, dtype=np.int32))
+                     for disease, (rows, times, probabilities, versions) in self._columns.items()})
+            return self._index
+
+    def patient_trend(self, profile_id, disease):
+        """(timestamps, probabilities, model versions) of one patient's predictions, oldest first"""
+        return self.index().patient_trend(profile_id, disease)
+
+    def disease_trend(self, disease, bucket_seconds=86400, start=None, end=None):
+        """(bucket start times, mean probability, prediction count) across all patients"""
+        return self.index().disease_trend(disease, bucket_seconds, start, end)
+
+    def inputs(self, profile_id, disease):
+        """[(timestamp, inputs)] of one patient's predictions for a disease, oldest first"""
+        if not os.path.exists(self.inputs_path):
+            return []
+        found = []
+        with open(self.inputs_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record_id, record_disease, timestamp, inputs = json.loads(line)
+                except ValueError:
+                    continue
+                if record_id == profile_id and record_disease == disease:
+                    found.append((timestamp, inputs))
+        return found
@@ -0,0 +1,175 @@
+"""
+Profile Cache Module
+One in-memory copy of the patient profiles per process, shared by every
+Streamlit session instead of a private list in each session's state. Reads
+take a shared lock and writes an exclusive one; the cache reloads itself
+when the store's generation shows another process has written.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from profile_search import ProfileSearchIndex
+
+
+class ReadWriteLock:
+    """Any number of concurrent readers or a single writer; a waiting writer holds off new readers"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class ProfileCache:
+    """Process-wide profiles by id, loaded lazily from a store and kept in sync with it
+
+    Cached profiles are shared between sessions and must be treated as
+    read-only: callers replace a profile with put() rather than mutating it.
+    put() marks the profile dirty until mark_clean() records it was handed to
+    the store, so saving everything only writes the profiles that changed.
+    `pending` returns profiles saved but possibly not yet in the store (e.g.
+    queued in a CoalescingWriter), so a reload never hides them.
+    """
+
+    def __init__(self, store, pending=None):
+        self.store = store
+        self._pending = pending
+        self._lock = ReadWriteLock()
+        self._profiles = {}
+        self._search_index = ProfileSearchIndex()
+        self._snapshot = None
+        self._dirty = set()
+        self._generation = None
+        self._loaded = False
+
+    def _is_current(self, generation):
+        return self._loaded and generation == self._generation
+
+    def _refresh(self):
+        """Reload when the store has been written since the last load"""
+        generation = self.store.generation()
+        with self._lock.read():
+            if self._is_current(generation):
+                return
+        self.reload()
+
+    def reload(self):
+        """Load every profile from the store, unless another thread just did"""
+        with self._lock.write():
+            # Taken before reading, so a write that lands mid-load triggers another reload
+            generation = self.store.generation()
+            if self._is_current(generation) and generation is not None:
+                return
+            profiles = self._index(self.store.load())
+            if self._pending is not None:
+                for profile in self._pending():
+                    profiles[profile.get('id')] = profile
+            self._profiles = profiles
+            self._search_index = ProfileSearchIndex(profiles.values())
+            self._snapshot = None
+            self._dirty.clear()
+            self._generation = generation
+            self._loaded = True
+
+    @staticmethod
+    def _index(stored):
+        """Profiles by id, first wins; old duplicate ids are renumbered by the store, never on reload"""
+        profiles = {}
+        for profile in stored:
+            profiles.setdefault(profile.get('id'), profile)
+        return profiles
+
+    def _current_snapshot(self):
+        """Tuple of the profiles; call with the lock held"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Built once per change and reused by every reader (OPTIMIZATION)
+            snapshot = self._snapshot = tuple(self._profiles.values())
+        return snapshot
+
+    def profiles(self):
+        """Every profile, oldest first, as a tuple shared by all sessions"""
+        self._refresh()
+        with self._lock.read():
+            return self._current_snapshot()
+
+    def get(self, profile_id):
+        """Return one profile by id, or None"""
+        self._refresh()
+        with self._lock.read():
+            return self._profiles.get(profile_id)
+
+    def search(self, query, offset=0, limit=None):
+        """Return (page of matching profiles newest first, total matches) for a name/contact/id query"""
+        self._refresh()
+        with self._lock.read():
+            if not query.strip():
+                # Newest first without copying or sorting the whole collection (OPTIMIZATION)
+                snapshot = self._current_snapshot()
+                total = len(snapshot)
+                stop = total if limit is None else min(total, offset + limit)
+                return [snapshot[total - 1 - position] for position in range(offset, stop)], total
+            matches = self._search_index.search(query)
+            end = None if limit is None else offset + limit
+            return [self._profiles[profile_id] for profile_id in matches[offset:end]], len(matches)
+
+    def put(self, profile):
+        """Insert or replace a profile by id; the caller persists it to the store"""
+        with self._lock.write():
+            self._profiles[profile.get('id')] = profile
+            self._search_index.add(profile)
+            self._snapshot = None
+            self._dirty.add(profile.get('id'))
+
+    def dirty_profiles(self):
+        """Profiles put since they were last marked clean"""
+        with self._lock.read():
+            return [self._profiles[profile_id] for profile_id in self._dirty if profile_id in self._profiles]
+
+    def mark_clean(self, profiles):
+        """Clear the dirty flag of profiles handed to the store, unless a newer version was put since"""
+        with self._lock.write():
+            for profile in profiles:
+                if self._profiles.get(profile.get('id')) is profile:
+                    self._dirty.discard(profile.get('id'))
+
+    def invalidate(self):
+        """Drop the cached profiles so the next read reloads them from the store"""
+        with self._lock.write():
+            self._loaded = False
+
+    def __len__(self):
+        self._refresh()
+        with self._lock.read():
+            return len(self._profiles)
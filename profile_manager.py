@@ -1,71 +1,179 @@
 import streamlit as st
 import pandas as pd
-import json
+import html
 import os
 from datetime import datetime
 import numpy as np
-import time
+import atexit
+import threading
+import warnings
+from prediction_history import history_for_store, new_predictions, stamp_predictions
+from profile_cache import ProfileCache
+from profile_store import CoalescingWriter, JSONProfileStore, open_profile_store, profile_id_number
+
+# Cards per page of the Profiles tab, a multiple of the 3-column grid
+PROFILES_PAGE_SIZE = 12
+
+# Profile card markup, compiled once; values are HTML-escaped before formatting (OPTIMIZATION)
+PROFILE_CARD_CSS = """
+<style>
+.profile-card {
+    border: 1px solid #e0e0e0;
+    border-radius: 10px;
+    padding: 15px;
+    margin: 8px 0;
+    background: white;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    height: 260px;
+    overflow-y: auto;
+}
+.profile-card h4 { margin: 0 0 10px 0; color: #1976d2; }
+.profile-card p { margin: 5px 0; font-size: 14px; }
+.profile-card .predictions { border-top: 1px solid #f0f0f0; padding-top: 10px; font-size: 14px; }
+</style>
+"""
+PROFILE_CARD_TEMPLATE = (
+    "<div class='profile-card'>"
+    "<h4>{name} ㅤ {created_at}</h4>"
+    "<p><strong>ID:</strong> {display_id}<br>"
+    "<strong>Age:</strong> {age}<br>"
+    "<strong>Gender:</strong> {gender}<br>"
+    "<strong>Contact:</strong> {contact}<br>"
+    "<strong>Status:</strong> {marital_status}<br>"
+    "<strong>Address:</strong> {address}</p>"
+    "<div class='predictions'><strong>📊 Predictions:</strong> {predictions}</div>"
+    "</div>"
+)
+PREDICTIONS_TEMPLATE = "<span style='font-size:14px;'>{predictions}</span>"
+
+
+def _native_types(obj):
+    """Recursively replace NumPy scalars and arrays with Python values"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, dict):
+        return {key: _native_types(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [_native_types(item) for item in obj]
+    return obj
+
 
 class ProfileManager:
-    def __init__(self):
-        self.profiles_file = "user_profiles.json"
-        self._last_save_time = 0
-        self._save_debounce_seconds = 2  # Wait 2 seconds before saving (OPTIMIZATION)
+    def __init__(self, store=None, save_quiet_seconds=0.5):
+        self.store = store if store is not None else JSONProfileStore("user_profiles.json")
+        # One-time migration of ids the old length-based allocator handed out twice
+        self.store.renumber_duplicate_ids()
+        self._save_quiet_seconds = save_quiet_seconds  # Coalesce bursts of saves on full-file stores (OPTIMIZATION)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        # One copy of the profiles per process; sessions keep only their current profile (OPTIMIZATION)
+        self.cache = ProfileCache(self.store, pending=self._queued_profiles)
+        # Appended per prediction beside the store, so profile saves never carry the history
+        self.history = history_for_store(self.store.path)
+    
+    @property
+    def profiles_file(self):
+        """Path of the backing store"""
+        return self.store.path
+    
+    @profiles_file.setter
+    def profiles_file(self, path):
+        self.flush_profiles()
+        self.store = open_profile_store(path)
+        self.store.renumber_duplicate_ids()
+        self.cache = ProfileCache(self.store, pending=self._queued_profiles)
+        self.history = history_for_store(self.store.path)
+    
+    @property
+    def writer(self):
+        """Background writer for the current store, started on first use"""
+        with self._writer_lock:
+            if self._writer is None or self._writer.store is not self.store:
+                if self._writer is not None:
+                    self._writer.close()
+                self._writer = CoalescingWriter(self.store, quiet_seconds=self._save_quiet_seconds)
+                # Write whatever is still queued when the app shuts down
+                atexit.register(self._writer.close)
+            return self._writer
+    
+    def flush_profiles(self):
+        """Write any saves still queued by the background writer"""
+        if self._writer is not None:
+            self._writer.flush()
+    
+    def _queued_profiles(self):
+        """Profiles saved but possibly not yet written by the background writer"""
+        writer = self._writer
+        if writer is None or writer.store is not self.store:
+            return []
+        return writer.queued()
     
     def ensure_session_state_initialized(self):
-        """Ensure session state is properly initialized"""
-        if 'user_profiles' not in st.session_state:
-            st.session_state.user_profiles = []
-            self.load_profiles()
+        """Ensure the per-session profile state exists; the profiles themselves live in the shared cache"""
+        if 'current_profile_id' not in st.session_state:
+            st.session_state.current_profile = None
+            st.session_state.current_profile_id = None
     
     def load_profiles(self):
-        """Load profiles from JSON file with caching"""
-        if os.path.exists(self.profiles_file):
-            try:
-                with open(self.profiles_file, 'r') as f:
-                    loaded_profiles = json.load(f)
-                    if isinstance(loaded_profiles, list):
-                        st.session_state.user_profiles = loaded_profiles
-            except Exception as e:
-                st.warning(f"Error loading profiles: {e}")
-                st.session_state.user_profiles = []
-        else:
-            st.session_state.user_profiles = []
+        """Reload the shared profile cache from the backing store"""
+        try:
+            self.cache.reload()
+        except Exception as e:
+            st.warning(f"Error loading profiles: {e}")
     
     def convert_numpy_types(self, obj):
-        """Convert numpy data types to Python native types for JSON serialization - Optimized"""
-        # Optimized type checking using isinstance with tuple for better performance
-        if isinstance(obj, (np.integer, np.int32, np.int64)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float32, np.float64)):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, dict):
-            return {key: self.convert_numpy_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self.convert_numpy_types(item) for item in obj]
-        else:
-            return obj
+        """Convert numpy data types to Python native types for JSON serialization
+
+        Deprecated: profiles are saved through profile_store.ProfileJSONEncoder,
+        whose default hook encodes NumPy values, so nothing calls this any more.
+        """
+        warnings.warn("ProfileManager.convert_numpy_types is deprecated; profile stores encode NumPy values "
+                      "with profile_store.ProfileJSONEncoder", DeprecationWarning, stacklevel=2)
+        return _native_types(obj)
+    
+    def _write_profiles(self, profiles, force=False):
+        """Write profiles by id: directly on row-level stores, coalesced in the background on full-file stores"""
+        if self.store.row_level:
+            self.store.merge(profiles)
+            return
+        writer = self.writer
+        writer.submit(profiles)
+        if force:
+            writer.flush()
+        elif writer.error is not None:
+            raise writer.error
     
     def save_profiles(self, force=False):
-        """Save profiles to JSON file with debouncing to reduce I/O (OPTIMIZATION)"""
+        """Save every changed profile; full-file stores write a burst of saves once it goes quiet"""
         try:
-            current_time = time.time()
-            
-            # Debounce: Only save if enough time has passed or force is True
-            if not force and (current_time - self._last_save_time) < self._save_debounce_seconds:
-                return
-            
-            # Ensure session state is initialized
-            self.ensure_session_state_initialized()
-            
-            profiles_to_save = self.convert_numpy_types(st.session_state.user_profiles)
+            # Only dirty profiles are serialized; NumPy values were converted when predicted (OPTIMIZATION)
+            profiles_to_save = self.cache.dirty_profiles()
             
-            with open(self.profiles_file, 'w') as f:
-                json.dump(profiles_to_save, f, indent=4)
-            
-            self._last_save_time = current_time
+            # Merge by id rather than replace, so profiles other processes added are kept
+            if profiles_to_save:
+                self._write_profiles(profiles_to_save, force=force)
+                self.cache.mark_clean(profiles_to_save)
+            elif force:
+                self.flush_profiles()
+        except Exception as e:
+            st.error(f"Error saving profiles: {e}")
+    
+    def save_profile(self, profile, force=False):
+        """Persist one profile by id; force writes it before returning"""
+        try:
+            # A shallow copy, since the caller (e.g. the session's current profile) keeps editing
+            # its dict; any NumPy value left in it is converted by the store's JSON encoder
+            # rather than by walking the whole profile (OPTIMIZATION)
+            profile = dict(profile)
+            # Visible to every session at once; only this profile is written, so concurrent
+            # sessions never overwrite each other's profiles
+            self.cache.put(profile)
+            self._write_profiles([profile], force=force)
+            self.cache.mark_clean([profile])
         except Exception as e:
             st.error(f"Error saving profiles: {e}")
     
@@ -75,23 +183,31 @@ class ProfileManager:
             # Ensure session state is initialized
             self.ensure_session_state_initialized()
             
-            profile_id = f"user_{len(st.session_state.user_profiles) + 1:03d}"
+            profile_id = self._allocate_profile_id()
             profile_data['id'] = profile_id
             profile_data['created_at'] = datetime.now().strftime("%d-%b-%Y %H:%M")
             
-            profile_data = self.convert_numpy_types(profile_data)
-            
-            st.session_state.user_profiles.append(profile_data)
-            self.save_profiles(force=True)  # Force immediate save for new profiles
+            self.save_profile(profile_data, force=True)  # Force immediate save for new profiles
             return profile_id
         except Exception as e:
             st.error(f"Error adding profile: {e}")
             return None
     
+    def _allocate_profile_id(self):
+        """A new id from the store's allocator, unique across sessions and processes"""
+        while True:
+            profile_id = self.store.allocate_id()
+            # Skip numbers already taken by profiles written before the store had a counter
+            if self.cache.get(profile_id) is None:
+                return profile_id
+    
     def get_all_profiles(self):
-        """Get all user profiles"""
-        self.ensure_session_state_initialized()
-        return st.session_state.user_profiles
+        """Get all user profiles, oldest first, from the cache shared by every session (read-only)"""
+        try:
+            return self.cache.profiles()
+        except Exception as e:
+            st.warning(f"Error loading profiles: {e}")
+            return ()
     
     def render_patient_details_page(self):
         """Render the patient details input form"""
@@ -171,36 +287,42 @@ class ProfileManager:
             if st.session_state.current_profile and st.session_state.current_profile_id:
                 
                 # Find the current profile
-                for i, profile in enumerate(st.session_state.user_profiles):
-                    if profile.get('id') == st.session_state.current_profile_id:
-                        # Always update basic profile info
-                        st.session_state.user_profiles[i].update({
-                            'name': st.session_state.current_profile.get('name'),
-                            'age': st.session_state.current_profile.get('age'),
-                            'contact': st.session_state.current_profile.get('contact'),
-                            'address': st.session_state.current_profile.get('address'),
-                            'gender': st.session_state.current_profile.get('gender'),
-                            'marital_status': st.session_state.current_profile.get('marital_status')
-                        })
-                        
-                        # Update predictions if they exist
-                        if st.session_state.predictions:
-                            converted_predictions = self.convert_numpy_types(st.session_state.predictions)
-                            st.session_state.user_profiles[i]['predictions'] = converted_predictions
-                            st.session_state.current_profile['predictions'] = converted_predictions
-                        
-                        st.session_state.user_profiles[i]['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        self.save_profiles()  # Use debounced save here (non-critical update)
-                        return True
+                stored = self.cache.get(st.session_state.current_profile_id)
+                if stored is not None:
+                    # Cached profiles are shared with other sessions, so save an updated copy
+                    profile = dict(stored)
+                    # Always update basic profile info
+                    profile.update({
+                        'name': st.session_state.current_profile.get('name'),
+                        'age': st.session_state.current_profile.get('age'),
+                        'contact': st.session_state.current_profile.get('contact'),
+                        'address': st.session_state.current_profile.get('address'),
+                        'gender': st.session_state.current_profile.get('gender'),
+                        'marital_status': st.session_state.current_profile.get('marital_status')
+                    })
+                    
+                    # Update predictions if they exist
+                    if st.session_state.predictions:
+                        profile = self._with_predictions(profile, st.session_state.predictions)
+                        st.session_state.current_profile['predictions'] = profile['predictions']
+                    
+                    profile['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    
+                    self.save_profile(profile)  # Coalesced in the background on full-file stores (non-critical update)
+                    return True
                 
                 # If profile not found in list, add it (shouldn't happen normally)
                 profile_data = st.session_state.current_profile.copy()
+                previous, new = profile_data.get('predictions'), {}
                 if st.session_state.predictions:
-                    profile_data['predictions'] = self.convert_numpy_types(st.session_state.predictions)
+                    profile_data['predictions'] = self._copy_predictions(
+                        stamp_predictions(st.session_state.predictions, previous))
+                    new = new_predictions(previous, profile_data['predictions'])
                 
                 profile_id = self.add_profile(profile_data)
                 if profile_id:
+                    # The history is keyed by id, so it is written once the profile has one
+                    self.history.append(profile_id, new)
                     st.session_state.current_profile_id = profile_id
                     return True
             
@@ -209,19 +331,33 @@ class ProfileManager:
             print(f"Auto-save error: {e}")
             return False
     
+    @staticmethod
+    def _copy_predictions(predictions):
+        """Copy of the session's predictions for a shared cached profile
+
+        NumPy values were cast when predicted, and any left are converted by the
+        store's JSON encoder, so no recursive conversion runs here (OPTIMIZATION).
+        """
+        return {disease: dict(prediction) for disease, prediction in predictions.items()}
+    
+    def _with_predictions(self, profile, predictions):
+        """Profile with the latest predictions, appending the new ones to the prediction history"""
+        previous = profile.get('predictions')
+        # Stamped in place, so saving the same predictions again adds no history entry
+        predictions = self._copy_predictions(stamp_predictions(predictions, previous))
+        # Written before the profile, so a failed profile save can only repeat an entry, not lose it
+        self.history.append(profile.get('id'), new_predictions(previous, predictions))
+        return {**profile, 'predictions': predictions}
+
     def save_profile_with_predictions(self, profile_id, predictions):
         """Manual save profile with predictions (for explicit user action)"""
         try:
-            self.ensure_session_state_initialized()
-            
-            for i, profile in enumerate(st.session_state.user_profiles):
-                if profile.get('id') == profile_id:
-                    converted_predictions = self.convert_numpy_types(predictions)
-                    
-                    st.session_state.user_profiles[i]['predictions'] = converted_predictions
-                    st.session_state.user_profiles[i]['saved_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.save_profiles(force=True)  # Force immediate save for manual saves
-                    return True
+            stored = self.cache.get(profile_id)
+            if stored is not None:
+                profile = self._with_predictions(dict(stored), predictions)
+                profile['saved_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.save_profile(profile, force=True)  # Force immediate save for manual saves
+                return True
             return False
         except Exception as e:
             st.error(f"Error saving predictions: {e}")
@@ -239,108 +375,132 @@ class ProfileManager:
         if st.session_state.current_profile:
             self.auto_save_profile()
         
-        profiles = self.get_all_profiles()
+        try:
+            profile_count = len(self.cache)
+        except Exception as e:
+            st.warning(f"Error loading profiles: {e}")
+            return
         
-        if not profiles:
+        if not profile_count:
             st.info("No patient profiles saved yet. Profiles are automatically saved when you make predictions.")
             return
         
-        # ✅ YEH LINE ADD KAREN: Latest profiles first (reverse the list)
-        profiles = list(reversed(profiles))
-        
         # Feature 1: Search Bar
-        search_term = st.text_input("🔍 Search by name", placeholder="Enter patient name to search...")
+        search_term = st.text_input("🔍 Search by name, contact or ID", placeholder="Enter patient name, contact or ID to search...")
         
-        # Filter profiles based on search
-        if search_term:
-            filtered_profiles = [profile for profile in profiles 
-                            if search_term.lower() in profile.get('name', '').lower()]
-        else:
-            filtered_profiles = profiles
+        # Start from the first page whenever the search changes
+        if st.session_state.get('profiles_search') != search_term:
+            st.session_state.profiles_search = search_term
+            st.session_state.profiles_page = 1
+        page = st.session_state.get('profiles_page', 1)
         
-        if not filtered_profiles:
+        # Indexed lookup of one page of matches, latest profiles first (OPTIMIZATION)
+        page_profiles, total = self.search_profiles(search_term, page)
+        if not page_profiles and total:
+            page = -(-total // PROFILES_PAGE_SIZE)
+            st.session_state.profiles_page = page
+            page_profiles, total = self.search_profiles(search_term, page)
+        
+        if not page_profiles:
             st.warning("No profiles found matching your search.")
             return
         
-        # Feature 2: Horizontal layout - 3 profiles per row
-        for i in range(0, len(filtered_profiles), 3):
-            # Create a row with 3 columns
-            cols = st.columns(3)
-            
-            for j in range(3):
-                profile_index = i + j
-                if profile_index < len(filtered_profiles):
-                    profile = filtered_profiles[profile_index]
-                    
+        page_count = -(-total // PROFILES_PAGE_SIZE)
+        offset = (page - 1) * PROFILES_PAGE_SIZE
+        st.caption(f"Showing {offset + 1}–{offset + len(page_profiles)} of {total} profiles")
+        
+        # Feature 2: Compact table or card grid of the visible page only
+        view = st.radio("View", ["Table", "Cards"], horizontal=True, key="profiles_view",
+                        label_visibility="collapsed")
+        if view == "Table":
+            st.dataframe(pd.DataFrame([self._profile_summary(profile, offset + i) for i, profile in enumerate(page_profiles)]),
+                         hide_index=True, use_container_width=True)
+        else:
+            # Card styles are sent once per page instead of inline in every card (OPTIMIZATION)
+            st.markdown(PROFILE_CARD_CSS, unsafe_allow_html=True)
+            for i in range(0, len(page_profiles), 3):
+                # Create a row with 3 columns
+                cols = st.columns(3)
+                for j, profile in enumerate(page_profiles[i:i + 3]):
                     with cols[j]:
-                        self._render_profile_card(profile, profile_index)
-
-
+                        self._render_profile_card(profile, offset + i + j)
+        
+        if page_count > 1:
+            st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="profiles_page")
+        
+        # Predictions are only sent for the profile the user picks (OPTIMIZATION)
+        by_id = {profile.get('id'): (offset + i, profile) for i, profile in enumerate(page_profiles)}
+        selected = st.selectbox("📊 Show predictions for", [None] + list(by_id),
+                                format_func=lambda profile_id: "Select a patient..." if profile_id is None
+                                else f"{by_id[profile_id][1].get('name', 'N/A')} ({self._display_id(profile_id, by_id[profile_id][0])})")
+        if selected is not None:
+            self._render_predictions(by_id[selected][1])
+    
+    def search_profiles(self, query, page=1, page_size=None):
+        """Return (profiles on this 1-based page, total matches) for a name, contact or ID search"""
+        page_size = page_size or PROFILES_PAGE_SIZE
+        return self.cache.search(query or '', offset=(page - 1) * page_size, limit=page_size)
+    
+    def patient_trend(self, profile_id, disease):
+        """(timestamps, probabilities, model versions) of one patient's predictions for a disease"""
+        return self.history.patient_trend(profile_id, disease)
+    
+    def disease_trend(self, disease, bucket_seconds=86400, start=None, end=None):
+        """(bucket start times, mean probability, prediction count) across all patients"""
+        return self.history.disease_trend(disease, bucket_seconds, start, end)
+    
+    @staticmethod
+    def _display_id(profile_id, position):
+        """Convert profile ID to Patient1, Patient2 format"""
+        number = profile_id_number(profile_id)
+        return f"Patient{number if number else position + 1}"
+    
+    def _profile_summary(self, profile, position):
+        """One compact table row for a profile"""
+        predictions = profile.get('predictions') or {}
+        return {
+            'ID': self._display_id(profile.get('id', ''), position),
+            'Name': profile.get('name', 'N/A'),
+            'Age': profile.get('age', 'N/A'),
+            'Gender': profile.get('gender', 'N/A'),
+            'Contact': profile.get('contact', 'N/A'),
+            'Created': profile.get('created_at', 'N/A'),
+            'Predictions': len(predictions),
+        }
+    
     def _render_profile_card(self, profile, original_index):
-        """Render a single profile card in horizontal layout"""
-        # Create a container with relative positioning
-        with st.container():
-            # Convert profile ID to User1, User2 format
-            profile_id = profile.get('id', '')
-            if profile_id.startswith('user_'):
-                try:
-                    user_number = int(profile_id.split('_')[1])
-                    display_id = f"Patient{user_number}"
-                except:
-                    display_id = f"Patient{original_index + 1}"
-            else:
-                display_id = f"Patient{original_index + 1}"
-            
-            # Build the card content as HTML
-            card_content = f"""
-            <div style='
-                border: 1px solid #e0e0e0;
-                border-radius: 10px;
-                padding: 15px;
-                margin: 8px 0;
-                background: white;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                height: 300px;
-                overflow-y: auto;
-                position: relative;
-            '>
-                <h4 style='margin:0 0 10px 0; color: #1976d2;'>{profile.get('name', 'N/A')} ㅤ {profile.get('created_at', 'N/A')}</h4>
-                <p style='margin:5px 0; font-size:14px;'>
-                    <strong>ID:</strong> {display_id}<br>
-                    <strong>Age:</strong> {profile.get('age', 'N/A')}<br>
-                    <strong>Gender:</strong> {profile.get('gender', 'N/A')}<br>
-                    <strong>Contact:</strong> {profile.get('contact', 'N/A')}<br>
-                    <strong>Status:</strong> {profile.get('marital_status', 'N/A')}<br>
-                    <strong>Address:</strong> {profile.get('address', 'N/A')}<br>
-            """
-            
-            # Add predictions section with two-column layout
-            predictions = profile.get('predictions', {})
-            if predictions:
-                card_content += "<div style='border-top: 1px solid #f0f0f0; padding-top: 10px;'>"
-                card_content += "<strong style='font-size:14px;'>📊 Predictions:</strong><br>"
-                
-                prediction_parts = []
-                for disease, data in predictions.items():
-                    risk = data.get('prob', 0)
-                    severity = data.get('severity', '')
-                    severity_text = f" ({severity})" if severity else ""
-                    prediction_parts.append(f"{disease}: {risk:.1f}%{severity_text}")
-                
-                # Join all predictions with " | " separator in a single line
-                card_content += f"<span style='font-size:14px;'>{'   |   '.join(prediction_parts)}</span>"
-                card_content += "</div>"
-            else:
-                card_content += "<div style='border-top: 1px solid #f0f0f0; padding-top: 10px;'>"
-                card_content += "<strong style='font-size:14px;'>📊 Predictions:</strong> ❌ No predictions"
-                card_content += "</div>"
-            
-            card_content += """
-            </div>
-            """
-            
-            # Render the card content
-            st.markdown(card_content, unsafe_allow_html=True)
+        """Render a single profile card from the precompiled template"""
+        predictions = profile.get('predictions') or {}
+        fields = {
+            'name': profile.get('name', 'N/A'),
+            'created_at': profile.get('created_at', 'N/A'),
+            'display_id': self._display_id(profile.get('id', ''), original_index),
+            'age': profile.get('age', 'N/A'),
+            'gender': profile.get('gender', 'N/A'),
+            'contact': profile.get('contact', 'N/A'),
+            'marital_status': profile.get('marital_status', 'N/A'),
+            'address': profile.get('address', 'N/A'),
+            'predictions': f"{len(predictions)} saved" if predictions else "❌ No predictions",
+        }
+        st.markdown(PROFILE_CARD_TEMPLATE.format_map({key: html.escape(str(value)) for key, value in fields.items()}),
+                    unsafe_allow_html=True)
+    
+    def _render_predictions(self, profile):
+        """Render the saved predictions of one profile"""
+        predictions = profile.get('predictions') or {}
+        if not predictions:
+            st.info("❌ No predictions saved for this patient.")
+            return
+        prediction_parts = []
+        for disease, data in predictions.items():
+            risk = data.get('prob', 0)
+            severity = data.get('severity', '')
+            severity_text = f" ({severity})" if severity else ""
+            prediction_parts.append(f"{disease}: {risk:.1f}%{severity_text}")
+        # Join all predictions with " | " separator in a single line
+        st.markdown(PREDICTIONS_TEMPLATE.format(predictions=html.escape('   |   '.join(prediction_parts))),
+                    unsafe_allow_html=True)
 
     
-profile_manager = ProfileManager()
\ No newline at end of file
+# A .db path selects the SQLite backend, e.g. CUREHELP_PROFILE_STORE=user_profiles.db
+profile_manager = ProfileManager(open_profile_store(os.environ.get("CUREHELP_PROFILE_STORE", "user_profiles.json")))
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Profile Search Module
+Substring search over patient name, contact number and profile id through a
+trigram index, so the Profiles tab looks matches up instead of scanning every
+profile on each rerun. Queries of three or more characters intersect their
+trigram postings and confirm the few candidates; one- and two-character
+queries scan the prebuilt lowercase keys. The postings are built on the first
+indexed search and then kept up to date as profiles are added or changed.
+A query naming the PatientN id shown in the Profiles tab also finds that profile.
+"""
+
+import re
+import threading
+
+from profile_store import format_profile_id
+
+SEARCH_FIELDS = ('name', 'contact', 'id')
+
+_GRAM = 3
+
+# The display id of the Profiles tab, "Patient12" for user_012
+_DISPLAY_ID_RE = re.compile(r'patient(\d+)')
+
+
+def _search_key(profile):
+    """Lowercased name, contact and id of a profile, NUL-separated so no query spans two fields"""
+    return '\x00'.join(str(profile.get(field) or '').lower() for field in SEARCH_FIELDS)
+
+
+def _trigrams(text):
+    return {text[start:start + _GRAM] for start in range(len(text) - _GRAM + 1)}
+
+
+def _post(postings, profile_id, key):
+    """Add a profile id under each trigram of its key"""
+    for gram in _trigrams(key):
+        ids = postings.get(gram)
+        if ids is None:
+            postings[gram] = {profile_id}
+        else:
+            ids.add(profile_id)
+
+
+class ProfileSearchIndex:
+    """Profile ids by the trigrams of their search keys, kept in insertion order"""
+
+    def __init__(self, profiles=()):
+        self._keys = {}
+        self._order = {}
+        self._postings = None
+        self._build_lock = threading.Lock()
+        for profile in profiles:
+            self.add(profile)
+
+    def add(self, profile):
+        """Index a new profile, or re-index an updated one keeping its position"""
+        profile_id = profile.get('id')
+        key = _search_key(profile)
+        previous = self._keys.get(profile_id)
+        if previous == key:
+            return
+        if previous is None:
+            self._order[profile_id] = len(self._order)
+        elif self._postings is not None:
+            for gram in _trigrams(previous):
+                self._postings[gram].discard(profile_id)
+        self._keys[profile_id] = key
+        if self._postings is not None:
+            _post(self._postings, profile_id, key)
+
+    def _built_postings(self):
+        """Trigram postings, built on first use so reloading the cache stays cheap (OPTIMIZATION)"""
+        if self._postings is None:
+            # Searches run under the cache's shared lock, so concurrent first searches build once
+            with self._build_lock:
+                if self._postings is None:
+                    postings = {}
+                    for profile_id, key in self._keys.items():
+                        _post(postings, profile_id, key)
+                    self._postings = postings
+        return self._postings
+
+    def search(self, query):
+        """Ids whose name, contact or id contains the query (case-insensitive), newest first"""
+        query = query.strip().lower()
+        if len(query) < _GRAM:
+            # Keys are in insertion order, so scanning them backwards needs no sort
+            return [profile_id for profile_id, key in reversed(self._keys.items()) if query in key]
+        postings = sorted((self._built_postings().get(gram, set()) for gram in _trigrams(query)), key=len)
+        # Shared trigrams only make a candidate; confirm the substring on the few left
+        candidates = set(postings[0]).intersection(*postings[1:])
+        matches = {profile_id for profile_id in candidates if query in self._keys[profile_id]}
+        display_id = _DISPLAY_ID_RE.fullmatch(query)
+        if display_id:
+            profile_id = format_profile_id(int(display_id.group(1)))
+            if profile_id in self._keys:
+                matches.add(profile_id)
+        return sorted(matches, key=self._order.__getitem__, reverse=True)
+
+    def __len__(self):
+        return len(self._keys)
+
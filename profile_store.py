@@ -0,0 +1,694 @@
+"""
+Profile Store Module
+Pluggable persistence backends for patient profiles. ProfileManager keeps the
+profiles in memory and hands writes to a store:
+
+- JSONProfileStore rewrites one JSON file holding every profile (the original
+  user_profiles.json format), so each save costs O(total profiles).
+- SQLiteProfileStore keeps one row per profile in a WAL-mode SQLite database,
+  indexed on id and name, so saving one profile is a single-row upsert.
+- JournalProfileStore appends each change as one JSONL record next to a JSON
+  snapshot and folds the journal into a fresh snapshot in the background.
+
+CoalescingWriter batches saves for stores where each write costs the whole
+file, writing a burst of saves once after it goes quiet.
+
+Several app processes may share one store on a common volume. File-backed
+stores write through a temp file and an atomic rename under an advisory lock,
+and every store exposes a generation token that changes at least whenever
+another process writes, so readers can tell their copy is stale.
+
+Profiles are encoded with ProfileJSONEncoder, whose default hook turns any
+NumPy values left in a profile into plain JSON. The JSON and SQLite stores
+keep each record's encoding and content hash, so a save only encodes the
+profiles it was given and skips records whose content did not change.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writes are still atomic renames
+    fcntl = None
+
+_MISSING = object()
+
+
+class ProfileJSONEncoder(json.JSONEncoder):
+    """JSON encoder for profiles that converts NumPy scalars and arrays only when it meets them"""
+
+    def default(self, obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super().default(obj)
+
+
+def encode_profile(profile, indent=None):
+    """JSON text of one profile"""
+    return json.dumps(profile, indent=indent, cls=ProfileJSONEncoder)
+
+
+def _content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+def _file_record(profile):
+    """(text, content hash) of a profile as it appears in the JSON file's list"""
+    # Indented one level like json.dump(profiles, indent=4), so the file layout is unchanged
+    text = '    ' + encode_profile(profile, indent=4).replace('\n', '\n    ')
+    return text, _content_hash(text)
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive advisory lock on `path`.lock, shared by every process using the store"""
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _write_json_atomic(path, profiles):
+    """Write the profiles next to `path` and rename, so readers never see a half-written file"""
+    _write_records_atomic(path, [_file_record(profile)[0] for profile in profiles])
+
+
+def _write_records_atomic(path, records):
+    """Write already encoded file records as one JSON list through a temp file and a rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write('[\n' + ',\n'.join(records) + '\n]' if records else '[]')
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def format_profile_id(number):
+    """The user_NNN id for an allocated number"""
+    return f"user_{number:03d}"
+
+
+def profile_id_number(profile_id):
+    """Number of a user_NNN id, or 0 for any other id"""
+    if isinstance(profile_id, str) and profile_id.startswith('user_') and profile_id[5:].isdigit():
+        return int(profile_id[5:])
+    return 0
+
+
+def _allocate_from_sequence(path, stored_profiles):
+    """Next id from the `path`.seq counter; call with the store's file lock held
+
+    A missing counter starts after the highest id in `stored_profiles()`,
+    so the store is only scanned the first time.
+    """
+    sequence_path = path + '.seq'
+    try:
+        with open(sequence_path, 'r') as f:
+            last = int(f.read())
+    except (FileNotFoundError, ValueError):
+        last = max((profile_id_number(profile.get('id')) for profile in stored_profiles()), default=0)
+    directory = os.path.dirname(os.path.abspath(sequence_path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(sequence_path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(last + 1))
+        os.replace(temp_path, sequence_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return format_profile_id(last + 1)
+
+
+def _has_duplicate_ids(profiles):
+    ids = [profile.get('id') for profile in profiles]
+    return len(set(ids)) != len(ids)
+
+
+def _renumber_duplicates(profiles, allocate):
+    """Give each profile repeating an earlier one's id a fresh id from `allocate()`, in place; True if any changed"""
+    seen = set()
+    changed = False
+    for position, profile in enumerate(profiles):
+        if profile.get('id') in seen:
+            profiles[position] = profile = {**profile, 'id': allocate()}
+            changed = True
+        seen.add(profile.get('id'))
+    return changed
+
+
+def _file_signature(path):
+    """(inode, mtime, size) of a file, or None; an atomic rename always gives a new inode"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class _WriteTracker:
+    """Generation counter for file-backed stores that moves only when another handle writes
+
+    Each write by this handle records the files' new signature, so the
+    process's own saves (already in its ProfileCache) never force a reload.
+    """
+
+    def __init__(self, signature):
+        self._signature = signature
+        self._known = _MISSING
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        with self._lock:
+            current = self._signature()
+            if current != self._known:
+                self._known = current
+                self._count += 1
+            return self._count
+
+    @contextmanager
+    def writing(self):
+        """Wrap one write by this handle; call with the store's file lock held"""
+        # Anything written by others since the last check still counts as a change
+        self.generation()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._known = self._signature()
+
+
+class ProfileStore(ABC):
+    """Persistence backend for patient profiles"""
+
+    # True when upsert() writes only the given profile instead of the whole store
+    row_level = False
+
+    @abstractmethod
+    def load(self):
+        """Return every stored profile, oldest first"""
+
+    @abstractmethod
+    def save_all(self, profiles):
+        """Replace the stored profiles with these"""
+
+    @abstractmethod
+    def upsert(self, profile):
+        """Insert or update a single profile by id"""
+
+    def merge(self, profiles):
+        """Upsert each of these profiles, keeping any others already stored"""
+        for profile in profiles:
+            self.upsert(profile)
+
+    def generation(self):
+        """Token that changes at least whenever another process writes the store, or None if unknown"""
+        return None
+
+    @abstractmethod
+    def allocate_id(self):
+        """Return a new profile id never handed out before by any process sharing the store"""
+
+    def renumber_duplicate_ids(self):
+        """Give profiles sharing an id from the old length-based allocator fresh ids; True if any changed"""
+        return False
+
+    def close(self):
+        """Release any resources held by the store"""
+
+
+class JSONProfileStore(ProfileStore):
+    """All profiles in one JSON file, rewritten on every save"""
+
+    def __init__(self, path="user_profiles.json"):
+        self.path = path
+        # (id, encoded record, content hash) of each stored profile as of this process's last write
+        self._records = []
+        self._records_signature = None
+        self._writes = _WriteTracker(lambda: _file_signature(self.path))
+
+    def load(self):
+        # Writers rename a complete file into place, so reading needs no lock
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r') as f:
+            profiles = json.load(f)
+        return profiles if isinstance(profiles, list) else []
+
+    def save_all(self, profiles):
+        with _file_lock(self.path):
+            self._write([(profile.get('id'),) + _file_record(profile) for profile in profiles])
+
+    def upsert(self, profile):
+        self.merge([profile])
+
+    def merge(self, profiles):
+        # Read-modify-write under the lock, so profiles saved by other processes survive
+        with _file_lock(self.path):
+            records = self._current_records()
+            positions = {record[0]: i for i, record in enumerate(records)}
+            changed = self._records_signature is None
+            for profile in profiles:
+                # Only the given profiles are encoded; the rest reuse their last encoding (OPTIMIZATION)
+                record = (profile.get('id'),) + _file_record(profile)
+                position = positions.get(record[0])
+                if position is None:
+                    positions[record[0]] = len(records)
+                    records.append(record)
+                elif records[position][2] != record[2]:
+                    records[position] = record
+                else:
+                    continue
+                changed = True
+            # A save that changes no record's content leaves the file alone
+            if changed:
+                self._write(records)
+
+    def _current_records(self):
+        """Copy of the encoded records, re-read only when another process has written the file; call with the lock held"""
+        signature = _file_signature(self.path)
+        if signature is None or signature != self._records_signature:
+            self._records = [(profile.get('id'),) + _file_record(profile) for profile in self.load()]
+            self._records_signature = signature
+        return list(self._records)
+
+    def _write(self, records):
+        with self._writes.writing():
+            _write_records_atomic(self.path, [text for _, text, _ in records])
+        self._records = records
+        self._records_signature = _file_signature(self.path)
+
+    def generation(self):
+        return self._writes.generation()
+
+    def allocate_id(self):
+        with _file_lock(self.path):
+            return _allocate_from_sequence(self.path, self.load)
+
+    def renumber_duplicate_ids(self):
+        if not _has_duplicate_ids(self.load()):
+            return False
+        # A fresh read under the lock, so profiles other processes are saving are kept
+        with _file_lock(self.path):
+            profiles = self.load()
+            if not _renumber_duplicates(profiles, lambda: _allocate_from_sequence(self.path, lambda: profiles)):
+                return False
+            self._write([(profile.get('id'),) + _file_record(profile) for profile in profiles])
+            return True
+
+
+class SQLiteProfileStore(ProfileStore):
+    """One row per profile in a WAL-mode SQLite database"""
+
+    row_level = True
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS profiles ("
+        " id TEXT PRIMARY KEY,"
+        " name TEXT,"
+        " data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS profiles_name ON profiles (name)",
+        "CREATE TABLE IF NOT EXISTS profile_sequence (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    )
+    _UPSERT = ("INSERT INTO profiles (id, name, data) VALUES (?, ?, ?) "
+               "ON CONFLICT(id) DO UPDATE SET name = excluded.name, data = excluded.data")
+
+    def __init__(self, path="user_profiles.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        # Content hash of each row as last read or written by this process
+        self._hashes = {}
+        # One connection shared by Streamlit's script threads, serialized by the lock
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            # WAL lets readers in other processes proceed while a write commits
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._SCHEMA:
+                self._connection.execute(statement)
+
+    @staticmethod
+    def _row(profile):
+        return profile.get('id'), profile.get('name'), encode_profile(profile)
+
+    def load(self):
+        with self._lock:
+            # rowid order is insertion order, like the JSON list
+            rows = self._connection.execute("SELECT id, data FROM profiles ORDER BY rowid").fetchall()
+            self._hashes = {profile_id: _content_hash(data) for profile_id, data in rows}
+        return [json.loads(data) for (_, data) in rows]
+
+    def save_all(self, profiles):
+        rows = [self._row(profile) for profile in profiles]
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM profiles")
+            self._connection.executemany(self._UPSERT, rows)
+            self._hashes = {profile_id: _content_hash(data) for profile_id, _, data in rows}
+
+    def upsert(self, profile):
+        # A single-row write, independent of how many profiles are stored (OPTIMIZATION)
+        self.merge([profile])
+
+    def merge(self, profiles):
+        rows = {}
+        for profile in profiles:
+            row = self._row(profile)
+            rows[row[0]] = row, _content_hash(row[2])
+        with self._lock:
+            # Rows whose content this process last saw unchanged are not rewritten
+            changed = [(row, digest) for row_id, (row, digest) in rows.items() if self._hashes.get(row_id) != digest]
+            if not changed:
+                return
+            with self._connection:
+                self._connection.executemany(self._UPSERT, [row for row, _ in changed])
+            for row, digest in changed:
+                self._hashes[row[0]] = digest
+
+    def generation(self):
+        # data_version moves only on commits from other connections (other processes); this
+        # process's own writes already reach every session through the shared ProfileCache
+        with self._lock:
+            return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def allocate_id(self):
+        # The first write takes SQLite's write lock, so concurrent processes get distinct numbers
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO profile_sequence (name, value) "
+                "SELECT 'profiles', COALESCE(MAX(CAST(SUBSTR(id, 6) AS INTEGER)), 0) FROM profiles "
+                "WHERE id GLOB 'user_[0-9]*'")
+            self._connection.execute("UPDATE profile_sequence SET value = value + 1 WHERE name = 'profiles'")
+            (number,) = self._connection.execute(
+                "SELECT value FROM profile_sequence WHERE name = 'profiles'").fetchone()
+        return format_profile_id(number)
+
+    def get(self, profile_id):
+        """Return one stored profile by id, or None"""
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _apply_record(profiles, record):
+    """Apply one journal record to a dict of profiles by id"""
+    if record.get('op') == 'create':
+        profile = record['profile']
+        profiles[profile.get('id')] = profile
+    elif record.get('op') == 'update' and record.get('id') in profiles:
+        # Records replace field values, so replaying one twice is harmless
+        profiles[record['id']] = {**profiles[record['id']], **record['fields']}
+
+
+def _read_journal(path):
+    """Yield the records of a journal, skipping a torn final line from an interrupted append"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class JournalProfileStore(ProfileStore):
+    """JSON snapshot plus an append-only JSONL journal of profile changes
+
+    The snapshot at `path` has the user_profiles.json format; the journal sits
+    next to it with a .jsonl extension. Each upsert appends one record: the
+    whole profile when it is new, otherwise only the fields that changed.
+    Loading replays the journal over the snapshot. Once the journal passes
+    `compact_bytes` it is rotated aside and folded into a new snapshot by a
+    background thread while appends continue on a fresh journal.
+    """
+
+    row_level = True
+
+    def __init__(self, path="user_profiles.json", compact_bytes=1024 * 1024):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + '.jsonl'
+        self._compacting_path = self.journal_path + '.compacting'
+        self.compact_bytes = compact_bytes
+        self._profiles = {}
+        self._compaction = None
+        self._lock = threading.RLock()
+        self._writes = _WriteTracker(lambda: (_file_signature(self.path), _file_signature(self.journal_path)))
+
+    def _replay(self):
+        """Profiles by id from the snapshot, a rotated journal left by compaction, then the live journal"""
+        profiles = {profile.get('id'): profile for profile in JSONProfileStore(self.path).load()}
+        for path in (self._compacting_path, self.journal_path):
+            for record in _read_journal(path):
+                _apply_record(profiles, record)
+        return profiles
+
+    def load(self):
+        with self._lock, _file_lock(self.path):
+            self._profiles = self._replay()
+            return list(self._profiles.values())
+
+    def save_all(self, profiles):
+        with self._lock:
+            self._wait_for_compaction()
+            with _file_lock(self.path):
+                self._replace(profiles)
+
+    def _replace(self, profiles):
+        """Write the profiles as the new snapshot and drop the journals; call with both locks held"""
+        with self._writes.writing():
+            self._profiles = {profile.get('id'): profile for profile in profiles}
+            _write_json_atomic(self.path, list(self._profiles.values()))
+            for path in (self._compacting_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def upsert(self, profile):
+        with self._lock:
+            # Diff against this process's view; fields other processes changed are left alone
+            previous = self._profiles.get(profile.get('id'))
+            if previous is None:
+                record = {'op': 'create', 'profile': profile}
+            else:
+                changed = {key: value for key, value in profile.items() if previous.get(key, _MISSING) != value}
+                if not changed:
+                    return
+                record = {'op': 'update', 'id': profile.get('id'), 'fields': changed}
+
+            # One appended line instead of rewriting every profile (OPTIMIZATION)
+            line = json.dumps(record, ensure_ascii=False, cls=ProfileJSONEncoder) + '\n'
+            with _file_lock(self.path), self._writes.writing():
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    journal_size = f.tell()
+            # Apply the decoded record so later caller mutations never leak into a snapshot
+            _apply_record(self._profiles, json.loads(line))
+
+            if journal_size >= self.compact_bytes:
+                self.compact()
+
+    def compact(self, background=True):
+        """Fold the journal into a new snapshot, in a background thread by default"""
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return self._compaction
+            with _file_lock(self.path), self._writes.writing():
+                # A rotated journal left by an interrupted compaction is finished before rotating again
+                if not os.path.exists(self._compacting_path):
+                    if not os.path.exists(self.journal_path):
+                        return None
+                    os.replace(self.journal_path, self._compacting_path)
+            if background:
+                self._compaction = threading.Thread(target=self._fold, name='profile-journal-compaction',
+                                                    daemon=True)
+                self._compaction.start()
+                return self._compaction
+        self._fold()
+        return None
+
+    def _fold(self):
+        """Replay the snapshot and rotated journal from disk into a new snapshot, then drop the rotated journal"""
+        # Folding runs outside the lock so appends continue; the result is only installed if
+        # no other process finished the same compaction or replaced the snapshot meanwhile
+        snapshot = _file_signature(self.path)
+        profiles = {profile.get('id'): profile for profile in JSONProfileStore(self.path).load()}
+        for record in _read_journal(self._compacting_path):
+            _apply_record(profiles, record)
+        with _file_lock(self.path), self._writes.writing():
+            if _file_signature(self.path) == snapshot and os.path.exists(self._compacting_path):
+                _write_json_atomic(self.path, list(profiles.values()))
+                os.remove(self._compacting_path)
+
+    def _wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def generation(self):
+        return self._writes.generation()
+
+    def allocate_id(self):
+        with self._lock, _file_lock(self.path):
+            return _allocate_from_sequence(self.path, lambda: self._replay().values())
+
+    def renumber_duplicate_ids(self):
+        if not _has_duplicate_ids(JSONProfileStore(self.path).load()):
+            return False
+        with self._lock:
+            self._wait_for_compaction()
+            with _file_lock(self.path):
+                # Duplicates only survive in the snapshot list; replaying by id would drop them
+                snapshot = JSONProfileStore(self.path).load()
+                if not _renumber_duplicates(
+                        snapshot, lambda: _allocate_from_sequence(self.path, lambda: self._replay().values())):
+                    return False
+                profiles = {profile.get('id'): profile for profile in snapshot}
+                for path in (self._compacting_path, self.journal_path):
+                    for record in _read_journal(path):
+                        _apply_record(profiles, record)
+                self._replace(list(profiles.values()))
+                return True
+
+    def close(self):
+        self._wait_for_compaction()
+
+
+class CoalescingWriter:
+    """Background thread that folds bursts of profile saves into one store.merge()
+
+    Saves are queued by id, so only the latest copy of each profile is kept.
+    The queue is written once no save has arrived for `quiet_seconds`, or
+    after `max_delay_seconds` under a steady stream, so the last save of a
+    burst is always written. flush() writes the queue immediately and close()
+    flushes it on shutdown.
+    """
+
+    def __init__(self, store, quiet_seconds=0.5, max_delay_seconds=5.0):
+        self.store = store
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.writes = 0
+        self.error = None
+        self._pending = {}
+        self._in_flight = {}
+        self._first_submit = None
+        self._last_submit = None
+        self._failed = False
+        self._closed = False
+        self._condition = threading.Condition()
+        # Held while taking and writing a batch, so batches reach the store in order
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='profile-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, profiles):
+        """Queue profiles for the next write, replacing queued copies with the same id"""
+        with self._condition:
+            for profile in profiles:
+                self._pending[profile.get('id')] = profile
+            self._last_submit = time.monotonic()
+            if self._first_submit is None:
+                self._first_submit = self._last_submit
+            self._failed = False
+            closed = self._closed
+            self._condition.notify_all()
+        if closed:
+            self.flush()
+
+    def queued(self):
+        """Profiles submitted but not yet known to be in the store"""
+        with self._condition:
+            return list({**self._in_flight, **self._pending}.values())
+
+    def flush(self):
+        """Write everything queued so far, raising the error if the store write fails"""
+        with self._write_lock:
+            self._write_pending()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Stop the thread and write anything still queued"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while self._wait_for_quiet():
+            with self._write_lock:
+                self._write_pending()
+
+    def _wait_for_quiet(self):
+        """Block until the queued saves have been quiet long enough; False once closed"""
+        with self._condition:
+            while not self._closed:
+                if not self._pending or self._failed:
+                    # After a failed write, wait for the next save or flush before retrying
+                    self._condition.wait()
+                    continue
+                deadline = min(self._last_submit + self.quiet_seconds, self._first_submit + self.max_delay_seconds)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self._condition.wait(remaining)
+            return False
+
+    def _write_pending(self):
+        with self._condition:
+            batch = self._in_flight = self._pending
+            self._pending = {}
+            self._first_submit = None
+        if not batch:
+            return
+        try:
+            # One write for the whole burst (OPTIMIZATION)
+            self.store.merge(list(batch.values()))
+        except Exception as e:
+            with self._condition:
+                self._in_flight = {}
+                # Keep the failed profiles queued unless a newer copy arrived meanwhile
+                for profile_id, profile in batch.items():
+                    self._pending.setdefault(profile_id, profile)
+                if self._first_submit is None:
+                    self._first_submit = time.monotonic()
+                self._failed = True
+                self.error = e
+            return
+        with self._condition:
+            self._in_flight = {}
+            self.writes += 1
+            self.error = None
+
+
+def open_profile_store(path):
+    """Open the store for a path: SQLite for .db/.sqlite, a journal for .jsonl, the JSON file otherwise"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        return SQLiteProfileStore(path)
+    if extension == '.jsonl':
+        return JournalProfileStore(os.path.splitext(path)[0] + '.json')
+    return JSONProfileStore(path)
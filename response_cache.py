@@ -0,0 +1,80 @@
+"""
+Response Cache Module
+Process-wide, thread-safe LRU cache with a TTL and a size bound, used to share
+chatbot responses across Streamlit sessions. Hit rates are tracked so the
+cache can be tuned from real traffic.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache with per-entry expiry; values are copied in and out so callers never share state"""
+
+    def __init__(self, maxsize=512, ttl_seconds=600, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._timer = timer
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return a copy of the cached value, or default on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        """Store a copy of value, evicting the least recently used entries past maxsize"""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._timer() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """Return hit/miss counters, current size and hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
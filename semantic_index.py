@@ -0,0 +1,215 @@
+"""
+Semantic FAQ Index Module
+Dense retrieval over MedQuAD questions. An offline build step projects the
+questions into a low-dimensional LSA space (TF-IDF + TruncatedSVD), stores the
+float32 embedding matrix and an inverted-file (IVF) approximate nearest-neighbour
+index built with k-means. Queries are embedded and searched locally in well
+under a millisecond, so paraphrases ("high sugar" vs "diabetes") can still find
+their FAQ entry. Everything runs on CPU with no network access.
+
+Build the index offline with:
+    python semantic_index.py --zip chatdata.zip --output models/faq_semantic_index.joblib
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import re
+import sys
+from collections import Counter
+
+import joblib
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+INDEX_FORMAT_VERSION = 1
+
+# Same tokenization as TfidfVectorizer's default token_pattern
+_TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "faq_semantic_index.joblib")
+
+
+def questions_fingerprint(questions):
+    """Checksum of the FAQ questions an index was built from, used to detect a stale index"""
+    digest = hashlib.sha1()
+    for question in questions:
+        digest.update(str(question).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _normalize_rows(matrix):
+    """L2-normalize the rows of a dense matrix in place, leaving zero rows untouched"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class SemanticFAQIndex:
+    """LSA embeddings of FAQ questions with an IVF approximate nearest-neighbour index"""
+
+    def __init__(self, vocabulary, idf, components, embeddings, centroids, list_offsets, list_ids, fingerprint):
+        self.vocabulary = vocabulary          # term (unigram or bigram) -> column
+        self.idf = idf                        # (vocabulary,) float32 inverse document frequencies
+        self.components = components          # (vocabulary, dims) float32 LSA projection
+        self.embeddings = embeddings          # (questions, dims) float32, L2-normalized
+        self.centroids = centroids            # (lists, dims) float32, L2-normalized
+        self.list_offsets = list_offsets      # (lists + 1,) start of each inverted list in list_ids
+        self.list_ids = list_ids              # question ids grouped by nearest centroid
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, questions, n_components=128, n_lists=None, random_state=42):
+        """Fit TF-IDF + TruncatedSVD on the questions and cluster the embeddings into inverted lists"""
+        texts = [str(question) if question is not None else '' for question in questions]
+
+        vectorizer = TfidfVectorizer(lowercase=True, stop_words='english', sublinear_tf=True,
+                                     ngram_range=(1, 2), min_df=1, dtype=np.float32)
+        tfidf = vectorizer.fit_transform(texts)
+
+        n_components = max(1, min(n_components, tfidf.shape[1] - 1, len(texts) - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+        embeddings = _normalize_rows(svd.fit_transform(tfidf).astype(np.float32))
+        components = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+        # Roughly sqrt(N) lists keeps both the centroid scan and each list short
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(texts))) if len(texts) >= 1000 else 1
+        n_lists = max(1, min(n_lists, len(texts)))
+
+        if n_lists == 1:
+            assignments = np.zeros(len(texts), dtype=np.int64)
+            centroids = _normalize_rows(embeddings.mean(axis=0, keepdims=True))
+        else:
+            kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=random_state, n_init=3, batch_size=2048)
+            assignments = kmeans.fit_predict(embeddings)
+            centroids = _normalize_rows(kmeans.cluster_centers_.astype(np.float32))
+
+        list_ids = np.argsort(assignments, kind='stable').astype(np.int64)
+        list_offsets = np.searchsorted(assignments[list_ids], np.arange(n_lists + 1)).astype(np.int64)
+
+        return cls(dict(vectorizer.vocabulary_), vectorizer.idf_.astype(np.float32), components,
+                   embeddings, centroids.astype(np.float32), list_offsets, list_ids,
+                   questions_fingerprint(questions))
+
+    def _term_counts(self, text):
+        """Count the query's known unigrams and bigrams exactly as the fitted vectorizer would"""
+        tokens = [token for token in _TOKEN_RE.findall(str(text).lower()) if token not in ENGLISH_STOP_WORDS]
+        terms = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        return Counter(term for term in terms if term in self.vocabulary)
+
+    def embed(self, text):
+        """Project a query into the LSA space as an L2-normalized float32 vector"""
+        # A direct vocabulary lookup avoids the per-call overhead of vectorizer.transform (OPTIMIZATION)
+        counts = self._term_counts(text)
+        if not counts:
+            return np.zeros(self.components.shape[1], dtype=np.float32)
+
+        columns = np.fromiter((self.vocabulary[term] for term in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter((1.0 + math.log(count) for count in counts.values()), dtype=np.float32, count=len(counts))
+        weights *= self.idf[columns]
+        vector = weights @ self.components[columns]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def search(self, text, k=5, n_probe=8):
+        """Return up to k (question id, cosine similarity) pairs, searching the n_probe closest lists"""
+        query = self.embed(text)
+        if not query.any():
+            return []
+
+        # Probe the closest inverted lists only (approximate search)
+        n_probe = min(n_probe, self.n_lists)
+        if n_probe < self.n_lists:
+            probe = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+            candidates = np.concatenate([self.list_ids[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe])
+        else:
+            candidates = self.list_ids
+
+        if len(candidates) == 0:
+            return []
+
+        scores = self.embeddings[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def matches(self, questions):
+        """Check that the index was built from exactly these questions"""
+        return len(questions) == len(self) and questions_fingerprint(questions) == self.fingerprint
+
+    _ARRAY_FIELDS = ('idf', 'components', 'embeddings', 'centroids', 'list_offsets', 'list_ids')
+
+    def to_state(self):
+        """Split the index into JSON-serializable fields and named NumPy arrays"""
+        objects = {'vocabulary': self.vocabulary, 'fingerprint': self.fingerprint}
+        return objects, {name: getattr(self, name) for name in self._ARRAY_FIELDS}
+
+    @classmethod
+    def from_state(cls, objects, arrays):
+        """Rebuild an index from to_state() output"""
+        return cls(objects['vocabulary'], *(arrays[name] for name in cls._ARRAY_FIELDS), objects['fingerprint'])
+
+    def save(self, path):
+        """Persist the index with joblib, like the prediction models"""
+        objects, arrays = self.to_state()
+        joblib.dump({'format_version': INDEX_FORMAT_VERSION, **objects, **arrays}, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save()"""
+        data = joblib.load(path)
+        if data.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported semantic index format in {path}")
+        return cls.from_state(data, data)
+
+
+def load_semantic_index(path, questions=None):
+    """Load the prebuilt index if it exists and was built from these questions (if given), else return None"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        index = SemanticFAQIndex.load(path)
+    except Exception:
+        return None
+    return index if questions is None or index.matches(questions) else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the semantic FAQ index from the MedQuAD questions")
+    parser.add_argument('--zip', default='chatdata.zip', help="Chatbot dataset archive (default: chatdata.zip)")
+    parser.add_argument('--output', default=DEFAULT_INDEX_PATH, help="Where to write the index")
+    parser.add_argument('--components', type=int, default=128, help="LSA dimensions (default: 128)")
+    parser.add_argument('--lists', type=int, default=None, help="IVF lists (default: sqrt of the corpus size)")
+    args = parser.parse_args(argv)
+
+    from chatbot_engine import read_datasets
+    from knowledge_base import KnowledgeBase
+
+    _, _, faq_df, _ = read_datasets(args.zip)
+    if faq_df is None or 'question' not in faq_df.columns:
+        print(f"Could not load FAQ questions from {args.zip}")
+        return 1
+
+    questions = list(KnowledgeBase(faq_df=faq_df).faq_questions)
+    index = SemanticFAQIndex.build(questions, n_components=args.components, n_lists=args.lists)
+    index.save(args.output)
+    print(f"Indexed {len(index)} questions into {index.embeddings.shape[1]} dimensions "
+          f"and {index.n_lists} lists -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
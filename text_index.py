@@ -0,0 +1,330 @@
+"""
+Text Index Module
+Precomputed character n-gram indexes used by the chatbot to map free-typed
+user text (misspelt symptoms, lay synonyms) onto the canonical vocabulary of
+the medical datasets. Indexes are built once and queried in sub-millisecond time.
+"""
+
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+# Lay terms mapped to candidate canonical symptom names. The first candidate
+# that exists in the loaded vocabulary wins, so the table works for both the
+# underscore-style and the space-style symptom columns.
+SYMPTOM_SYNONYMS = {
+    'temperature': ('fever', 'high fever'),
+    'high temperature': ('high fever', 'fever'),
+    'feverish': ('fever', 'mild fever'),
+    'tired': ('fatigue',),
+    'tiredness': ('fatigue',),
+    'exhaustion': ('fatigue',),
+    'throwing up': ('vomiting',),
+    'puking': ('vomiting',),
+    'feeling sick': ('nausea',),
+    'short of breath': ('shortness of breath', 'breathlessness'),
+    'breathlessness': ('breathlessness', 'shortness of breath'),
+    'difficulty breathing': ('difficulty breathing', 'shortness of breath', 'breathlessness'),
+    'stomach ache': ('stomach pain', 'abdominal pain', 'sharp abdominal pain'),
+    'tummy ache': ('stomach pain', 'abdominal pain', 'sharp abdominal pain'),
+    'belly pain': ('abdominal pain', 'stomach pain', 'sharp abdominal pain'),
+    'runny nose': ('runny nose', 'nasal congestion', 'coryza'),
+    'blocked nose': ('nasal congestion', 'congestion'),
+    'stuffy nose': ('nasal congestion', 'congestion'),
+    'sore throat': ('sore throat', 'throat irritation', 'patches in throat'),
+    'loose motions': ('diarrhoea', 'diarrhea'),
+    'diarrhea': ('diarrhea', 'diarrhoea'),
+    'diarrhoea': ('diarrhoea', 'diarrhea'),
+    'dizzy': ('dizziness',),
+    'giddiness': ('dizziness', 'spinning movements'),
+    'itchy': ('itching', 'itchiness of skin'),
+    'rash': ('skin rash',),
+    'joint ache': ('joint pain',),
+    'body ache': ('muscle pain', 'ache all over'),
+    'chills': ('chills', 'shivering'),
+    'weight loss': ('weight loss', 'recent weight loss'),
+}
+
+# Lay and abbreviated disease names mapped to candidate canonical disease names,
+# resolved against the loaded vocabulary in the same way as SYMPTOM_SYNONYMS.
+# Only unambiguous aliases: bare tokens like "bp" or "sugar" also occur in unrelated text.
+DISEASE_SYNONYMS = {
+    'heart attack': ('heart attack', 'myocardial infarction'),
+    'high blood pressure': ('hypertension',),
+    'high bp': ('hypertension',),
+    'low blood sugar': ('hypoglycemia',),
+    'low sugar': ('hypoglycemia',),
+    'high sugar': ('diabetes',),
+    'diabetes mellitus': ('diabetes',),
+    'flu': ('influenza', 'flu', 'common cold'),
+    'tb': ('tuberculosis',),
+    'uti': ('urinary tract infection',),
+    'piles': ('dimorphic hemmorhoids(piles)', 'hemorrhoids'),
+    'hemorrhoids': ('hemorrhoids', 'dimorphic hemmorhoids(piles)'),
+    'chickenpox': ('chicken pox', 'chickenpox'),
+    'acid reflux': ('gerd', 'gastroesophageal reflux disease (gerd)'),
+    'heartburn': ('gerd', 'gastroesophageal reflux disease (gerd)'),
+    'stroke': ('stroke', 'paralysis (brain hemorrhage)'),
+    'brain hemorrhage': ('paralysis (brain hemorrhage)', 'intracerebral hemorrhage'),
+    'vertigo': ('(vertigo) paroymsal  positional vertigo', 'benign paroxysmal positional vertical (bppv)', 'vertigo'),
+    'hiv': ('aids', 'hiv'),
+    'asthma': ('bronchial asthma', 'asthma'),
+    'underactive thyroid': ('hypothyroidism',),
+    'overactive thyroid': ('hyperthyroidism',),
+    'dengue fever': ('dengue',),
+    'typhoid fever': ('typhoid',),
+    'stomach flu': ('gastroenteritis',),
+    'stomach ulcer': ('peptic ulcer diseae', 'peptic ulcer disease'),
+    'jaundice': ('jaundice',),
+    'anaemia': ('anemia',),
+}
+
+
+# Words that negate a symptom mentioned shortly after them ("no fever", "without a cough")
+NEGATION_WORDS = frozenset({'no', 'not', 'without', 'never', 'denies', 'deny', 'nor', 'cannot',
+                            'dont', 'doesnt', 'didnt', 'havent', 'hasnt', 'hadnt', 'isnt', 'arent', 'wasnt',
+                            'werent', 'cant', 'wont'})
+
+# Stems of negated contractions, which normalize_term splits from their "t" ("don't" -> "don t")
+NEGATED_CONTRACTION_STEMS = frozenset({'don', 'doesn', 'didn', 'haven', 'hasn', 'hadn', 'isn', 'aren', 'wasn',
+                                       'weren', 'can', 'won', 'couldn', 'shouldn', 'wouldn'})
+
+# Trie key marking the end of a phrase; tokens are never empty so it cannot collide
+_TERMINAL = ''
+
+
+def normalize_term(text):
+    """Lowercase text and collapse punctuation, underscores and whitespace to single spaces"""
+    if not text:
+        return ''
+    return _NON_WORD_RE.sub(' ', str(text).lower()).strip()
+
+
+def fold_negations(tokens):
+    """Replace each split negated contraction ("don", "t") in normalized tokens with a single not"""
+    folded = []
+    for token in tokens:
+        if token == 't' and folded and folded[-1] in NEGATED_CONTRACTION_STEMS:
+            folded[-1] = 'not'
+        else:
+            folded.append(token)
+    return folded
+
+
+def char_ngrams(text, n=3):
+    """Return the set of boundary-padded character n-grams of an already normalized term"""
+    padded = f"${text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def bind_synonyms(synonyms, vocabulary):
+    """Map each normalized variant to the first of its targets present in the vocabulary"""
+    bound = {}
+    for variant, targets in synonyms.items():
+        for target in targets:
+            if normalize_term(target) in vocabulary:
+                bound[normalize_term(variant)] = vocabulary[normalize_term(target)]
+                break
+    return bound
+
+
+class NGramIndex:
+    """Inverted character n-gram index over a fixed vocabulary of normalized terms"""
+
+    def __init__(self, terms, n=3):
+        self.n = n
+        self.terms = list(terms)
+        self._postings = defaultdict(list)
+        for term_id, term in enumerate(self.terms):
+            for gram in char_ngrams(term, n):
+                self._postings[gram].append(term_id)
+        # Freeze postings into tuples so the index is read-only once built
+        self._postings = {gram: tuple(ids) for gram, ids in self._postings.items()}
+
+    def candidates(self, query, limit=10):
+        """Return up to `limit` term ids sharing the most n-grams with the query"""
+        counts = defaultdict(int)
+        for gram in char_ngrams(query, self.n):
+            for term_id in self._postings.get(gram, ()):
+                counts[term_id] += 1
+        return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+    def search(self, query, limit=5, min_score=0.0, candidate_pool=20):
+        """Rank vocabulary terms against the query by edit similarity, using n-grams to prune"""
+        query = normalize_term(query)
+        if not query:
+            return []
+
+        results = []
+        for term_id in self.candidates(query, candidate_pool):
+            term = self.terms[term_id]
+            score = SequenceMatcher(None, query, term).ratio()
+            if score >= min_score:
+                results.append((term, score))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
+
+
+class SymptomResolver:
+    """Resolve free-typed symptom terms to canonical symptom column names"""
+
+    def __init__(self, symptom_columns, synonyms=None, min_score=0.8):
+        self.columns = list(symptom_columns)
+        self.column_index = {column: idx for idx, column in enumerate(self.columns)}
+        self.min_score = min_score
+
+        # Normalized form -> canonical column (first column wins on collisions)
+        self._exact = {}
+        for column in self.columns:
+            self._exact.setdefault(normalize_term(column), column)
+
+        self._synonyms = bind_synonyms(synonyms if synonyms is not None else SYMPTOM_SYNONYMS, self._exact)
+
+        self._index = NGramIndex(self._exact.keys())
+
+    def resolve_term(self, term):
+        """Return the canonical column for a single term, or None if it cannot be resolved"""
+        normalized = normalize_term(term)
+        if not normalized:
+            return None
+
+        if normalized in self._exact:
+            return self._exact[normalized]
+        if normalized in self._synonyms:
+            return self._synonyms[normalized]
+
+        matches = self._index.search(normalized, limit=1, min_score=self.min_score)
+        if matches:
+            return self._exact[matches[0][0]]
+        return None
+
+    def resolve(self, terms):
+        """Resolve a list of terms, returning (unique resolved columns, unresolved terms)"""
+        resolved = []
+        unresolved = []
+        for term in terms:
+            if not normalize_term(term):
+                continue
+            column = self.resolve_term(term)
+            if column is None:
+                unresolved.append(term.strip())
+            elif column not in resolved:
+                resolved.append(column)
+        return resolved, unresolved
+
+
+class DiseaseResolver:
+    """Rank canonical disease names against free-typed disease text"""
+
+    def __init__(self, disease_names, synonyms=None, min_score=0.8, floor_score=0.6):
+        self.min_score = min_score
+        self.floor_score = floor_score
+
+        # Normalized form -> canonical (original, stripped) disease name
+        self._exact = {}
+        for name in disease_names:
+            normalized = normalize_term(name)
+            if normalized:
+                self._exact.setdefault(normalized, str(name).strip())
+
+        self._synonyms = bind_synonyms(synonyms if synonyms is not None else DISEASE_SYNONYMS, self._exact)
+
+        self._index = NGramIndex(self._exact.keys())
+
+    def __len__(self):
+        return len(self._exact)
+
+    def match(self, query, limit=5):
+        """Return up to `limit` (canonical name, score) pairs ranked best first"""
+        normalized = normalize_term(query)
+        if not normalized:
+            return []
+
+        ranked = []
+        if normalized in self._exact:
+            ranked.append((self._exact[normalized], 1.0))
+        elif normalized in self._synonyms:
+            ranked.append((self._synonyms[normalized], 1.0))
+
+        seen = {name for name, _ in ranked}
+        for term, score in self._index.search(normalized, limit=limit, min_score=self.floor_score):
+            name = self._exact[term]
+            if name not in seen:
+                seen.add(name)
+                ranked.append((name, score))
+
+        return ranked[:limit]
+
+    def resolve(self, query):
+        """Return the best canonical disease name if it scores above min_score, else None"""
+        matches = self.match(query, limit=1)
+        if matches and matches[0][1] >= self.min_score:
+            return matches[0][0]
+        return None
+
+
+class SymptomGazetteer:
+    """Word-level trie over symptom names and their variants for finding symptom mentions in free text"""
+
+    def __init__(self, symptom_columns, synonyms=None, negation_window=3):
+        self.negation_window = negation_window
+
+        # Normalized phrase -> canonical column; names first, then synonyms, then plurals
+        phrases = {}
+        for column in symptom_columns:
+            phrases.setdefault(normalize_term(column), column)
+        phrases.pop('', None)
+        for variant, column in bind_synonyms(synonyms if synonyms is not None else SYMPTOM_SYNONYMS,
+                                             dict(phrases)).items():
+            phrases.setdefault(variant, column)
+        for phrase, column in list(phrases.items()):
+            if not phrase.endswith('s'):
+                phrases.setdefault(phrase + 's', column)
+
+        self._root = {}
+        self.max_phrase_tokens = 0
+        for phrase, column in phrases.items():
+            tokens = phrase.split()
+            node = self._root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(_TERMINAL, column)
+            self.max_phrase_tokens = max(self.max_phrase_tokens, len(tokens))
+
+    def find(self, text):
+        """Return (column, start token, end token, negated) for each leftmost-longest mention"""
+        tokens = fold_negations(normalize_term(text).split())
+        mentions = []
+        position = 0
+        # Each position walks at most max_phrase_tokens trie levels, so the scan is linear in the text
+        while position < len(tokens):
+            node = self._root
+            match_end, column = None, None
+            for end in range(position, min(len(tokens), position + self.max_phrase_tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    match_end, column = end + 1, node[_TERMINAL]
+
+            if column is None:
+                position += 1
+                continue
+
+            window = tokens[max(0, position - self.negation_window):position]
+            mentions.append((column, position, match_end, any(token in NEGATION_WORDS for token in window)))
+            position = match_end
+        return mentions
+
+    def extract(self, text):
+        """Return the distinct symptom columns mentioned without negation, in order of mention"""
+        columns = []
+        for column, _, _, negated in self.find(text):
+            if not negated and column not in columns:
+                columns.append(column)
+        return columns